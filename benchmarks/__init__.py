@@ -0,0 +1,22 @@
+"""
+Benchmarks de las vistas y rutas de modelo más usadas.
+
+Cada escala (``small``, ``medium``, ``large``) se genera con
+``generate_load_data`` en la base de datos de pruebas y sobre ella se mide
+la latencia (mediana, p95...) y el número de consultas de cada caso. El
+resultado es un JSON comparable entre ejecuciones:
+
+    python -m benchmarks.run --scale small --output resultados.json
+    python -m benchmarks.run --scale small --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.compare benchmarks/baseline.json resultados.json
+
+Con ``--baseline`` la ejecución falla (código 1) si algún caso es más lento
+que la línea base en más del umbral o hace más consultas, y con un error
+claro si el archivo no existe. ``benchmarks/baseline.json`` es la línea base
+de ``--scale small`` guardada en el repositorio. Su ``meta`` indica el
+entorno en que se midió y la comparación avisa si no coincide. El número de
+consultas no depende de la máquina; los tiempos sí, así que en otra máquina
+conviene regenerarla allí (o subir ``--threshold``):
+
+    python -m benchmarks.run --scale small --output benchmarks/baseline.json
+"""
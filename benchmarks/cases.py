@@ -0,0 +1,153 @@
+"""
+Casos medidos y escalas de datos.
+
+Cada caso recibe el contexto de la escala y el número de iteración (para
+que los POST usen vehículos y fechas distintos y los PDF "en frío" no
+salgan de la caché) y devuelve la respuesta, o ``None`` en los casos de
+modelo. Las respuestas en streaming se consumen dentro de la medición, y
+los contratos se consultan hasta que el pool termina de generarlos.
+"""
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from rental.availability import available_vehicles
+from rental.metrics import get_dashboard_metrics
+from rental.models import Category, Rental, Vehicle
+from rental.rollups import rebuild_rollups
+
+# Parámetros de generate_load_data por escala
+SCALES = {
+    'small': {'vehicles': 200, 'users': 1000, 'rentals': 5000},
+    'medium': {'vehicles': 2000, 'users': 10000, 'rentals': 50000},
+    'large': {'vehicles': 10000, 'users': 100000, 'rentals': 500000},
+}
+
+
+@dataclass
+class Case:
+    name: str
+    run: callable
+    expected_status: int = 200
+    repeat: int = None  # None: el --repeat de la ejecución
+
+
+class Context:
+    """Clientes con sesión iniciada y datos de referencia de la escala"""
+
+    def __init__(self, prefix='ld'):
+        self.today = timezone.localdate()
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=f'{prefix}_user0000001'))
+        self.admin = Client()
+        self.admin.force_login(User.objects.get(username=f'{prefix}_admin'))
+        self.category_id = Category.objects.order_by('id').values_list('id', flat=True).first()
+        self.vehicle_ids = list(
+            Vehicle.objects.exclude(status='mantenimiento').order_by('id').values_list('id', flat=True)
+        )
+        self.vehicle_id = self.vehicle_ids[0]
+        self.pending = Rental.objects.filter(status='pendiente').select_related('vehicle').order_by('id').first()
+        if self.pending is None:
+            raise RuntimeError('La escala no tiene alquileres pendientes para los casos de solapamiento.')
+        self.rental_ids = list(Rental.objects.order_by('-id').values_list('id', flat=True)[:200])
+        self.search_term = self.pending.vehicle.license_plate
+        # La página de reportes solo lee los resúmenes
+        rebuild_rollups()
+
+
+def consume(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def url(name, *args, **params):
+    return reverse(name, args=args) + ('?' + urlencode(params) if params else '')
+
+
+def booking_dates(ctx, i):
+    """Fechas libres para la iteración i: más allá de las reservas generadas"""
+    vehicle_id = ctx.vehicle_ids[i % len(ctx.vehicle_ids)]
+    start = ctx.today + timedelta(days=400 + 5 * (i // len(ctx.vehicle_ids)))
+    return vehicle_id, start, start + timedelta(days=3)
+
+
+def rental_create_post(ctx, i):
+    vehicle_id, start, end = booking_dates(ctx, i)
+    return ctx.client.post(url('rental_create', vehicle_id), {
+        'vehicle': vehicle_id, 'start_date': start, 'end_date': end, 'notes': 'benchmark',
+    })
+
+
+def rental_create_conflict(ctx, i):
+    rental = ctx.pending
+    return ctx.client.post(url('rental_create', rental.vehicle_id), {
+        'vehicle': rental.vehicle_id, 'start_date': rental.start_date, 'end_date': rental.end_date,
+    })
+
+
+def rental_clean_overlap(ctx, i):
+    """``Rental.full_clean`` con un solapamiento: la validación que corre antes de reservar"""
+    rental = ctx.pending
+    candidate = Rental(
+        client_id=rental.client_id, vehicle=rental.vehicle, start_date=rental.start_date,
+        end_date=rental.end_date, daily_rate=rental.daily_rate,
+    )
+    try:
+        candidate.full_clean()
+    except ValidationError:
+        return None
+    raise AssertionError('Rental.full_clean no detectó el solapamiento')
+
+
+# Intervalo entre consultas mientras el pool genera un contrato
+CONTRACT_POLL_INTERVAL = 0.02
+
+
+def contract_pdf(ctx, rental_id):
+    """GET del contrato repetido hasta que deja de responder 202: incluye el render completo"""
+    while True:
+        response = ctx.admin.get(url('rental_contract_pdf', rental_id))
+        if response.status_code != 202:
+            return consume(response)
+        time.sleep(CONTRACT_POLL_INTERVAL)
+
+
+def build_cases(ctx):
+    today = ctx.today
+    week = {'start_date': today + timedelta(days=10), 'end_date': today + timedelta(days=15)}
+    return [
+        Case('vehicles_list', lambda c, i: c.client.get(url('vehicles_list'))),
+        Case('vehicles_list (filtros)', lambda c, i: c.client.get(
+            url('vehicles_list', category=c.category_id, transmission='automatica'))),
+        Case('vehicles_list (búsqueda)', lambda c, i: c.client.get(url('vehicles_list', search='toyota'))),
+        Case('vehicles_list (fechas)', lambda c, i: c.client.get(url('vehicles_list', **week))),
+        Case('rental_create (GET)', lambda c, i: c.client.get(url('rental_create', c.vehicle_id, **week))),
+        Case('rental_create (POST)', rental_create_post, expected_status=302),
+        Case('rental_create (conflicto)', rental_create_conflict),
+        Case('dashboard', lambda c, i: c.admin.get(url('dashboard'))),
+        Case('reports', lambda c, i: c.admin.get(url('reports'))),
+        Case('rentals_manage', lambda c, i: c.admin.get(url('rentals_manage'))),
+        Case('rentals_manage (búsqueda)', lambda c, i: c.admin.get(url('rentals_manage', search=c.search_term))),
+        Case('rentals_manage (estado)', lambda c, i: c.admin.get(url('rentals_manage', status='activo'))),
+        Case('export_rentals_csv', lambda c, i: consume(c.admin.get(url('export_rentals_csv'))), repeat=5),
+        Case('export_rentals_excel (30 días)', lambda c, i: consume(c.admin.get(
+            url('export_rentals_excel', start_date=today - timedelta(days=30)))), repeat=5),
+        Case('rental_contract_pdf (frío)', lambda c, i: contract_pdf(
+            c, c.rental_ids[i % len(c.rental_ids)]), repeat=5),
+        # El calentamiento deja el PDF en caché; las iteraciones medidas solo lo sirven
+        Case('rental_contract_pdf (caché)', lambda c, i: contract_pdf(c, c.rental_ids[0])),
+        # Rutas de modelo (sin petición HTTP)
+        Case('available_vehicles', lambda c, i: list(available_vehicles(
+            week['start_date'], week['end_date']).order_by('-created_at', '-id')[:25]) and None, expected_status=None),
+        Case('Rental.full_clean (solapamiento)', rental_clean_overlap, expected_status=None),
+        Case('get_dashboard_metrics', lambda c, i: get_dashboard_metrics() and None, expected_status=None),
+        Case('rebuild_rollups', lambda c, i: rebuild_rollups() and None, expected_status=None, repeat=3),
+    ]
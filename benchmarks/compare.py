@@ -0,0 +1,95 @@
+"""
+Comparación de dos resultados de benchmarks (línea base y actual).
+
+Un caso es una regresión si su mediana supera la de la línea base en más de
+``threshold`` (proporción) y además en más de ``min_delta_ms`` (para no
+fallar por ruido en casos de microsegundos), o si hace más consultas.
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 2.0
+
+
+def load(path):
+    with open(path, encoding='utf-8') as fileobj:
+        return json.load(fileobj)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """Lista de filas (escala, caso, base, actual, motivo); motivo es None si no hay regresión.
+
+    Solo se comparan las escalas y casos presentes en ambos resultados.
+    """
+    rows = []
+    for scale, data in current.get('scales', {}).items():
+        base_cases = baseline.get('scales', {}).get(scale, {}).get('cases', {})
+        for name, result in data['cases'].items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            reasons = []
+            limit = base['median_ms'] * (1 + threshold)
+            if result['median_ms'] > limit and result['median_ms'] - base['median_ms'] > min_delta_ms:
+                reasons.append(f"{result['median_ms'] / base['median_ms'] - 1:+.0%} de latencia")
+            if result['queries'] > base['queries']:
+                reasons.append(f"{result['queries'] - base['queries']:+d} consultas")
+            rows.append((scale, name, base, result, ', '.join(reasons) or None))
+    return rows
+
+
+# Datos del entorno que cambian los tiempos (ver run.py)
+ENVIRONMENT_KEYS = ('python', 'django', 'database', 'catalog_cache')
+
+
+def environment_changes(baseline, current):
+    """Diferencias de entorno entre los dos resultados: [(clave, base, actual)]"""
+    base, meta = baseline.get('meta', {}), current.get('meta', {})
+    return [(key, base.get(key), meta.get(key)) for key in ENVIRONMENT_KEYS if base.get(key) != meta.get(key)]
+
+
+def format_environment(changes):
+    return '\n'.join(f'Aviso: la línea base se midió con {key}={old} (ahora {new}).' for key, old, new in changes)
+
+
+def regressions(rows):
+    return [row for row in rows if row[4]]
+
+
+def format_rows(rows):
+    lines = [f"{'escala':<8} {'caso':<36} {'base ms':>9} {'actual ms':>9} {'consultas':>11}  resultado"]
+    for scale, name, base, result, reason in rows:
+        queries = f"{base['queries']}->{result['queries']}"
+        lines.append(
+            f"{scale:<8} {name:<36} {base['median_ms']:>9.2f} {result['median_ms']:>9.2f} {queries:>11}  "
+            f"{'REGRESIÓN: ' + reason if reason else 'ok'}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara dos resultados de benchmarks.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Aumento de la mediana tolerado (0.25 = 25%%).')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help='Diferencia mínima en ms para contar como regresión.')
+    args = parser.parse_args(argv)
+    for path in (args.baseline, args.current):
+        if not os.path.isfile(path):
+            parser.error(f'no existe el archivo {path}')
+    baseline, current = load(args.baseline), load(args.current)
+    changes = environment_changes(baseline, current)
+    if changes:
+        print(format_environment(changes))
+    rows = compare(baseline, current, args.threshold, args.min_delta_ms)
+    print(format_rows(rows))
+    return 1 if regressions(rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
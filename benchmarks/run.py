@@ -0,0 +1,173 @@
+"""
+Ejecuta los benchmarks sobre la base de datos de pruebas.
+
+Por cada escala se vacía la base, se generan los datos con
+``generate_load_data`` y se ejecuta cada caso: una iteración de
+calentamiento, ``repeat`` iteraciones cronometradas y una más con
+``CaptureQueriesContext`` para contar consultas (fuera de la medición, ya
+que capturar SQL tiene su propio coste). La base de datos real no se toca.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+import django
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehiclerental.settings')
+    django.setup()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def measure(case, ctx, repeat):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def call(i):
+        response = case.run(ctx, i)
+        if case.expected_status is not None and response.status_code != case.expected_status:
+            raise RuntimeError(f'{case.name}: respondió {response.status_code} (se esperaba {case.expected_status})')
+
+    call(-1)  # calentamiento
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        call(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    with CaptureQueriesContext(connection) as queries:
+        call(repeat)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': len(queries),
+    }
+
+
+def run_scale(name, params, args, out):
+    from django.core.cache import caches
+    from django.core.management import call_command
+
+    from benchmarks.cases import Context, build_cases
+
+    start = time.perf_counter()
+    call_command('flush', interactive=False, verbosity=0)
+    for alias in caches:
+        caches[alias].clear()
+    call_command('generate_load_data', seed=args.seed, stdout=io.StringIO(), **params)
+    out.write(f'[{name}] datos generados en {time.perf_counter() - start:.1f}s\n')
+
+    ctx = Context()
+    cases = {}
+    for case in build_cases(ctx):
+        if args.case and not any(pattern in case.name for pattern in args.case):
+            continue
+        result = measure(case, ctx, case.repeat or args.repeat)
+        cases[case.name] = result
+        out.write(f"[{name}] {case.name:<36} {result['median_ms']:>9.2f} ms  {result['queries']:>3} consultas\n")
+    return {'params': params, 'cases': cases}
+
+
+def main(argv=None):
+    from benchmarks.cases import SCALES
+    from benchmarks.compare import DEFAULT_MIN_DELTA_MS, DEFAULT_THRESHOLD
+
+    parser = argparse.ArgumentParser(description='Benchmarks de vistas y modelos sobre datos generados.')
+    parser.add_argument('--scale', action='append', choices=sorted(SCALES),
+                        help='Escala a medir (se puede repetir). Por defecto small.')
+    parser.add_argument('--case', action='append', help='Solo los casos cuyo nombre contenga este texto.')
+    parser.add_argument('--repeat', type=int, default=20, help='Iteraciones cronometradas por caso.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--catalog-cache', action='store_true',
+                        help='Medir con la caché del catálogo activada (por defecto se desactiva).')
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto solo la salida estándar).')
+    parser.add_argument('--baseline', help='Resultado de referencia: falla si hay regresiones.')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args(argv)
+    # Antes de generar datos: sin línea base no hay nada que comparar
+    if args.baseline and not Path(args.baseline).is_file():
+        parser.error(f'no existe la línea base {args.baseline}; se crea con '
+                     f'python -m benchmarks.run --scale small --output {args.baseline}')
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+    from benchmarks import compare
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    results = {
+        'meta': {
+            'created': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'catalog_cache': args.catalog_cache,
+            'repeat': args.repeat,
+        },
+        'scales': {},
+    }
+    try:
+        with tempfile.TemporaryDirectory() as contracts_dir, override_settings(
+            CATALOG_CACHE_ENABLED=args.catalog_cache and settings.CATALOG_CACHE_ENABLED,
+            CONTRACT_CACHE_DIR=contracts_dir,
+        ):
+            for name in args.scale or ['small']:
+                results['scales'][name] = run_scale(name, SCALES[name], args, sys.stderr)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+
+    if args.baseline:
+        baseline = compare.load(args.baseline)
+        changes = compare.environment_changes(baseline, results)
+        if changes:
+            sys.stderr.write(compare.format_environment(changes) + '\n')
+        rows = compare.compare(baseline, results, args.threshold, args.min_delta_ms)
+        sys.stderr.write(compare.format_rows(rows) + '\n')
+        if compare.regressions(rows):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    setup_django()
+    sys.exit(main())
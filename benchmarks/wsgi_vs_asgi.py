@@ -0,0 +1,279 @@
+"""
+Comparación WSGI / ASGI con la misma carga.
+
+Arranca dos servidores sobre la misma base de datos (SQLite temporal con
+datos de ``generate_load_data``, o ``--database-url``):
+
+- wsgi: ``gunicorn vehiclerental.wsgi`` con workers síncronos (como el
+  ``startCommand`` actual);
+- asgi: ``gunicorn vehiclerental.asgi:application`` con el perfil
+  ``vehiclerental.gunicorn_asgi`` (workers de uvicorn).
+
+Ambos con el mismo número de workers. Para cada endpoint y nivel de
+concurrencia, N clientes asíncronos (conexiones keep-alive propias) repiten
+la petición durante ``--duration`` segundos; se informa req/s, p50/p95/p99
+y errores:
+
+    python -m benchmarks.wsgi_vs_asgi --scale small --concurrency 1 --concurrency 16 --concurrency 64
+    python -m benchmarks.wsgi_vs_asgi --endpoint api --endpoint catalogo --output asgi.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from benchmarks.run import ROOT, git_commit, percentile, setup_django
+
+# Nombre -> (ruta, sesión: None, 'user' o 'admin')
+ENDPOINTS = {
+    'api': ('/api/vehicles/?fields=id,brand,model,daily_rate', None),
+    'catalogo': ('/vehicles/', 'user'),
+    'dashboard': ('/dashboard/', 'admin'),
+    'csv': ('/dashboard/vehicles/export/', 'admin'),
+}
+SERVERS = {
+    'wsgi': ['gunicorn', 'vehiclerental.wsgi:application', '--worker-class', 'sync'],
+    'asgi': ['gunicorn', 'vehiclerental.asgi:application', '-c', 'python:vehiclerental.gunicorn_asgi'],
+}
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def manage(env, *args):
+    subprocess.run([sys.executable, 'manage.py', *args], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def start_server(name, port, args, env, log):
+    command = SERVERS[name] + ['--bind', f'127.0.0.1:{port}', '--workers', str(args.workers),
+                               '--access-logfile', '/dev/null']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{name}: el servidor terminó al arrancar (ver {log.name})')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/login/', timeout=2):
+                return process
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'{name}: el servidor no respondió en 30 s')
+
+
+def stop_server(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def login(base_url, username, password):
+    """Cabecera Cookie de una sesión iniciada"""
+    jar = urllib.request.HTTPCookieProcessor()
+    opener = urllib.request.build_opener(jar, NoRedirect)
+    with opener.open(base_url + '/login/') as response:
+        token = CSRF_RE.search(response.read().decode())
+    data = urllib.parse.urlencode({
+        'csrfmiddlewaretoken': token.group(1) if token else '', 'username': username, 'password': password,
+    }).encode()
+    request = urllib.request.Request(base_url + '/login/', data=data, headers={'Referer': base_url + '/login/'})
+    try:
+        opener.open(request)
+    except urllib.error.HTTPError as exc:
+        if exc.code != 302:
+            raise RuntimeError(f'No se pudo iniciar sesión como {username} ({exc.code})')
+    return '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar.cookiejar)
+
+
+# --- Cliente HTTP/1.1 mínimo sobre asyncio ---
+
+async def read_response(reader):
+    """Lee una respuesta completa; devuelve (código, cuerpo, ¿mantener la conexión?)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    keep_alive = headers.get('connection', '').lower() != 'close'
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            parts.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(parts)
+    else:
+        body = await reader.read()
+        keep_alive = False
+    return status, body, keep_alive
+
+
+async def client_loop(port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            status, _, keep_alive = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, keep_alive = 0, False
+        elapsed = time.perf_counter() - start
+        if status == 200:
+            latencies.append(elapsed)
+        else:
+            errors.append(status)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, path, cookie, concurrency, duration):
+    request = (
+        f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nConnection: keep-alive\r\n'
+        + (f'Cookie: {cookie}\r\n' if cookie else '') + '\r\n'
+    ).encode()
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(client_loop(port, request, deadline, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {'requests': len(latencies), 'errors': len(errors), 'rps': round(len(latencies) / elapsed, 1)}
+    if latencies:
+        result.update({
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        })
+    return result
+
+
+def main(argv=None):
+    from benchmarks.cases import SCALES
+
+    parser = argparse.ArgumentParser(description='Compara gunicorn (WSGI) con gunicorn + uvicorn (ASGI).')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help='Datos generados en una SQLite temporal (ignorado con --database-url).')
+    parser.add_argument('--database-url', help='Usar una base de datos existente con datos de generate_load_data.')
+    parser.add_argument('--server', action='append', choices=sorted(SERVERS))
+    parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS))
+    parser.add_argument('--concurrency', action='append', type=int, help='Clientes simultáneos (se puede repetir).')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por combinación.')
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn en ambos servidores.')
+    parser.add_argument('--port', type=int, default=8790)
+    parser.add_argument('--prefix', default='ld')
+    parser.add_argument('--password', default='load12345')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto solo la salida estándar).')
+    args = parser.parse_args(argv)
+    if shutil.which('gunicorn') is None:
+        parser.error('gunicorn no está instalado (pip install -r requirements.txt)')
+    try:
+        import dj_database_url  # noqa: F401
+    except ImportError:
+        # Sin él, settings ignora DATABASE_URL y se usaría db.sqlite3
+        parser.error('dj-database-url no está instalado (pip install -r requirements.txt)')
+
+    workdir = tempfile.mkdtemp(prefix='wsgi_vs_asgi_')
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='vehiclerental.settings', CACHE_URL='locmem://')
+    # Cada punto de entrada decide: vistas asíncronas con asgi.py, síncronas con wsgi.py
+    env.pop('ASYNC_VIEWS', None)
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    else:
+        env['DATABASE_URL'] = f'sqlite:///{workdir}/bench.sqlite3'
+        start = time.perf_counter()
+        manage(env, 'migrate')
+        params = SCALES[args.scale]
+        manage(env, 'generate_load_data', '--seed', str(args.seed), '--vehicles', str(params['vehicles']),
+               '--users', str(params['users']), '--rentals', str(params['rentals']))
+        sys.stderr.write(f'datos ({args.scale}) generados en {time.perf_counter() - start:.1f}s\n')
+
+    results = {
+        'meta': {
+            'created': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'scale': None if args.database_url else args.scale,
+            'workers': args.workers,
+            'duration': args.duration,
+        },
+        'servers': {},
+    }
+    endpoints = args.endpoint or ['api', 'catalogo', 'dashboard']
+    levels = args.concurrency or [1, 16, 64]
+    try:
+        for name in args.server or ['wsgi', 'asgi']:
+            with open(Path(workdir) / f'{name}.log', 'w') as log:
+                process = start_server(name, args.port, args, env, log)
+                try:
+                    base_url = f'http://127.0.0.1:{args.port}'
+                    sessions = {
+                        None: None,
+                        'user': login(base_url, f'{args.prefix}_user0000001', args.password),
+                        'admin': login(base_url, f'{args.prefix}_admin', args.password),
+                    }
+                    server = results['servers'][name] = {}
+                    for endpoint in endpoints:
+                        path, session = ENDPOINTS[endpoint]
+                        for concurrency in levels:
+                            result = asyncio.run(
+                                run_load(args.port, path, sessions[session], concurrency, args.duration)
+                            )
+                            server.setdefault(endpoint, {})[str(concurrency)] = result
+                            sys.stderr.write(
+                                f"[{name}] {endpoint:<10} c={concurrency:<4} {result['rps']:>8.1f} req/s  "
+                                f"p50 {result.get('p50_ms', 0):>8.2f} ms  p99 {result.get('p99_ms', 0):>8.2f} ms  "
+                                f"errores {result['errors']}\n"
+                            )
+                finally:
+                    stop_server(process)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    setup_django()
+    sys.exit(main())
@@ -1,5 +1,86 @@
-from django.contrib import admin
-from .models import Category, Vehicle, UserProfile, Rental
+"""
+Admin de Django.
+
+Pensado para tablas grandes de ``Rental`` y ``Vehicle``:
+
+- ``list_select_related`` en los listados que muestran claves foráneas.
+- Sin filtros ni búsqueda, el total del listado sale de las estadísticas
+  del motor (``EstimatedCountPaginator``) en lugar de un ``COUNT(*)``; con
+  filtros no se pide además el total sin filtrar (``show_full_result_count``).
+- Sin ``date_hierarchy`` en ``Rental``: cada página calculaba los años/meses
+  distintos de toda la tabla. El filtro por fecha de inicio no agrega nada.
+- Búsquedas y autocompletados con los índices de ``rental/search.py``.
+- Acciones masivas con ``UPDATE`` por lotes (ver ``rental/services.py``).
+"""
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from .models import Category, Vehicle, UserProfile, Rental, PricingRule, DurationDiscount, SchedulerRun
+from .search import search_rentals, search_users, search_vehicles
+from .services import bulk_update_status, release_vehicles
+
+# Por debajo de este número de filas el COUNT(*) exacto es barato
+ESTIMATED_COUNT_MIN = 100_000
+
+
+def estimated_count(model):
+    """Filas de la tabla según las estadísticas del motor, o None si no hay"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # sqlite_stat1 solo existe después de un ANALYZE
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Una fila por índice; la de un índice parcial cuenta solo sus filas.
+            # Se prefiere la de la tabla (idx NULL o igual a tbl) y si no, el
+            # mayor primer entero, que es el de un índice completo
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s '
+                'ORDER BY (idx IS NULL OR idx = tbl) DESC, CAST(stat AS INTEGER) DESC LIMIT 1',
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    count = int(str(row[0]).split()[0])
+    # PostgreSQL devuelve -1 si la tabla nunca se analizó
+    return count if count >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginador que usa ``estimated_count`` cuando el listado no tiene filtros"""
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Opciones comunes para tablas grandes"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Función de rental/search.py para la caja de búsqueda y los autocompletados
+    search_function = None
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term or self.search_function is None:
+            return super().get_search_results(request, queryset, search_term)
+        return self.search_function(queryset, search_term), False
 
 
 @admin.register(Category)
@@ -9,22 +90,97 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(LargeTableAdmin):
     list_display = ['license_plate', 'brand', 'model', 'year', 'category', 'status', 'daily_rate']
     list_filter = ['status', 'category', 'transmission']
+    list_select_related = ['category']
+    # Solo documentan la búsqueda (y habilitan el autocompletado): la hace search_vehicles
     search_fields = ['license_plate', 'brand', 'model']
+    search_function = staticmethod(search_vehicles)
+    autocomplete_fields = ['category']
+    actions = ['release', 'end_maintenance']
+
+    @admin.action(description='Liberar vehículos alquilados seleccionados (sin alquiler activo)')
+    def release(self, request, queryset):
+        released = release_vehicles(queryset)
+        self.message_user(request, f'{released} vehículos pasaron a disponible.', messages.SUCCESS)
+
+    @admin.action(description='Terminar el mantenimiento de los vehículos seleccionados')
+    def end_maintenance(self, request, queryset):
+        released = release_vehicles(queryset, status='mantenimiento')
+        self.message_user(request, f'{released} vehículos salieron de mantenimiento.', messages.SUCCESS)
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'start_date', 'end_date', 'rate_multiplier', 'priority']
+    list_filter = ['category']
+    list_select_related = ['category']
+    search_fields = ['name']
+    date_hierarchy = 'start_date'
+
+
+@admin.register(DurationDiscount)
+class DurationDiscountAdmin(admin.ModelAdmin):
+    list_display = ['category', 'min_days', 'percent']
+    list_filter = ['category']
+    list_select_related = ['category']
 
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'role', 'phone']
     list_filter = ['role']
+    list_select_related = ['user']
     search_fields = ['user__username', 'user__email']
+    autocomplete_fields = ['user']
 
 
 @admin.register(Rental)
-class RentalAdmin(admin.ModelAdmin):
+class RentalAdmin(LargeTableAdmin):
     list_display = ['id', 'client', 'vehicle', 'start_date', 'end_date', 'days', 'total_amount', 'status']
     list_filter = ['status', 'start_date']
+    list_select_related = ['client', 'vehicle']
     search_fields = ['client__username', 'vehicle__license_plate']
-    date_hierarchy = 'start_date'
+    search_function = staticmethod(search_rentals)
+    autocomplete_fields = ['client', 'vehicle']
+    actions = ['mark_active', 'mark_completed', 'mark_cancelled']
+
+    def _bulk_status(self, request, queryset, new_status):
+        updated = bulk_update_status(queryset, new_status)
+        label = dict(Rental.STATUS_CHOICES)[new_status]
+        self.message_user(request, f'{updated} alquileres pasaron a "{label}".', messages.SUCCESS)
+
+    @admin.action(description='Marcar como activos (pendientes)')
+    def mark_active(self, request, queryset):
+        self._bulk_status(request, queryset, 'activo')
+
+    @admin.action(description='Marcar como completados y liberar vehículos (activos)')
+    def mark_completed(self, request, queryset):
+        self._bulk_status(request, queryset, 'completado')
+
+    @admin.action(description='Cancelar (pendientes o activos)')
+    def mark_cancelled(self, request, queryset):
+        self._bulk_status(request, queryset, 'cancelado')
+
+
+@admin.register(SchedulerRun)
+class SchedulerRunAdmin(admin.ModelAdmin):
+    """Historial de rental/scheduler.py (solo lectura)"""
+    list_display = ['job', 'run_date', 'status', 'started_at', 'finished_at', 'stats']
+    list_filter = ['job', 'status']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# Usuarios: la búsqueda (y el autocompletado de clientes) usa el índice de rental/search.py
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin, BaseUserAdmin):
+    search_function = staticmethod(search_users)
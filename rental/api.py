@@ -0,0 +1,414 @@
+"""
+API JSON de solo lectura bajo ``/api/``: vehículos, categorías y los
+alquileres del cliente con sesión iniciada.
+
+- Las filas salen de proyecciones ``values()``; no se instancian modelos.
+- ``?fields=id,brand,daily_rate`` limita los campos de cada elemento.
+- Paginación por cursor sobre ``(created_at, id)``: la respuesta trae la URL
+  ``next`` (``?cursor=...``) mientras queden filas.
+- Cada vista tiene su versión asíncrona (prefijo ``a``, ORM asíncrono) que
+  ``rental.urls`` usa bajo ASGI (``ASYNC_VIEWS``); la lógica que no toca la
+  base de datos es común a las dos.
+- GET condicional: antes de leer la página, una consulta de agregados
+  (número de filas y ``updated_at`` máximo) da la ETag y el Last-Modified, así
+  que un cliente que sondea con ``If-None-Match``/``If-Modified-Since``
+  recibe un 304 sin que se serialice nada. En las búsquedas por fechas la
+  ETag incluye además la versión de disponibilidad (sube con cada alquiler,
+  ver ``catalog_cache``) y no se envía Last-Modified, porque las reservas no
+  cambian el ``updated_at`` de los vehículos.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_GET
+
+from .availability import available_vehicles
+from .catalog_cache import AVAILABILITY, aget_version, get_version
+from .forms import AvailabilityForm
+from .images import fallback_url
+from .models import Category, Rental, Vehicle
+from .pagination import decode_cursor, get_page_size, make_cursor, older_than, sort_key
+from .search import rank_vehicles
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def _image(row):
+    return default_storage.url(row['image']) if row['image'] else None
+
+
+def _thumbnail(row):
+    if not row['image']:
+        return None
+    return fallback_url(row['image_variants'], 640) or default_storage.url(row['image'])
+
+
+# Campo de la API -> ruta para values(), o (rutas, función que recibe la fila)
+VEHICLE_FIELDS = {
+    'id': 'id',
+    'license_plate': 'license_plate',
+    'brand': 'brand',
+    'model': 'model',
+    'year': 'year',
+    'category': 'category_id',
+    'category_name': 'category__name',
+    'transmission': 'transmission',
+    'daily_rate': 'daily_rate',
+    'capacity': 'capacity',
+    'status': 'status',
+    'description': 'description',
+    'image': (('image',), _image),
+    'thumbnail': (('image', 'image_variants'), _thumbnail),
+    'updated_at': 'updated_at',
+}
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'updated_at': 'updated_at',
+}
+RENTAL_FIELDS = {
+    'id': 'id',
+    'vehicle': 'vehicle_id',
+    'license_plate': 'vehicle__license_plate',
+    'brand': 'vehicle__brand',
+    'model': 'vehicle__model',
+    'start_date': 'start_date',
+    'end_date': 'end_date',
+    'days': 'days',
+    'daily_rate': 'daily_rate',
+    'total_amount': 'total_amount',
+    'status': 'status',
+    'notes': 'notes',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+def api_view(view):
+    """Solo GET; los ``ApiError`` se devuelven como JSON (vistas síncronas o asíncronas)"""
+    def error_response(exc):
+        body = {'error': str(exc)}
+        if exc.details:
+            body['details'] = exc.details
+        return JsonResponse(body, status=exc.status)
+
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            try:
+                return await view(request, *args, **kwargs)
+            except ApiError as exc:
+                return error_response(exc)
+    else:
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as exc:
+                return error_response(exc)
+    return require_GET(wraps(view)(wrapper))
+
+
+def api_login_required(view):
+    """Como ``login_required`` pero con un 401 en JSON en lugar de redirigir"""
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            if not (await request.auser()).is_authenticated:
+                raise ApiError('Se requiere iniciar sesión.', status=401)
+            return await view(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                raise ApiError('Se requiere iniciar sesión.', status=401)
+            return view(request, *args, **kwargs)
+    return wraps(view)(wrapper)
+
+
+# --- Proyección ---
+
+def parse_fields(params, spec):
+    """Campos pedidos en ``?fields=`` (todos si no se indica)"""
+    raw = params.get('fields')
+    if not raw:
+        return list(spec)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in spec]
+    if not names:
+        return list(spec)
+    if unknown:
+        raise ApiError('Campos desconocidos: ' + ', '.join(unknown) + '.', details={'fields': sorted(spec)})
+    return names
+
+
+def value_paths(spec, names, extra=()):
+    """Columnas que necesita ``values()`` para los campos pedidos"""
+    paths = dict.fromkeys(extra)
+    for name in names:
+        source = spec[name]
+        paths.update(dict.fromkeys((source,) if isinstance(source, str) else source[0]))
+    return list(paths)
+
+
+def serialize(row, spec, names):
+    item = {}
+    for name in names:
+        source = spec[name]
+        item[name] = row[source] if isinstance(source, str) else source[1](row)
+    return item
+
+
+# --- GET condicional ---
+
+def _aggregates(related):
+    aggregates = {'count': Count('pk'), 'updated': Max('updated_at')}
+    for path in related:
+        aggregates[f'updated_{path}'] = Max(f'{path}__updated_at')
+    return aggregates
+
+
+def _conditions(request, user, stats, extra, last_modified):
+    stamps = [value for key, value in stats.items() if key.startswith('updated') and value]
+    newest = max(stamps) if stamps else None
+
+    raw = '|'.join([request.get_full_path(), extra, str(stats['count']), newest.isoformat() if newest else ''])
+    headers = {'ETag': quote_etag(hashlib.sha1(raw.encode()).hexdigest())}
+    timestamp = None
+    if last_modified and newest:
+        timestamp = int(newest.timestamp())
+        headers['Last-Modified'] = http_date(timestamp)
+    response = get_conditional_response(request, etag=headers['ETag'], last_modified=timestamp)
+    if response is not None:
+        response = finish(response, headers, user)
+    return response, headers, stats['count']
+
+
+def check_conditions(request, queryset, related=(), extra='', last_modified=True):
+    """Calcula ETag/Last-Modified con una consulta de agregados.
+
+    Devuelve ``(respuesta 304 o None, cabeceras, número de filas)``.
+    ``related``: relaciones cuyo ``updated_at`` también cambia el resultado
+    (p. ej. el nombre de la categoría de un vehículo).
+    """
+    stats = queryset.order_by().aggregate(**_aggregates(related))
+    return _conditions(request, request.user, stats, extra, last_modified)
+
+
+async def acheck_conditions(request, queryset, related=(), extra='', last_modified=True):
+    stats = await queryset.order_by().aaggregate(**_aggregates(related))
+    return _conditions(request, await request.auser(), stats, extra, last_modified)
+
+
+def finish(response, headers, user):
+    for name, value in headers.items():
+        response[name] = value
+    # Los clientes guardan la respuesta pero la revalidan siempre (ETag)
+    if user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def _cursor_query(request, queryset, paths):
+    key = sort_key(queryset)
+    value = request.GET.get('cursor')
+    cursor = decode_cursor(value, key)
+    if value and cursor is None:
+        raise ApiError('Cursor no válido.')
+    page_size = get_page_size(request.GET)
+    paths = list(dict.fromkeys([*paths, key]))
+    query = older_than(queryset.order_by(f'-{key}', '-id'), cursor, key).values(*paths)[:page_size + 1]
+    return query, page_size, key
+
+
+def _cursor_result(request, rows, page_size, key):
+    next_url = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        params = request.GET.copy()
+        params['cursor'] = make_cursor(rows[-1][key], rows[-1]['id'])
+        next_url = request.build_absolute_uri('?' + params.urlencode())
+    return rows, next_url
+
+
+def cursor_page(request, queryset, paths):
+    """Una página ``(-created_at, -id)`` a partir de ``?cursor=``; devuelve (filas, URL siguiente).
+
+    Con la relevancia de una búsqueda anotada, ``(-search_score, -id)``.
+    """
+    query, page_size, key = _cursor_query(request, queryset, paths)
+    return _cursor_result(request, list(query), page_size, key)
+
+
+async def acursor_page(request, queryset, paths):
+    query, page_size, key = _cursor_query(request, queryset, paths)
+    return _cursor_result(request, [row async for row in query], page_size, key)
+
+
+def paginated_response(request, queryset, spec, related=(), extra='', last_modified=True):
+    names = parse_fields(request.GET, spec)
+    not_modified, headers, _ = check_conditions(request, queryset, related, extra, last_modified)
+    if not_modified is not None:
+        return not_modified
+    rows, next_url = cursor_page(request, queryset, value_paths(spec, names, extra=('id', 'created_at')))
+    body = {'results': [serialize(row, spec, names) for row in rows], 'next': next_url}
+    return finish(JsonResponse(body), headers, request.user)
+
+
+async def apaginated_response(request, queryset, spec, related=(), extra='', last_modified=True):
+    names = parse_fields(request.GET, spec)
+    not_modified, headers, _ = await acheck_conditions(request, queryset, related, extra, last_modified)
+    if not_modified is not None:
+        return not_modified
+    rows, next_url = await acursor_page(request, queryset, value_paths(spec, names, extra=('id', 'created_at')))
+    body = {'results': [serialize(row, spec, names) for row in rows], 'next': next_url}
+    return finish(JsonResponse(body), headers, await request.auser())
+
+
+def int_param(params, name, minimum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ApiError(f'"{name}" debe ser un número entero.')
+    if minimum is not None and value < minimum:
+        raise ApiError(f'"{name}" debe ser mayor o igual a {minimum}.')
+    return value
+
+
+# --- Vistas ---
+
+def _vehicles_queryset(params):
+    form = AvailabilityForm(params)
+    if not form.is_valid():
+        raise ApiError('Rango de fechas no válido.', details=form.errors.get_json_data())
+    date_range = form.get_range()
+    if date_range:
+        queryset = available_vehicles(*date_range)
+    else:
+        queryset = Vehicle.objects.filter(status='disponible')
+
+    category_id = int_param(params, 'category')
+    if category_id is not None:
+        queryset = queryset.filter(category_id=category_id)
+    transmission = params.get('transmission')
+    if transmission:
+        if transmission not in dict(Vehicle.TRANSMISSION_CHOICES):
+            choices = [value for value, _ in Vehicle.TRANSMISSION_CHOICES]
+            raise ApiError('Transmisión no válida.', details={'transmission': choices})
+        queryset = queryset.filter(transmission=transmission)
+    capacity = int_param(params, 'capacity', minimum=1)
+    if capacity is not None:
+        queryset = queryset.filter(capacity__gte=capacity)
+    if params.get('search'):
+        queryset = rank_vehicles(queryset, params['search'])
+    return queryset, date_range
+
+
+@api_view
+def vehicles(request):
+    """Catálogo: ?category, ?transmission, ?capacity (mínima), ?search, ?start_date y ?end_date"""
+    queryset, date_range = _vehicles_queryset(request.GET)
+    if date_range:
+        return paginated_response(request, queryset, VEHICLE_FIELDS, related=('category',),
+                                  extra=f'availability={get_version(AVAILABILITY)}', last_modified=False)
+    return paginated_response(request, queryset, VEHICLE_FIELDS, related=('category',))
+
+
+@api_view
+async def avehicles(request):
+    queryset, date_range = _vehicles_queryset(request.GET)
+    if date_range:
+        return await apaginated_response(request, queryset, VEHICLE_FIELDS, related=('category',),
+                                         extra=f'availability={await aget_version(AVAILABILITY)}',
+                                         last_modified=False)
+    return await apaginated_response(request, queryset, VEHICLE_FIELDS, related=('category',))
+
+
+@api_view
+def vehicle_detail(request, pk):
+    names = parse_fields(request.GET, VEHICLE_FIELDS)
+    queryset = Vehicle.objects.filter(pk=pk)
+    not_modified, headers, count = check_conditions(request, queryset, related=('category',))
+    if not count:
+        raise ApiError('Vehículo no encontrado.', status=404)
+    if not_modified is not None:
+        return not_modified
+    row = queryset.values(*value_paths(VEHICLE_FIELDS, names)).get()
+    return finish(JsonResponse(serialize(row, VEHICLE_FIELDS, names)), headers, request.user)
+
+
+@api_view
+async def avehicle_detail(request, pk):
+    names = parse_fields(request.GET, VEHICLE_FIELDS)
+    queryset = Vehicle.objects.filter(pk=pk)
+    not_modified, headers, count = await acheck_conditions(request, queryset, related=('category',))
+    if not count:
+        raise ApiError('Vehículo no encontrado.', status=404)
+    if not_modified is not None:
+        return not_modified
+    row = await queryset.values(*value_paths(VEHICLE_FIELDS, names)).aget()
+    return finish(JsonResponse(serialize(row, VEHICLE_FIELDS, names)), headers, await request.auser())
+
+
+@api_view
+def categories(request):
+    """Todas las categorías (pocas filas: sin paginación)"""
+    names = parse_fields(request.GET, CATEGORY_FIELDS)
+    queryset = Category.objects.all()
+    not_modified, headers, _ = check_conditions(request, queryset)
+    if not_modified is not None:
+        return not_modified
+    rows = queryset.order_by('name').values(*value_paths(CATEGORY_FIELDS, names))
+    body = {'results': [serialize(row, CATEGORY_FIELDS, names) for row in rows]}
+    return finish(JsonResponse(body), headers, request.user)
+
+
+@api_view
+async def acategories(request):
+    names = parse_fields(request.GET, CATEGORY_FIELDS)
+    queryset = Category.objects.all()
+    not_modified, headers, _ = await acheck_conditions(request, queryset)
+    if not_modified is not None:
+        return not_modified
+    rows = queryset.order_by('name').values(*value_paths(CATEGORY_FIELDS, names))
+    body = {'results': [serialize(row, CATEGORY_FIELDS, names) async for row in rows]}
+    return finish(JsonResponse(body), headers, await request.auser())
+
+
+def _rentals_queryset(user, params):
+    queryset = Rental.objects.filter(client=user)
+    status = params.get('status')
+    if status:
+        if status not in dict(Rental.STATUS_CHOICES):
+            choices = [value for value, _ in Rental.STATUS_CHOICES]
+            raise ApiError('Estado no válido.', details={'status': choices})
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+@api_view
+@api_login_required
+def my_rentals(request):
+    """Alquileres del usuario con sesión iniciada; ?status para filtrar"""
+    queryset = _rentals_queryset(request.user, request.GET)
+    return paginated_response(request, queryset, RENTAL_FIELDS, related=('vehicle',))
+
+
+@api_view
+@api_login_required
+async def amy_rentals(request):
+    queryset = _rentals_queryset(await request.auser(), request.GET)
+    return await apaginated_response(request, queryset, RENTAL_FIELDS, related=('vehicle',))
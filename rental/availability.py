@@ -0,0 +1,88 @@
+"""
+Disponibilidad de vehículos por rango de fechas.
+
+La ocupación se guarda por día en ``VehicleOccupancy`` (ver ``Rental.save``),
+así que saber qué vehículos están libres entre dos fechas es una sola consulta
+con subconsulta sobre el índice (día, vehículo).
+
+Los rangos son semiabiertos, [inicio, devolución): el día de devolución no
+se ocupa y otra reserva puede empezar ese mismo día.
+"""
+from django.utils import timezone
+
+from .models import Vehicle, VehicleOccupancy, Rental
+
+
+def busy_vehicle_ids(start_date, end_date):
+    """Subconsulta con los IDs de vehículos ocupados en algún día del rango"""
+    return VehicleOccupancy.objects.filter(
+        day__gte=start_date, day__lt=end_date
+    ).values('vehicle_id')
+
+
+def available_vehicles(start_date, end_date, queryset=None):
+    """Vehículos sin reservas activas entre ``start_date`` y ``end_date`` (sin incluirlo)"""
+    if queryset is None:
+        queryset = Vehicle.objects.all()
+    return queryset.exclude(status='mantenimiento').exclude(
+        id__in=busy_vehicle_ids(start_date, end_date)
+    )
+
+
+def is_vehicle_available(vehicle_id, start_date, end_date, exclude_rental_id=None):
+    """Indica si un vehículo está libre en el rango, ignorando opcionalmente un alquiler"""
+    qs = VehicleOccupancy.objects.filter(
+        vehicle_id=vehicle_id,
+        day__gte=start_date,
+        day__lt=end_date,
+    )
+    if exclude_rental_id is not None:
+        qs = qs.exclude(rental_id=exclude_rental_id)
+    return not qs.exists()
+
+
+def refresh_vehicle_status(vehicle):
+    """Recalcula ``Vehicle.status`` a partir de sus alquileres activos.
+
+    Un vehículo está 'alquilado' solo mientras tenga un alquiler en estado
+    'activo'; las reservas pendientes no lo ocultan del catálogo. Los vehículos
+    en mantenimiento no se tocan.
+    """
+    if vehicle.status == 'mantenimiento':
+        return vehicle
+    has_active = Rental.objects.filter(vehicle=vehicle, status='activo').exists()
+    new_status = 'alquilado' if has_active else 'disponible'
+    if vehicle.status != new_status:
+        vehicle.status = new_status
+        vehicle.save(update_fields=['status', 'updated_at'])
+    return vehicle
+
+
+def sync_vehicle_statuses(vehicle_ids=None, batch_size=1000):
+    """Versión masiva de ``refresh_vehicle_status``.
+
+    Dos sentencias ``UPDATE``: marca 'alquilado' los vehículos disponibles con
+    un alquiler activo y libera los alquilados que ya no tienen ninguno. Con
+    ``vehicle_ids`` solo se miran esos vehículos (por lotes de ``batch_size``);
+    sin él, toda la flota. Devuelve ``{(estado_anterior, estado_nuevo): n}``.
+    """
+    if vehicle_ids is None:
+        return _sync_statuses(Vehicle.objects.all(), Rental.objects.filter(status='activo'))
+    vehicle_ids = sorted(vehicle_ids)
+    changes = {('disponible', 'alquilado'): 0, ('alquilado', 'disponible'): 0}
+    for start in range(0, len(vehicle_ids), batch_size):
+        chunk = vehicle_ids[start:start + batch_size]
+        batch = _sync_statuses(
+            Vehicle.objects.filter(id__in=chunk), Rental.objects.filter(status='activo', vehicle_id__in=chunk),
+        )
+        for key, n in batch.items():
+            changes[key] += n
+    return changes
+
+
+def _sync_statuses(vehicles, active_rentals):
+    now = timezone.now()
+    active = active_rentals.values('vehicle_id')
+    rented = vehicles.filter(status='disponible', id__in=active).update(status='alquilado', updated_at=now)
+    released = vehicles.filter(status='alquilado').exclude(id__in=active).update(status='disponible', updated_at=now)
+    return {('disponible', 'alquilado'): rented, ('alquilado', 'disponible'): released}
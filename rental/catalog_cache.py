@@ -0,0 +1,163 @@
+"""
+Caché del catálogo público (``home`` y ``vehicles_list``).
+
+Se guarda el HTML ya renderizado de la grilla de vehículos por combinación
+de filtros y la lista de categorías. Las claves llevan un número de versión:
+
+- ``catalog``: sube al guardar o borrar un ``Vehicle`` o una ``Category``.
+- ``availability``: sube al guardar o borrar un ``Rental``; solo forma parte
+  de la clave de las búsquedas por fechas.
+- ``pricing``: sube al guardar o borrar una ``PricingRule`` o un
+  ``DurationDiscount``; invalida los presupuestos de ``rental/pricing.py`` y
+  las búsquedas por fechas (que muestran el total).
+
+Al subir la versión las entradas anteriores dejan de leerse y caducan solas
+(``CATALOG_CACHE_TIMEOUT``). Las versiones arrancan en una marca de tiempo,
+de modo que si el backend pierde la clave de versión no se reutilizan
+entradas viejas. Las actualizaciones masivas (``QuerySet.update``) no emiten
+señales: después de ellas hay que llamar a ``bump_catalog_version()``.
+
+Con ``LocMemCache`` cada proceso tiene su propia caché y sus propias
+versiones; con varios workers conviene un backend compartido.
+
+Las funciones con prefijo ``a`` son las versiones para vistas asíncronas
+(API de caché ``aget``/``aset`` y ORM asíncrono).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+from .models import Category
+
+CATALOG = 'catalog'
+AVAILABILITY = 'availability'
+PRICING = 'pricing'
+
+# Parámetros de la URL que cambian el contenido de la grilla
+GRID_PARAMS = ('category', 'search', 'transmission', 'start_date', 'end_date', 'after', 'before', 'page_size')
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _version_key(name):
+    return f'rental:version:{name}'
+
+
+def get_version(name):
+    cache = get_cache()
+    version = cache.get(_version_key(name))
+    if version is None:
+        cache.add(_version_key(name), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(name))
+    return version
+
+
+async def aget_version(name):
+    cache = get_cache()
+    version = await cache.aget(_version_key(name))
+    if version is None:
+        await cache.aadd(_version_key(name), time.time_ns(), timeout=None)
+        version = await cache.aget(_version_key(name))
+    return version
+
+
+def bump_version(name):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), time.time_ns(), timeout=None)
+
+
+def bump_catalog_version():
+    bump_version(CATALOG)
+
+
+def bump_availability_version():
+    bump_version(AVAILABILITY)
+
+
+def bump_pricing_version():
+    bump_version(PRICING)
+
+
+def _make_key(prefix, params, versions):
+    parts = [f'{name}={version}' for name, version in versions]
+    if params is not None:
+        parts.extend(f'{key}={value}' for key in GRID_PARAMS for value in params.getlist(key))
+    digest = hashlib.sha1('&'.join(parts).encode()).hexdigest()
+    return f'rental:{prefix}:{digest}'
+
+
+def cache_key(prefix, params=None, versions=(CATALOG,)):
+    return _make_key(prefix, params, [(name, get_version(name)) for name in versions])
+
+
+async def acache_key(prefix, params=None, versions=(CATALOG,)):
+    return _make_key(prefix, params, [(name, await aget_version(name)) for name in versions])
+
+
+def get_categories():
+    """Lista de categorías, cacheada hasta que cambie el catálogo"""
+    if not settings.CATALOG_CACHE_ENABLED:
+        return list(Category.objects.all())
+    cache = get_cache()
+    key = cache_key('categories')
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.all())
+        cache.set(key, categories, settings.CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+async def aget_categories():
+    if not settings.CATALOG_CACHE_ENABLED:
+        return [category async for category in Category.objects.all()]
+    cache = get_cache()
+    key = await acache_key('categories')
+    categories = await cache.aget(key)
+    if categories is None:
+        categories = [category async for category in Category.objects.all()]
+        await cache.aset(key, categories, settings.CATALOG_CACHE_TIMEOUT)
+    return categories
+
+
+def cached_fragment(prefix, params, template_name, build_context, versions=(CATALOG,)):
+    """HTML de un fragmento de plantilla, renderizado solo si no está en caché.
+
+    ``build_context`` se llama únicamente en un fallo de caché, así que las
+    consultas del fragmento tampoco se ejecutan en un acierto. Se renderiza
+    sin ``request``: el fragmento no puede depender del usuario.
+    """
+    if not settings.CATALOG_CACHE_ENABLED:
+        return render_to_string(template_name, build_context())
+    cache = get_cache()
+    key = cache_key(prefix, params, versions)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string(template_name, build_context())
+        cache.set(key, html, settings.CATALOG_CACHE_TIMEOUT)
+    return html
+
+
+async def acached_fragment(prefix, params, template_name, build_context, versions=(CATALOG,)):
+    """Como ``cached_fragment``, con ``build_context`` asíncrono.
+
+    El contexto debe llegar ya evaluado (listas, no querysets): el render se
+    hace en el bucle de eventos y una consulta perezosa en la plantilla
+    fallaría con ``SynchronousOnlyOperation``.
+    """
+    if not settings.CATALOG_CACHE_ENABLED:
+        return render_to_string(template_name, await build_context())
+    cache = get_cache()
+    key = await acache_key(prefix, params, versions)
+    html = await cache.aget(key)
+    if html is None:
+        html = render_to_string(template_name, await build_context())
+        await cache.aset(key, html, settings.CATALOG_CACHE_TIMEOUT)
+    return html
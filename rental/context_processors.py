@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from .roles import get_role, is_staff_role
+
+
+def roles(request):
+    """Rol del usuario para las plantillas (se resuelve solo si se usa)"""
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    return {
+        'user_role': SimpleLazyObject(lambda: get_role(user)),
+        'is_staff_role': SimpleLazyObject(lambda: is_staff_role(user)),
+    }
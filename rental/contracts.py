@@ -0,0 +1,154 @@
+"""
+Contratos en PDF con caché en disco.
+
+Cada PDF se guarda en ``CONTRACT_CACHE_DIR`` con un nombre derivado del
+alquiler, su ``updated_at`` y ``CONTRACT_TEMPLATE_VERSION``; mientras el
+alquiler no cambie se sirve el archivo existente (y el mismo valor sirve como
+ETag). Los renders pendientes se ejecutan en un pool de procesos
+(``CONTRACT_RENDER_WORKERS``; 0 para renderizar en el propio proceso), lo que
+acota el uso de CPU y permite generar varios contratos en paralelo.
+
+``contract_status`` no espera al pool: encarga el render y la vista del
+contrato responde 202 hasta que el archivo esté en caché. El ZIP
+(``build_contracts_zip``) sí espera a todos sus contratos.
+"""
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .pdf_worker import render_pdf
+
+_pool = None
+_pool_lock = threading.Lock()
+# Renders encargados por este proceso (ruta -> Future) y errores aún no informados
+_pending = {}
+_errors = {}
+_pending_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.CONTRACT_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def cache_dir():
+    path = Path(settings.CONTRACT_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def contract_etag(rental):
+    """Huella del contrato: cambia si cambia el alquiler o la versión de la plantilla"""
+    raw = f"{rental.pk}:{rental.updated_at.isoformat()}:{settings.CONTRACT_TEMPLATE_VERSION}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def contract_path(rental):
+    return cache_dir() / f"{rental.pk}-{contract_etag(rental)}.pdf"
+
+
+def _submit(html):
+    args = (
+        html,
+        settings.STATIC_URL, str(settings.STATIC_ROOT),
+        settings.MEDIA_URL, str(settings.MEDIA_ROOT),
+    )
+    if settings.CONTRACT_RENDER_WORKERS <= 0:
+        return render_pdf(*args)
+    return _get_pool().submit(render_pdf, *args)
+
+
+def _store(rental_pk, path, pdf_bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp, path)
+    # Eliminar versiones anteriores del mismo contrato
+    for old in path.parent.glob(f"{rental_pk}-*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+
+def get_contract_pdfs(rentals):
+    """Devuelve {rental.pk: ruta} generando en paralelo los que no están en caché"""
+    paths = {}
+    pending = {}
+    for rental in rentals:
+        path = contract_path(rental)
+        if path.exists():
+            paths[rental.pk] = path
+        else:
+            html = render_to_string('rental/rental_contract.html', {'rental': rental})
+            pending[rental.pk] = (rental, _submit(html))
+    for pk, (rental, job) in pending.items():
+        pdf_bytes = job if isinstance(job, bytes) else job.result()
+        paths[pk] = _store(pk, contract_path(rental), pdf_bytes)
+    return paths
+
+
+def _finish(rental_pk, path, future):
+    try:
+        _store(rental_pk, path, future.result())
+    except Exception as exc:
+        with _pending_lock:
+            _errors[path] = str(exc) or repr(exc)
+    finally:
+        # Después de guardar: quien pregunte entre medias no vuelve a encargarlo
+        with _pending_lock:
+            _pending.pop(path, None)
+
+
+def contract_status(rental):
+    """Estado del PDF sin esperar al render: ('listo', ruta), ('pendiente', None) o ('error', mensaje).
+
+    Si no está en caché lo encarga al pool (una vez por proceso). Con
+    ``CONTRACT_RENDER_WORKERS = 0`` se genera aquí mismo.
+    """
+    path = contract_path(rental)
+    if path.exists():
+        return 'listo', path
+    if settings.CONTRACT_RENDER_WORKERS <= 0:
+        return 'listo', get_contract_pdf(rental)
+    with _pending_lock:
+        if path in _errors:
+            return 'error', _errors.pop(path)
+        if path in _pending:
+            return 'pendiente', None
+        html = render_to_string('rental/rental_contract.html', {'rental': rental})
+        future = _pending[path] = _submit(html)
+    # Fuera del cerrojo: si ya terminó, el callback se ejecuta ahora mismo
+    future.add_done_callback(partial(_finish, rental.pk, path))
+    return 'pendiente', None
+
+
+def get_contract_pdf(rental):
+    """Ruta del PDF del contrato (de la caché o recién generado)"""
+    return get_contract_pdfs([rental])[rental.pk]
+
+
+def build_contracts_zip(rentals):
+    """Archivo temporal con un ZIP de los contratos, listo para servir"""
+    paths = get_contract_pdfs(rentals)
+    tmp = tempfile.TemporaryFile()
+    # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+    with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for pk, path in sorted(paths.items()):
+            archive.write(path, arcname=f"contrato_{pk}.pdf")
+    tmp.seek(0)
+    return tmp
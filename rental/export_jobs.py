@@ -0,0 +1,155 @@
+"""
+Exportaciones XLSX en segundo plano.
+
+Las exportaciones grandes se ejecutan en un pool de hilos local al proceso.
+El estado de cada trabajo (progreso, archivo generado) se guarda como JSON
+junto al archivo en ``EXPORT_JOBS_DIR``, de modo que cualquier worker puede
+consultarlo y servir la descarga. ``EXPORT_MAX_CONCURRENT`` limita cuántas
+exportaciones se generan a la vez en cada proceso.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.http import QueryDict
+
+from .exports import write_rentals_xlsx
+from .forms import RentalFilterForm
+from .models import Rental
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _max_concurrent():
+    return getattr(settings, 'EXPORT_MAX_CONCURRENT', 2)
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_concurrent(), thread_name_prefix='export')
+            _slots = threading.BoundedSemaphore(_max_concurrent())
+        return _executor
+
+
+def jobs_dir():
+    path = Path(settings.EXPORT_JOBS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _state_path(job_id):
+    return jobs_dir() / f'{job_id}.json'
+
+
+def file_path(job_id):
+    return jobs_dir() / f'{job_id}.xlsx'
+
+
+def _write_state(job_id, **changes):
+    state = get_job(job_id) or {}
+    state.update(changes)
+    tmp = _state_path(job_id).with_suffix('.json.tmp')
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, _state_path(job_id))
+    return state
+
+
+def get_job(job_id):
+    """Estado del trabajo o None si no existe"""
+    try:
+        return json.loads(_state_path(job_id).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# Restos de escrituras a medias: '.xlsx.part' del XLSX y '.json.tmp' del estado
+_LEFTOVER_SUFFIXES = ('.part', '.tmp')
+
+
+def purge_expired_jobs():
+    """Limpia los archivos de trabajos sin cambios en ``EXPORT_JOB_TTL`` segundos.
+
+    Se borran los XLSX, los estados terminados y los temporales que dejó un
+    worker muerto a mitad de la exportación. Un estado que sigue pendiente o
+    en proceso se marca como error (y se borrará pasado otro TTL).
+    """
+    limit = time.time() - getattr(settings, 'EXPORT_JOB_TTL', 24 * 3600)
+    for path in jobs_dir().iterdir():
+        if path.suffix not in ('.json', '.xlsx', *_LEFTOVER_SUFFIXES):
+            continue
+        try:
+            if path.stat().st_mtime >= limit:
+                continue
+        except FileNotFoundError:
+            continue
+        state = get_job(path.stem) if path.suffix == '.json' else None
+        if state and state.get('status') in ('pendiente', 'en_proceso'):
+            _write_state(path.stem, status='error', error='La exportación se interrumpió.')
+        else:
+            path.unlink(missing_ok=True)
+
+
+def start_export_job(user, params, total):
+    """Encola una exportación XLSX; devuelve el ID o None si no hay cupo"""
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        return None
+    job_id = str(uuid.uuid4())
+    try:
+        purge_expired_jobs()
+        _write_state(
+            job_id,
+            id=job_id,
+            owner=user.pk,
+            status='pendiente',
+            processed=0,
+            total=total,
+            params=params.urlencode(),
+            created=time.time(),
+        )
+        executor.submit(_run_in_worker, job_id)
+    except Exception:
+        _slots.release()
+        raise
+    return job_id
+
+
+def _run_in_worker(job_id):
+    try:
+        run_export_job(job_id)
+    finally:
+        # El hilo del pool no pasa por el ciclo de request: cerrar su conexión
+        connection.close()
+        _slots.release()
+
+
+def run_export_job(job_id):
+    """Genera el XLSX del trabajo y actualiza su progreso"""
+    state = get_job(job_id)
+    form = RentalFilterForm(QueryDict(state['params']))
+    rentals = form.filter_queryset(Rental.objects.all())
+    _write_state(job_id, status='en_proceso')
+
+    partial = file_path(job_id).with_suffix('.xlsx.part')
+    try:
+        with open(partial, 'wb') as fh:
+            processed = write_rentals_xlsx(
+                rentals, fh,
+                progress=lambda n: _write_state(job_id, processed=n),
+            )
+        os.replace(partial, file_path(job_id))
+    except Exception as exc:
+        partial.unlink(missing_ok=True)
+        _write_state(job_id, status='error', error=str(exc))
+        raise
+    return _write_state(job_id, status='listo', processed=processed, total=max(processed, state['total']))
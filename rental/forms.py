@@ -1,7 +1,14 @@
+from datetime import timedelta
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import Vehicle, Category, Rental, UserProfile
+from .catalog_cache import bump_catalog_version
+from .images import update_vehicle_variants, variants_are_current
+from .search import search_rentals
+from .rollups import month_end, month_start
+from .widgets import AutocompleteSelect
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -37,6 +44,37 @@ class UserRegistrationForm(UserCreationForm):
         return user
 
 
+class PinnedObjectField(forms.Field):
+    """Objeto fijado por la vista (p. ej. el vehículo de la URL) en un campo oculto.
+
+    No renderiza opciones ni consulta la base de datos: la vista ya buscó el
+    objeto por PK y aquí solo se comprueba que el formulario envía esa misma
+    clave.
+    """
+    widget = forms.HiddenInput
+    default_error_messages = {
+        'invalid_choice': 'Seleccione una opción válida.',
+    }
+
+    def __init__(self, obj, **kwargs):
+        self.obj = obj
+        kwargs.setdefault('initial', obj.pk)
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        return getattr(value, 'pk', value)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if str(value) != str(self.obj.pk):
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+        return self.obj
+
+    def has_changed(self, initial, data):
+        return str(self.prepare_value(initial)) != str(data)
+
+
 class VehicleForm(forms.ModelForm):
     """Formulario para vehículos"""
     class Meta:
@@ -44,6 +82,7 @@ class VehicleForm(forms.ModelForm):
         fields = ['license_plate', 'brand', 'model', 'year', 'category', 'transmission', 
                   'daily_rate', 'capacity', 'status', 'image', 'description']
         widgets = {
+            'category': AutocompleteSelect('autocomplete_categories', attrs={'class': 'form-select'}),
             'description': forms.Textarea(attrs={'rows': 3}),
         }
 
@@ -58,6 +97,32 @@ class VehicleForm(forms.ModelForm):
                 raise forms.ValidationError('Ya existe un vehículo con esta placa.')
         return license_plate
 
+    def save(self, commit=True):
+        vehicle = super().save(commit=commit)
+        if commit and not variants_are_current(vehicle):
+            update_vehicle_variants(vehicle)
+            bump_catalog_version()
+        return vehicle
+
+
+class VehicleImportForm(forms.Form):
+    """Carga masiva de vehículos desde CSV o XLSX"""
+    file = forms.FileField(label='Archivo (.csv o .xlsx)')
+    create_categories = forms.BooleanField(
+        required=False, label='Crear las categorías que no existan',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+    dry_run = forms.BooleanField(
+        required=False, label='Solo validar (no guardar)',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        if not file.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError('Formato no soportado: use un archivo .csv o .xlsx.')
+        return file
+
 
 class CategoryForm(forms.ModelForm):
     """Formulario para categorías"""
@@ -85,15 +150,23 @@ class RentalForm(forms.ModelForm):
         model = Rental
         fields = ['vehicle', 'start_date', 'end_date', 'notes']
         widgets = {
+            'vehicle': AutocompleteSelect('autocomplete_vehicles', attrs={'class': 'form-select'}),
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
             'notes': forms.Textarea(attrs={'rows': 3}),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, vehicle=None, check_overlap=True, **kwargs):
         super().__init__(*args, **kwargs)
-        # Solo mostrar vehículos disponibles
-        self.fields['vehicle'].queryset = Vehicle.objects.filter(status='disponible')
+        self.instance.check_overlap = check_overlap
+        if vehicle is not None:
+            # Vehículo fijado por la vista (rental_create): campo oculto, sin
+            # cargar la flota para el select
+            self.fields['vehicle'] = PinnedObjectField(vehicle, label=self.fields['vehicle'].label)
+        else:
+            # La disponibilidad por fechas se valida en Rental.clean; aquí solo se
+            # excluyen los vehículos fuera de servicio
+            self.fields['vehicle'].queryset = Vehicle.objects.exclude(status='mantenimiento')
 
 
 class RentalUpdateForm(forms.ModelForm):
@@ -126,3 +199,99 @@ class RentalFilterForm(forms.Form):
         widget=forms.DateInput(attrs={'type': 'date'}),
         label='Hasta'
     )
+
+    def filter_queryset(self, rentals):
+        """Aplica los filtros válidos a un queryset de alquileres"""
+        if not self.is_valid():
+            return rentals
+        search = self.cleaned_data.get('search')
+        status = self.cleaned_data.get('status')
+        start_date = self.cleaned_data.get('start_date')
+        end_date = self.cleaned_data.get('end_date')
+
+        if search:
+            rentals = search_rentals(rentals, search)
+        if status:
+            rentals = rentals.filter(status=status)
+        if start_date:
+            rentals = rentals.filter(start_date__gte=start_date)
+        if end_date:
+            rentals = rentals.filter(end_date__lte=end_date)
+        return rentals
+
+
+class AvailabilityForm(forms.Form):
+    """Rango de fechas para consultar disponibilidad de vehículos"""
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+        label='Desde'
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'}),
+        label='Hasta'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date <= start_date:
+            raise forms.ValidationError('La fecha de devolución debe ser posterior a la fecha de inicio.')
+        return cleaned_data
+
+    def get_range(self):
+        """Devuelve (inicio, fin) si el rango es válido y completo, o None"""
+        if not self.is_valid():
+            return None
+        start_date = self.cleaned_data.get('start_date')
+        end_date = self.cleaned_data.get('end_date')
+        if start_date and end_date:
+            return start_date, end_date
+        return None
+
+
+class ReportFilterForm(forms.Form):
+    """Rango de meses y categoría de la página de reportes"""
+    DEFAULT_MONTHS = 24
+
+    start_month = forms.DateField(
+        required=False,
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month'}, format='%Y-%m'),
+        label='Desde'
+    )
+    end_month = forms.DateField(
+        required=False,
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month'}, format='%Y-%m'),
+        label='Hasta'
+    )
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(),
+        required=False,
+        empty_label='Todas las categorías',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        label='Categoría'
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_month = cleaned_data.get('start_month')
+        end_month = cleaned_data.get('end_month')
+        if start_month and end_month and end_month < start_month:
+            raise forms.ValidationError('El mes final no puede ser anterior al inicial.')
+        return cleaned_data
+
+    def get_filters(self, today):
+        """(primer día, último día, categoría); por defecto los últimos 24 meses"""
+        data = self.cleaned_data if self.is_valid() else {}
+        end = data.get('end_month') or today
+        start = data.get('start_month')
+        if start is None:
+            start = month_start(end)
+            for _ in range(self.DEFAULT_MONTHS - 1):
+                start = month_start(start - timedelta(days=1))
+        # Meses completos
+        return month_start(start), month_end(end), data.get('category')
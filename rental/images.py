@@ -0,0 +1,114 @@
+"""
+Variantes redimensionadas de ``Vehicle.image``.
+
+Al guardar la imagen de un vehículo se generan copias WebP a varios anchos
+(``IMAGE_VARIANT_WIDTHS``, sin ampliar nunca el original) y se guardan en
+``IMAGE_VARIANTS_DIR`` con el hash del contenido original en el nombre
+(``<hash>-<ancho>.webp``): la misma imagen no se procesa dos veces y las URL
+se pueden cachear indefinidamente. En ``Vehicle.image_variants`` queda el
+hash, el tamaño original y la ruta de cada variante, con lo que las plantillas
+arman ``srcset`` sin tocar el disco.
+
+``build_variants`` no usa la base de datos, así que el comando
+``build_image_variants`` lo ejecuta en paralelo para rellenar los vehículos
+existentes.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+def variant_widths(original_width):
+    """Anchos a generar para una imagen: los configurados menores que el original"""
+    widths = [w for w in sorted(settings.IMAGE_VARIANT_WIDTHS) if w < original_width]
+    if not widths or widths[-1] < original_width <= max(settings.IMAGE_VARIANT_WIDTHS):
+        # Completar con el ancho original en lugar de ampliar la imagen
+        widths.append(original_width)
+    return widths
+
+
+def variant_name(digest, width):
+    return f"{settings.IMAGE_VARIANTS_DIR.rstrip('/')}/{digest}-{width}.webp"
+
+
+def build_variants(name):
+    """Genera (si faltan) las variantes WebP de un archivo del storage.
+
+    Devuelve el dict que se guarda en ``Vehicle.image_variants``.
+    """
+    with default_storage.open(name, 'rb') as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        width, height = image.size
+
+        variants = {}
+        for target in variant_widths(width):
+            path = variant_name(digest, target)
+            if not default_storage.exists(path):
+                resized = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS
+                )
+                buffer = BytesIO()
+                resized.save(buffer, 'WEBP', quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants[str(target)] = path
+
+    return {'source': name, 'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def update_vehicle_variants(vehicle):
+    """Regenera las variantes de un vehículo y las guarda sin disparar señales"""
+    if vehicle.image:
+        info = build_variants(vehicle.image.name)
+    else:
+        info = {}
+    # updated_at también cambia: las ETag de la API dependen de él
+    type(vehicle).objects.filter(pk=vehicle.pk).update(image_variants=info, updated_at=timezone.now())
+    vehicle.image_variants = info
+    return info
+
+
+def variants_are_current(vehicle):
+    info = vehicle.image_variants or {}
+    if not vehicle.image:
+        return not info
+    return info.get('source') == vehicle.image.name and bool(info.get('variants'))
+
+
+def srcset(info):
+    """Atributo ``srcset`` ('url 320w, url 640w') a partir de ``image_variants``"""
+    variants = (info or {}).get('variants') or {}
+    return ', '.join(
+        f"{default_storage.url(path)} {width}w"
+        for width, path in sorted(variants.items(), key=lambda item: int(item[0]))
+    )
+
+
+def fallback_url(info, max_width):
+    """URL de la variante más pequeña que cubre ``max_width`` (o la mayor disponible)"""
+    variants = (info or {}).get('variants') or {}
+    if not variants:
+        return None
+    widths = sorted(int(width) for width in variants)
+    chosen = next((width for width in widths if width >= max_width), widths[-1])
+    return default_storage.url(variants[str(chosen)])
+
+
+def orphaned_variants(referenced):
+    """Archivos de ``IMAGE_VARIANTS_DIR`` que ningún vehículo usa"""
+    directory = settings.IMAGE_VARIANTS_DIR.rstrip('/')
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [f"{directory}/{name}" for name in files if f"{directory}/{name}" not in referenced]
@@ -0,0 +1,69 @@
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rental.models import Category
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+
+
+class Command(BaseCommand):
+    help = "Mide peticiones/segundo de home y vehicles_list sin y con la caché del catálogo."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Peticiones por URL y escenario.')
+        parser.add_argument('--backend', choices=sorted(BACKENDS), action='append',
+                            help='Backend de caché a medir (se puede repetir). Por defecto locmem y file.')
+        parser.add_argument('--username', help='Usuario con el que se navega el catálogo (por defecto el primero).')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by('id')
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No hay un usuario activo para iniciar sesión.')
+
+        urls = [reverse('home'), reverse('vehicles_list'), reverse('vehicles_list') + '?transmission=automatica']
+        category = Category.objects.order_by('id').first()
+        if category:
+            urls.append(reverse('vehicles_list') + f'?category={category.pk}')
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scenarios = [('sin caché', 'locmem', False)]
+            scenarios += [(f'caché {name}', name, True) for name in options['backend'] or ['locmem', 'file']]
+            results = []
+            for label, backend, enabled in scenarios:
+                caches = {'default': {'BACKEND': BACKENDS[backend], 'LOCATION': cache_dir}}
+                with override_settings(CACHES=caches, CATALOG_CACHE_ENABLED=enabled, ALLOWED_HOSTS=['*']):
+                    results.append((label, self.run_scenario(user, urls, options['requests'])))
+
+        baseline = results[0][1]
+        self.stdout.write(f"{'URL':<45} " + ' '.join(f'{label:>16}' for label, _ in results))
+        for url in urls:
+            row = ' '.join(f'{rates[url]:>12.1f} r/s' for _, rates in results)
+            self.stdout.write(f'{url:<45} {row}')
+        for label, rates in results[1:]:
+            speedup = sum(rates.values()) / sum(baseline.values())
+            self.stdout.write(self.style.SUCCESS(f'{label}: x{speedup:.1f} frente a sin caché'))
+
+    def run_scenario(self, user, urls, count):
+        client = Client()
+        client.force_login(user)
+        rates = {}
+        for url in urls:
+            client.get(url)  # calentar (y poblar la caché)
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{url} respondió {response.status_code}')
+            rates[url] = count / (time.perf_counter() - start)
+        return rates
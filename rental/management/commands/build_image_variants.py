@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from rental.catalog_cache import bump_catalog_version
+from rental.images import build_variants, orphaned_variants, variants_are_current
+from rental.models import Vehicle
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes WebP de las imágenes de vehículos que aún no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Imágenes procesadas en paralelo (Pillow libera el GIL al redimensionar).')
+        parser.add_argument('--force', action='store_true',
+                            help='Recalcular también los vehículos que ya tienen variantes.')
+        parser.add_argument('--prune', action='store_true',
+                            help='Eliminar variantes que ya no usa ningún vehículo.')
+
+    def handle(self, *args, **options):
+        vehicles = Vehicle.objects.order_by('id').only('id', 'image', 'image_variants')
+        pending = [
+            vehicle for vehicle in vehicles.iterator(chunk_size=500)
+            if options['force'] or not variants_are_current(vehicle)
+        ]
+        done = errors = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            # Los hilos solo leen y escriben archivos; la base de datos se actualiza aquí
+            futures = {
+                executor.submit(build_variants, vehicle.image.name): vehicle
+                for vehicle in pending if vehicle.image
+            }
+            for future in as_completed(futures):
+                vehicle = futures[future]
+                try:
+                    info = future.result()
+                except Exception as exc:
+                    errors += 1
+                    self.stderr.write(f"{vehicle.pk}: {vehicle.image.name}: {exc}")
+                    continue
+                Vehicle.objects.filter(pk=vehicle.pk).update(image_variants=info, updated_at=timezone.now())
+                done += 1
+        cleared = Vehicle.objects.filter(pk__in=[v.pk for v in pending if not v.image]).update(image_variants={}, updated_at=timezone.now())
+        if done or cleared:
+            bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Variantes generadas para {done} vehículos ({cleared} sin imagen, {errors} errores)."
+        ))
+
+        if options['prune']:
+            referenced = set()
+            for info in Vehicle.objects.values_list('image_variants', flat=True).iterator(chunk_size=2000):
+                referenced.update((info or {}).get('variants', {}).values())
+            orphans = orphaned_variants(referenced)
+            for name in orphans:
+                default_storage.delete(name)
+            self.stdout.write(f"Variantes huérfanas eliminadas: {len(orphans)}.")
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rental.models import Rental
+from rental.services import BULK_BATCH_SIZE, bulk_update_status
+
+
+class Command(BaseCommand):
+    help = ("Completa los alquileres activos cuya fecha de devolución ya pasó y libera sus vehículos "
+            "(pensado para ejecutarse cada noche).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Fecha de corte AAAA-MM-DD (por defecto hoy): se cierran los que terminaron antes.')
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument('--cancel-pending', action='store_true',
+                            help='Cancelar también las reservas pendientes que terminaron sin activarse.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar, sin modificar nada.')
+
+    def handle(self, *args, **options):
+        try:
+            cutoff = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--date debe tener el formato AAAA-MM-DD.')
+
+        jobs = [('completado', Rental.objects.filter(status='activo', end_date__lt=cutoff))]
+        if options['cancel_pending']:
+            jobs.append(('cancelado', Rental.objects.filter(status='pendiente', end_date__lt=cutoff)))
+
+        for new_status, rentals in jobs:
+            if options['dry_run']:
+                self.stdout.write(f"{rentals.count()} alquileres pasarían a '{new_status}'.")
+                continue
+
+            def progress(done, total, new_status=new_status):
+                self.stdout.write(f"  {new_status}: {done}/{total}")
+
+            updated = bulk_update_status(rentals, new_status, batch_size=options['batch_size'], progress=progress)
+            self.stdout.write(self.style.SUCCESS(f"{updated} alquileres pasaron a '{new_status}'."))
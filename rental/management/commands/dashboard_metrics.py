@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from rental.metrics import get_dashboard_metrics, rebuild_metrics
+
+
+class Command(BaseCommand):
+    help = "Muestra las métricas precalculadas del dashboard o las reconstruye con --rebuild."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recalcula todas las métricas desde Rental y Vehicle (backfill o tras cargas masivas).',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_metrics()
+            self.stdout.write(self.style.SUCCESS(f"Métricas reconstruidas: {count} registros."))
+
+        data = get_dashboard_metrics()
+        self.stdout.write(f"Vehículos: {data['total_vehicles']} (disponibles: {data['available_vehicles']})")
+        self.stdout.write(f"Alquileres activos: {data['active_rentals']}")
+        self.stdout.write(f"Ingresos totales: {data['total_revenue']}")
+        for item in data['status_distribution']:
+            self.stdout.write(f"  {item['status']}: {item['count']}")
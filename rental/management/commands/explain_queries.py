@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from rental.availability import available_vehicles
+from rental.metrics import RENTALS_BY_VEHICLE
+from rental.models import Category, DashboardMetric, Rental, Vehicle, VehicleOccupancy
+
+# Marcadores de uso de índice en los planes de cada motor
+INDEX_MARKERS = ('USING INDEX', 'USING COVERING INDEX', 'USING INTEGER PRIMARY KEY', 'USING PRIMARY KEY',
+                 'Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+FULL_SCAN_MARKERS = ('Seq Scan',)
+
+
+def uses_index(plan):
+    """True si el plan usa índices y no recorre tablas completas"""
+    lines = plan.splitlines()
+    if any(marker in line for line in lines for marker in FULL_SCAN_MARKERS):
+        return False
+    # SQLite: 'SCAN tabla' sin 'USING ... INDEX' es un recorrido completo
+    if any('SCAN ' in line and 'USING' not in line and 'VIRTUAL TABLE' not in line for line in lines):
+        return False
+    return any(marker in plan for marker in INDEX_MARKERS)
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN sobre la consulta principal de cada vista e informa si usa índices."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Muestra el plan completo de cada consulta.')
+
+    def queries(self):
+        today = timezone.localdate()
+        vehicle_id = Vehicle.objects.values_list('id', flat=True).first() or 1
+        category_id = Category.objects.values_list('id', flat=True).first() or 1
+        client_id = User.objects.values_list('id', flat=True).first() or 1
+        keyset = ('-created_at', '-id')
+        return [
+            ('home', Vehicle.objects.filter(status='disponible').select_related('category')[:6]),
+            ('vehicles_list (filtros)', Vehicle.objects.filter(
+                status='disponible', category_id=category_id, transmission='manual'
+            ).order_by(*keyset)[:25]),
+            ('vehicles_list (fechas)', available_vehicles(today, today + timedelta(days=7)).order_by(*keyset)[:25]),
+            ('rental_create (solapamiento)', VehicleOccupancy.objects.filter(
+                vehicle_id=vehicle_id, day__gte=today, day__lt=today + timedelta(days=7)
+            )),
+            ('my_rentals', Rental.objects.filter(client_id=client_id).select_related('vehicle').order_by(*keyset)[:25]),
+            ('rentals_manage', Rental.objects.select_related('client', 'vehicle').order_by(*keyset)[:25]),
+            ('rentals_manage (estado)', Rental.objects.filter(status='activo').select_related(
+                'client', 'vehicle'
+            ).order_by(*keyset)[:25]),
+            ('vehicles_manage', Vehicle.objects.select_related('category').order_by(*keyset)[:25]),
+            ('dashboard (recientes)', Rental.objects.select_related('client', 'vehicle')[:10]),
+            ('dashboard (top vehículos)', DashboardMetric.objects.filter(
+                name=RENTALS_BY_VEHICLE, value__gt=0
+            ).order_by('-value')[:5]),
+            ('estado del vehículo', Rental.objects.filter(vehicle_id=vehicle_id, status='activo')),
+        ]
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Motor: {connection.vendor}")
+        missing = 0
+        for name, queryset in self.queries():
+            plan = queryset.explain()
+            ok = uses_index(plan)
+            missing += not ok
+            label = self.style.SUCCESS('índice') if ok else self.style.WARNING('SIN ÍNDICE')
+            self.stdout.write(f"{label:>12}  {name}")
+            if options['verbose_plans'] or not ok:
+                for line in plan.splitlines():
+                    self.stdout.write(f"              {line}")
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} consulta(s) sin índice."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Todas las consultas usan índices."))
@@ -0,0 +1,305 @@
+"""
+Datos sintéticos a escala para pruebas de rendimiento.
+
+Genera categorías, clientes (con perfil), vehículos y alquileres de forma
+determinista a partir de ``--seed``. Las filas se insertan por lotes con
+``executemany`` sobre las columnas de cada modelo, sin instanciar modelos ni
+pasar por ``save()``/señales; por eso se pueden fijar ``created_at`` realistas
+y las métricas, índices de búsqueda y caché se reconstruyen al final.
+
+Los alquileres de cada vehículo se reparten en franjas consecutivas de la
+línea de tiempo, así que nunca se solapan. El estado depende de las fechas
+respecto a ``--today``: completados/cancelados en el pasado, activos en
+curso y pendientes en el futuro (solo estos dos ocupan días en
+``VehicleOccupancy``).
+
+Todos los registros llevan el prefijo ``--prefix`` (placas, usuarios y
+categorías), de modo que ``--purge`` puede borrarlos sin tocar el resto.
+"""
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from rental.availability import sync_vehicle_statuses
+from rental.catalog_cache import bump_availability_version, bump_catalog_version
+from rental.metrics import rebuild_metrics
+from rental.models import Category, Rental, UserProfile, Vehicle, VehicleOccupancy
+from rental.search import rebuild_search_index
+
+CATEGORY_NAMES = ['SUV', 'Sedán', 'Compacto', 'Camioneta', 'Deportivo', 'Van', 'Eléctrico', 'Híbrido', 'Lujo', 'Pickup']
+MODELS = {
+    'Toyota': ['Corolla', 'RAV4', 'Hilux', 'Yaris', 'Prado'],
+    'Chevrolet': ['Onix', 'Tracker', 'Spark', 'Captiva'],
+    'Renault': ['Logan', 'Sandero', 'Duster', 'Captur', 'Koleos'],
+    'Mazda': ['2', '3', 'CX-3', 'CX-5', 'CX-30'],
+    'Kia': ['Picanto', 'Rio', 'Sportage', 'Seltos'],
+    'Hyundai': ['Accent', 'Tucson', 'Creta', 'i10'],
+    'Nissan': ['Versa', 'March', 'Kicks', 'X-Trail', 'Frontier'],
+    'Honda': ['Civic', 'CR-V', 'HR-V', 'City'],
+    'Volkswagen': ['Gol', 'Polo', 'T-Cross', 'Tiguan'],
+    'Ford': ['Ranger', 'Escape', 'Explorer', 'Fiesta'],
+}
+FIRST_NAMES = ['Ana', 'Luis', 'María', 'Carlos', 'Laura', 'Andrés', 'Camila', 'Jorge', 'Valentina', 'Diego',
+               'Sofía', 'Juan', 'Daniela', 'Felipe', 'Paula', 'Santiago', 'Natalia', 'Mateo', 'Juliana', 'Sebastián']
+LAST_NAMES = ['Gómez', 'Rodríguez', 'Martínez', 'López', 'García', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Díaz',
+              'Vargas', 'Castro', 'Rojas', 'Moreno', 'Jiménez', 'Herrera', 'Ruiz', 'Álvarez', 'Mejía', 'Ortiz']
+# Duración en días: mayoría de alquileres cortos, cola de alquileres largos
+DURATIONS = [(1, 3, 50), (4, 7, 35), (8, 21, 15)]
+
+
+def _columns(model, fields):
+    return [model._meta.get_field(name).column for name in fields]
+
+
+class Command(BaseCommand):
+    help = "Genera datos sintéticos a escala (vehículos, clientes y alquileres sin solapes) para pruebas de carga."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--rentals', type=int, default=20000)
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--today', help='Fecha de referencia AAAA-MM-DD para los estados (por defecto hoy).')
+        parser.add_argument('--days-back', type=int, default=730, help='Días de historial.')
+        parser.add_argument('--days-ahead', type=int, default=60, help='Días de reservas futuras.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default='LD', help='Prefijo de placas, usuarios y categorías generados.')
+        parser.add_argument('--password', default='load12345',
+                            help='Contraseña de los clientes y del admin generados (para el script de carga).')
+        parser.add_argument('--purge', action='store_true', help='Borrar primero los datos con el mismo prefijo.')
+        parser.add_argument('--skip-index', action='store_true', help='No reconstruir los índices de búsqueda.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix'].upper()
+        try:
+            self.today = date.fromisoformat(options['today']) if options['today'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--today debe tener el formato AAAA-MM-DD.')
+        if options['vehicles'] <= 0 or options['users'] <= 0:
+            raise CommandError('Se necesitan al menos un vehículo y un cliente.')
+        span = options['days_back'] + options['days_ahead']
+        # Un alquiler ocupa al menos dos días (la devolución es posterior al inicio)
+        if options['rentals'] and span // -(-options['rentals'] // options['vehicles']) < 2:
+            raise CommandError('Demasiados alquileres por vehículo para el rango de fechas: aumente --days-back.')
+
+        start = time.perf_counter()
+        if options['purge']:
+            self.purge()
+        if Vehicle.objects.filter(license_plate__startswith=self.prefix).exists():
+            raise CommandError(f'Ya hay datos con el prefijo {self.prefix}: use --purge o cambie --prefix.')
+
+        categories = self.step('categorías', self.create_categories, options['categories'])
+        user_ids = self.step('clientes', self.create_users, options['users'], options['password'])
+        vehicles = self.step('vehículos', self.create_vehicles, options['vehicles'], categories)
+        self.step('alquileres', self.create_rentals, options['rentals'], vehicles, user_ids,
+                  options['days_back'], options['days_ahead'])
+        self.step('ocupación', self.create_occupancy)
+        self.step('estados de vehículos', sync_vehicle_statuses)
+        self.step('métricas', rebuild_metrics)
+        if not options['skip_index']:
+            self.step('índices de búsqueda', rebuild_search_index)
+        bump_catalog_version()
+        bump_availability_version()
+        self.stdout.write(self.style.SUCCESS(f'Datos generados en {time.perf_counter() - start:.1f}s.'))
+
+    # --- Utilidades ---
+
+    def step(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.stdout.write(f'  {label}: {time.perf_counter() - start:.1f}s')
+        return result
+
+    def insert(self, model, fields, rows):
+        """INSERT por lotes con ``executemany`` (sin modelos ni señales)"""
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(c) for c in _columns(model, fields))
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {table} ({columns}) VALUES ({placeholders})'
+        # Las fechas-hora se adaptan como lo haría el ORM (en SQLite: texto UTC)
+        datetimes = [
+            i for i, name in enumerate(fields)
+            if isinstance(model._meta.get_field(name), models.DateTimeField)
+        ]
+        adapt = connection.ops.adapt_datetimefield_value
+        batch = []
+        total = 0
+        with connection.cursor() as cursor:
+            for row in rows:
+                if datetimes:
+                    row = list(row)
+                    for i in datetimes:
+                        row[i] = adapt(row[i])
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    with transaction.atomic():
+                        cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                with transaction.atomic():
+                    cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def moment(self, day, hour, minute=0):
+        value = datetime.combine(day, dtime(hour, minute))
+        return timezone.make_aware(value) if settings.USE_TZ else value
+
+    def raw_delete(self, model, column, subquery):
+        """DELETE ... WHERE columna IN (subconsulta), sin cargar filas ni emitir señales"""
+        sql, params = subquery.query.sql_with_params()
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table} WHERE {connection.ops.quote_name(column)} IN ({sql})', params)
+            return cursor.rowcount
+
+    def purge(self):
+        vehicles = Vehicle.objects.filter(license_plate__startswith=self.prefix).values('id')
+        users = User.objects.filter(username__startswith=f'{self.prefix.lower()}_').values('id')
+        with transaction.atomic():
+            self.raw_delete(VehicleOccupancy, 'vehicle_id', vehicles)
+            self.raw_delete(VehicleOccupancy, 'rental_id', Rental.objects.filter(client_id__in=users).values('id'))
+            deleted = self.raw_delete(Rental, 'vehicle_id', vehicles)
+            deleted += self.raw_delete(Rental, 'client_id', users)
+            self.raw_delete(Vehicle, 'id', vehicles)
+            self.raw_delete(UserProfile, 'user_id', users)
+            self.raw_delete(User, 'id', users)
+            Category.objects.filter(name__startswith=f'{self.prefix} ', vehicle__isnull=True).delete()
+        self.stdout.write(f'  Datos con prefijo {self.prefix} eliminados ({deleted} alquileres).')
+
+    # --- Generadores ---
+
+    def create_categories(self, count):
+        now = timezone.now()
+        names = [
+            f'{self.prefix} {CATEGORY_NAMES[i % len(CATEGORY_NAMES)]}' + (f' {i // len(CATEGORY_NAMES) + 1}' if i >= len(CATEGORY_NAMES) else '')
+            for i in range(count)
+        ]
+        existing = set(Category.objects.filter(name__in=names).values_list('name', flat=True))
+        self.insert(Category, ['name', 'description', 'created_at', 'updated_at'], (
+            (name, 'Categoría generada para pruebas de carga.', now, now) for name in names if name not in existing
+        ))
+        return list(Category.objects.filter(name__in=names).order_by('id').values_list('id', flat=True))
+
+    def create_users(self, count, password):
+        rng = self.rng
+        now = timezone.now()
+        password_hash = make_password(password)  # un solo hash para todos
+        prefix = self.prefix.lower()
+        self.insert(User, [
+            'username', 'password', 'first_name', 'last_name', 'email',
+            'is_staff', 'is_superuser', 'is_active', 'date_joined',
+        ], (
+            (f'{prefix}_admin' if i == 0 else f'{prefix}_user{i:07d}', password_hash,
+             rng.choice(FIRST_NAMES), f'{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}',
+             f'{prefix}_user{i}@example.com', False, False, True,
+             now - timedelta(days=rng.randint(0, 1500)))
+            for i in range(count + 1)
+        ))
+        users = list(
+            User.objects.filter(username__startswith=f'{prefix}_').order_by('id').values_list('id', 'username')
+        )
+        self.insert(UserProfile, ['user', 'role', 'phone', 'address', 'identification'], (
+            (pk, 'admin' if username == f'{prefix}_admin' else 'cliente',
+             f'3{rng.randint(100000000, 199999999)}', f'Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}',
+             str(10000000 + pk))
+            for pk, username in users
+        ))
+        return [pk for pk, username in users if username != f'{prefix}_admin']
+
+    def create_vehicles(self, count, categories):
+        rng = self.rng
+        now = timezone.now()
+        brands = sorted(MODELS)
+        max_year = self.today.year + 1
+
+        def rows():
+            for i in range(count):
+                brand = rng.choice(brands)
+                status = 'mantenimiento' if rng.random() < 0.03 else 'disponible'
+                created = now - timedelta(days=rng.randint(0, 1000), seconds=rng.randint(0, 86399))
+                yield (
+                    f'{self.prefix}{i:07d}', brand, rng.choice(MODELS[brand]), rng.randint(max_year - 12, max_year),
+                    rng.choice(categories), rng.choice(('manual', 'automatica')),
+                    Decimal(rng.randrange(6000, 60000, 500)) / 100, rng.choice((2, 4, 5, 5, 5, 7, 8)),
+                    status, '{}', '', created, created,
+                )
+
+        self.insert(Vehicle, [
+            'license_plate', 'brand', 'model', 'year', 'category', 'transmission', 'daily_rate',
+            'capacity', 'status', 'image_variants', 'description', 'created_at', 'updated_at',
+        ], rows())
+        return list(
+            Vehicle.objects.filter(license_plate__startswith=self.prefix)
+            .order_by('id').values_list('id', 'daily_rate', 'status')
+        )
+
+    def sample_duration(self):
+        low, high, _ = self.rng.choices(DURATIONS, weights=[w for _, _, w in DURATIONS])[0]
+        return self.rng.randint(low, high)
+
+    def create_rentals(self, count, vehicles, user_ids, days_back, days_ahead):
+        rng = self.rng
+        now = timezone.now()
+        first_day = self.today - timedelta(days=days_back)
+        span = days_back + days_ahead
+        per_vehicle, extra = divmod(count, len(vehicles))
+        past_statuses, past_weights = ('completado', 'cancelado'), (90, 10)
+
+        def rows():
+            for index, (vehicle_id, rate, vehicle_status) in enumerate(vehicles):
+                n = per_vehicle + (1 if index < extra else 0)
+                if not n:
+                    continue
+                for k in range(n):
+                    # Cada alquiler (inicio y fin inclusive) cabe en su franja: sin solapes
+                    offset = k * span // n
+                    slot = (k + 1) * span // n - offset
+                    nights = min(self.sample_duration(), slot - 1)
+                    start = first_day + timedelta(days=offset + rng.randint(0, slot - 1 - nights))
+                    end = start + timedelta(days=nights)
+                    if end < self.today:
+                        status = rng.choices(past_statuses, weights=past_weights)[0]
+                    elif start <= self.today:
+                        status = 'completado' if vehicle_status == 'mantenimiento' else 'activo'
+                    else:
+                        status = 'cancelado' if rng.random() < 0.1 else 'pendiente'
+                    days = nights + 1
+                    created = min(now, self.moment(start - timedelta(days=rng.randint(0, 30)),
+                                                   rng.randint(7, 21), rng.randint(0, 59)))
+                    # Clientes frecuentes: sesgo hacia los primeros IDs
+                    client_id = user_ids[int(len(user_ids) * rng.random() ** 2)]
+                    yield (client_id, vehicle_id, start, end, days, rate, days * rate, status, '', created, created)
+
+        return self.insert(Rental, [
+            'client', 'vehicle', 'start_date', 'end_date', 'days', 'daily_rate', 'total_amount',
+            'status', 'notes', 'created_at', 'updated_at',
+        ], rows())
+
+    def create_occupancy(self):
+        open_rentals = (
+            Rental.objects.filter(vehicle__license_plate__startswith=self.prefix, status__in=Rental.ACTIVE_STATUSES)
+            .values_list('id', 'vehicle_id', 'start_date', 'end_date')
+        )
+
+        def rows():
+            for rental_id, vehicle_id, start, end in open_rentals.iterator(chunk_size=self.batch_size):
+                day = start
+                while day < end:
+                    yield (vehicle_id, rental_id, day)
+                    day += timedelta(days=1)
+
+        return self.insert(VehicleOccupancy, ['vehicle', 'rental', 'day'], rows())
+
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rental.vehicle_import import IMPORT_BATCH_SIZE, import_vehicles, write_error_report
+
+
+class Command(BaseCommand):
+    help = "Importa (crea o actualiza por placa) vehículos desde un archivo CSV o XLSX."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo .csv o .xlsx con cabecera (license_plate, brand, model, ...).')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Crear las categorías que no existan en lugar de rechazar la fila.')
+        parser.add_argument('--dry-run', action='store_true', help='Validar sin guardar nada.')
+        parser.add_argument('--report', help='Ruta del CSV con las filas rechazadas.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(result):
+            self.stdout.write(f"  {result.rows} filas leídas, {result.imported} válidas, {len(result.errors)} errores")
+
+        try:
+            with open(options['path'], 'rb') as fh:
+                result = import_vehicles(
+                    fh, options['path'],
+                    create_categories=options['create_categories'],
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                    progress=progress,
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options['report'] and result.errors:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as fh:
+                write_error_report(result, fh)
+        elif result.errors:
+            for line, plate, message in result.errors[:20]:
+                self.stderr.write(f"  fila {line} ({plate or 'sin placa'}): {message}")
+            if len(result.errors) > 20:
+                self.stderr.write(f"  ... {len(result.errors) - 20} errores más (use --report).")
+
+        prefix = 'Simulación: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{result.created} creados, {result.updated} actualizados, {len(result.errors)} rechazados "
+            f"en {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from rental.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los índices de búsqueda de vehículos y clientes (FTS5 en SQLite)."
+
+    def handle(self, *args, **options):
+        if rebuild_search_index():
+            self.stdout.write(self.style.SUCCESS("Índices de búsqueda reconstruidos."))
+        else:
+            self.stdout.write("Este motor de base de datos no usa índices FTS; no hay nada que reconstruir.")
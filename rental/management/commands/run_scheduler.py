@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rental.scheduler import run_forever, run_once
+from rental.services import BULK_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = ("Aplica las transiciones programadas de los alquileres: activa los pendientes que empiezan, "
+            "completa (o marca como vencidos) los activos que terminaron y sincroniza los vehículos. "
+            "Pensado para cron; con --loop se queda ejecutándolo cada --interval segundos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Fecha de corte AAAA-MM-DD (por defecto hoy).')
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar, sin modificar nada.')
+        parser.add_argument('--loop', action='store_true', help='Repetir hasta que se interrumpa (Ctrl+C).')
+        parser.add_argument('--interval', type=int, help='Segundos entre ejecuciones con --loop '
+                                                         '(por defecto SCHEDULER_INTERVAL).')
+
+    def handle(self, *args, **options):
+        try:
+            today = date.fromisoformat(options['date']) if options['date'] else None
+        except ValueError:
+            raise CommandError('--date debe tener el formato AAAA-MM-DD.')
+        if options['loop'] and (today or options['dry_run']):
+            raise CommandError('--loop no admite --date ni --dry-run.')
+
+        kwargs = {'batch_size': options['batch_size'], 'progress': self.progress}
+        if options['loop']:
+            try:
+                run_forever(interval=options['interval'], report=self.report, **kwargs)
+            except KeyboardInterrupt:
+                pass
+            return
+        self.report(run_once(today=today, dry_run=options['dry_run'], **kwargs))
+
+    def progress(self, new_status, done, total):
+        self.stdout.write(f"  {new_status}: {done}/{total}")
+
+    def report(self, stats):
+        if stats is None:
+            self.stdout.write(self.style.WARNING('Otra ejecución sigue en curso; no se hizo nada.'))
+            return
+        line = ' '.join(f'{key}={value}' for key, value in stats.items())
+        self.stdout.write(self.style.SUCCESS(line))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from rental.services import sync_vehicles
+
+
+class Command(BaseCommand):
+    help = ("Recalcula el estado de todos los vehículos según sus alquileres activos "
+            "(corrige estados desviados; los cambios masivos solo sincronizan sus vehículos).")
+
+    def handle(self, *args, **options):
+        changes = sync_vehicles()
+        self.stdout.write(self.style.SUCCESS(
+            f"{changes[('disponible', 'alquilado')]} vehículos pasaron a alquilado y "
+            f"{changes[('alquilado', 'disponible')]} a disponible."
+        ))
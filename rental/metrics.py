@@ -0,0 +1,183 @@
+"""
+Métricas del dashboard.
+
+Los agregados (vehículos por estado, alquileres por estado y por vehículo,
+ingresos por mes) se guardan en ``DashboardMetric`` y se mantienen de forma
+incremental con las señales de ``rental/signals.py``. El dashboard los lee
+con un par de consultas a una tabla pequeña en lugar de recorrer ``Rental``.
+
+Las actualizaciones masivas (``QuerySet.update``/``bulk_create``) no emiten
+señales: después de ellas hay que llamar a ``rebuild_metrics()`` o ejecutar
+``python manage.py dashboard_metrics --rebuild``.
+"""
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import DashboardMetric, Rental, Vehicle
+
+VEHICLES_BY_STATUS = 'vehicles_by_status'
+RENTALS_BY_STATUS = 'rentals_by_status'
+RENTALS_BY_VEHICLE = 'rentals_by_vehicle'
+REVENUE_BY_MONTH = 'revenue_by_month'
+
+TOP_VEHICLES = 5
+REVENUE_MONTHS_DAYS = 180
+
+
+def month_key(value):
+    """Clave 'AAAA-MM' en la zona horaria local, igual que TruncMonth"""
+    return timezone.localtime(value).strftime('%Y-%m')
+
+
+def bump(name, bucket, delta):
+    """Suma ``delta`` a una métrica, creándola si no existe"""
+    if not delta:
+        return
+    qs = DashboardMetric.objects.filter(name=name, bucket=bucket)
+    if qs.update(value=F('value') + delta, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            DashboardMetric.objects.create(name=name, bucket=bucket, value=delta)
+    except IntegrityError:
+        # Otra transacción la creó entre el update y el create
+        qs.update(value=F('value') + delta, updated_at=timezone.now())
+
+
+def vehicle_contribution(snapshot):
+    """Aporte de un vehículo (dict con 'status') a las métricas"""
+    if not snapshot:
+        return Counter()
+    return Counter({(VEHICLES_BY_STATUS, snapshot['status']): 1})
+
+
+def rental_contribution(snapshot):
+    """Aporte de un alquiler (dict con status, vehicle_id, total_amount, created_at)"""
+    if not snapshot:
+        return Counter()
+    contribution = Counter({
+        (RENTALS_BY_STATUS, snapshot['status']): 1,
+        (RENTALS_BY_VEHICLE, str(snapshot['vehicle_id'])): 1,
+    })
+    if snapshot['status'] == 'completado' and snapshot['total_amount']:
+        contribution[(REVENUE_BY_MONTH, month_key(snapshot['created_at']))] += Decimal(snapshot['total_amount'])
+    return contribution
+
+
+def apply_change(before, after):
+    """Aplica la diferencia entre dos aportes (``Counter``) a la tabla de métricas"""
+    deltas = Counter(after)
+    deltas.subtract(before)
+    for (name, bucket), delta in deltas.items():
+        bump(name, bucket, delta)
+
+
+def rebuild_metrics():
+    """Recalcula todas las métricas desde cero (backfill / reparación)"""
+    rows = []
+    for item in Vehicle.objects.order_by().values('status').annotate(n=Count('id')):
+        rows.append(DashboardMetric(name=VEHICLES_BY_STATUS, bucket=item['status'], value=item['n']))
+    for item in Rental.objects.order_by().values('status').annotate(n=Count('id')):
+        rows.append(DashboardMetric(name=RENTALS_BY_STATUS, bucket=item['status'], value=item['n']))
+    for item in Rental.objects.order_by().values('vehicle_id').annotate(n=Count('id')):
+        rows.append(DashboardMetric(name=RENTALS_BY_VEHICLE, bucket=str(item['vehicle_id']), value=item['n']))
+    monthly = (
+        Rental.objects.filter(status='completado')
+        .annotate(month=TruncMonth('created_at'))
+        .order_by()
+        .values('month')
+        .annotate(total=Sum('total_amount'))
+    )
+    for item in monthly:
+        rows.append(DashboardMetric(name=REVENUE_BY_MONTH, bucket=item['month'].strftime('%Y-%m'), value=item['total'] or 0))
+
+    with transaction.atomic():
+        DashboardMetric.objects.all().delete()
+        DashboardMetric.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _summary_rows():
+    return DashboardMetric.objects.exclude(name=RENTALS_BY_VEHICLE).values_list('name', 'bucket', 'value')
+
+
+def _top_rows():
+    # Top de vehículos: índice (name, -value) + una consulta por los vehículos
+    return (
+        DashboardMetric.objects.filter(name=RENTALS_BY_VEHICLE, value__gt=0)
+        .order_by('-value')
+        .values_list('bucket', 'value')[:TOP_VEHICLES]
+    )
+
+
+def _build_metrics(rows, top, vehicles):
+    """Contexto del dashboard a partir de las filas ya leídas"""
+    grouped = {VEHICLES_BY_STATUS: {}, RENTALS_BY_STATUS: {}, REVENUE_BY_MONTH: {}}
+    for name, bucket, value in rows:
+        grouped.setdefault(name, {})[bucket] = value
+
+    vehicles_by_status = grouped[VEHICLES_BY_STATUS]
+    rentals_by_status = grouped[RENTALS_BY_STATUS]
+    revenue_by_month = grouped[REVENUE_BY_MONTH]
+
+    first_month = month_key(timezone.now() - timedelta(days=REVENUE_MONTHS_DAYS))
+    monthly_revenue = [
+        {'month': month, 'total': float(total)}
+        for month, total in sorted(revenue_by_month.items())
+        if month >= first_month and total
+    ]
+
+    top_vehicles = []
+    for bucket, value in top:
+        vehicle = vehicles.get(int(bucket))
+        if vehicle is not None:
+            vehicle.rental_count = int(value)
+            top_vehicles.append(vehicle)
+
+    return {
+        'total_vehicles': int(sum(vehicles_by_status.values())),
+        'available_vehicles': int(vehicles_by_status.get('disponible', 0)),
+        'active_rentals': int(rentals_by_status.get('activo', 0)),
+        'total_revenue': sum(revenue_by_month.values(), Decimal('0')),
+        'top_vehicles': top_vehicles,
+        'monthly_revenue': monthly_revenue,
+        'status_distribution': [
+            {'status': status, 'count': int(count)}
+            for status, count in sorted(rentals_by_status.items())
+            if count
+        ],
+    }
+
+
+def get_dashboard_metrics():
+    """Métricas listas para el contexto del dashboard"""
+    rows = list(_summary_rows())
+    if not rows and Vehicle.objects.exists():
+        # Primera carga tras la migración: poblar la tabla
+        rebuild_metrics()
+        rows = list(_summary_rows())
+    top = list(_top_rows())
+    vehicles = Vehicle.objects.in_bulk([int(bucket) for bucket, _ in top])
+    return _build_metrics(rows, top, vehicles)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def aget_dashboard_metrics():
+    """Versión asíncrona: el resumen y el top de vehículos se piden a la vez"""
+    rows, top = await asyncio.gather(_alist(_summary_rows()), _alist(_top_rows()))
+    if not rows and await Vehicle.objects.aexists():
+        await sync_to_async(rebuild_metrics)()
+        rows, top = await asyncio.gather(_alist(_summary_rows()), _alist(_top_rows()))
+    vehicles = await Vehicle.objects.ain_bulk([int(bucket) for bucket, _ in top])
+    return _build_metrics(rows, top, vehicles)
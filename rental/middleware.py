@@ -0,0 +1,230 @@
+"""
+Instrumentación de peticiones.
+
+``RequestMetricsMiddleware`` registra por cada nombre de URL el tiempo total,
+el número y tiempo de consultas SQL, el tiempo de render de plantillas y el
+tamaño de la respuesta (en streaming sin ``Content-Length``, los bytes
+enviados, contados al cerrarla). Guarda una ventana móvil de muestras por vista para
+calcular percentiles (expuestos en formato Prometheus en
+``/dashboard/metrics/``) y escribe en el log ``rental.requests`` las
+peticiones que superan los umbrales, junto con su SQL repetido.
+
+Con ``REQUEST_METRICS_ENABLED = False`` el middleware se descarta al arrancar
+(``MiddlewareNotUsed``) y no añade ningún coste.
+"""
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger('rental.requests')
+
+_current = contextvars.ContextVar('rental_request_stats', default=None)
+_patch_lock = threading.Lock()
+_template_patched = False
+
+
+class RequestStats:
+    """Acumulador de una petición en curso"""
+
+    __slots__ = ('sql_count', 'sql_time', 'template_time', 'statements')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def record_sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+            self.statements[sql] += 1
+
+    def duplicated_sql(self, limit=5):
+        return [(sql, n) for sql, n in self.statements.most_common(limit) if n > 1]
+
+
+class MetricsRegistry:
+    """Ventana móvil de muestras por vista (thread-safe)"""
+
+    FIELDS = ('duration', 'sql_count', 'sql_time', 'template_time', 'response_bytes')
+
+    def __init__(self, window):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = defaultdict(lambda: [0, 0.0])  # peticiones, segundos acumulados
+
+    def add(self, view, sample):
+        with self.lock:
+            self.samples[view].append(sample)
+            total = self.totals[view]
+            total[0] += 1
+            total[1] += sample[0]
+
+    def snapshot(self):
+        with self.lock:
+            return (
+                {view: list(samples) for view, samples in self.samples.items()},
+                {view: tuple(total) for view, total in self.totals.items()},
+            )
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+            self.totals.clear()
+
+
+registry = MetricsRegistry(getattr(settings, 'REQUEST_METRICS_WINDOW', 1000))
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def render_prometheus():
+    """Métricas en formato de texto de Prometheus"""
+    samples, totals = registry.snapshot()
+    metrics = [
+        ('rental_request_duration_seconds', 'Tiempo total de la petición', 0),
+        ('rental_request_sql_queries', 'Consultas SQL por petición', 1),
+        ('rental_request_sql_seconds', 'Tiempo en SQL por petición', 2),
+        ('rental_request_template_seconds', 'Tiempo de render de plantillas por petición', 3),
+        ('rental_response_bytes', 'Tamaño de la respuesta', 4),
+    ]
+    lines = []
+    for name, help_text, field in metrics:
+        lines.append(f'# HELP {name} {help_text} (ventana móvil)')
+        lines.append(f'# TYPE {name} summary')
+        for view in sorted(samples):
+            values = sorted(sample[field] for sample in samples[view])
+            for q in QUANTILES:
+                lines.append(f'{name}{{view="{view}",quantile="{q}"}} {percentile(values, q):g}')
+            lines.append(f'{name}_sum{{view="{view}"}} {sum(values):g}')
+            lines.append(f'{name}_count{{view="{view}"}} {len(values)}')
+    lines.append('# HELP rental_requests_total Peticiones atendidas desde el arranque')
+    lines.append('# TYPE rental_requests_total counter')
+    for view in sorted(totals):
+        lines.append(f'rental_requests_total{{view="{view}"}} {totals[view][0]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _patch_template_render():
+    """Mide el render de plantillas del backend de Django (una vez por proceso)"""
+    global _template_patched
+    with _patch_lock:
+        if _template_patched:
+            return
+        from django.template.backends.django import Template
+
+        original = Template.render
+
+        def timed_render(self, context=None, request=None):
+            stats = _current.get()
+            if stats is None:
+                return original(self, context, request)
+            start = time.perf_counter()
+            try:
+                return original(self, context, request)
+            finally:
+                stats.template_time += time.perf_counter() - start
+
+        Template.render = timed_render
+        _template_patched = True
+
+
+class _StreamCounter:
+    """Cuenta los bytes de un contenido en streaming.
+
+    ``on_close(bytes)`` se llama una vez, cuando el servidor cierra la
+    respuesta (también si el cliente cortó la descarga).
+    """
+
+    def __init__(self, content, on_close):
+        self.content = content
+        self.on_close = on_close
+        self.size = 0
+
+    def close(self):
+        if self.on_close is not None:
+            on_close, self.on_close = self.on_close, None
+            on_close(self.size)
+
+
+class CountedStream(_StreamCounter):
+    def __iter__(self):
+        for chunk in self.content:
+            self.size += len(chunk)
+            yield chunk
+
+
+class AsyncCountedStream(_StreamCounter):
+    # Sin __iter__: Django trata como síncrono cualquier contenido iterable
+    async def __aiter__(self):
+        async for chunk in self.content:
+            self.size += len(chunk)
+            yield chunk
+
+
+class RequestMetricsMiddleware:
+    """Registra tiempos, SQL, plantillas y tamaño de respuesta por vista"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500)
+        self.slow_queries = getattr(settings, 'REQUEST_METRICS_SLOW_QUERIES', 20)
+        _patch_template_render()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(stats.record_sql):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return response
+        view = match.url_name
+
+        def record(size):
+            registry.add(view, (duration, stats.sql_count, stats.sql_time, stats.template_time, size))
+            if duration * 1000 >= self.slow_ms or stats.sql_count >= self.slow_queries:
+                duplicated = stats.duplicated_sql()
+                logger.warning(
+                    'Petición lenta %s %s [%s]: %.0f ms, %d consultas (%.0f ms SQL), %.0f ms plantillas, %d bytes%s',
+                    request.method, request.path, view, duration * 1000, stats.sql_count,
+                    stats.sql_time * 1000, stats.template_time * 1000, size,
+                    ''.join(f'\n  x{n}: {sql}' for sql, n in duplicated),
+                )
+
+        if not response.streaming:
+            record(len(response.content))
+        elif response.has_header('Content-Length'):
+            record(int(response['Content-Length']))
+        else:
+            # Sin Content-Length (CSV generado al vuelo): la muestra se
+            # registra al cerrar la respuesta, con los bytes realmente enviados
+            stream = AsyncCountedStream if response.is_async else CountedStream
+            response.streaming_content = stream(response.streaming_content, record)
+        return response
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_occupancy(apps, schema_editor):
+    """Genera la ocupación diaria de los alquileres pendientes y activos"""
+    Rental = apps.get_model('rental', 'Rental')
+    VehicleOccupancy = apps.get_model('rental', 'VehicleOccupancy')
+    batch = []
+    rentals = Rental.objects.filter(status__in=['pendiente', 'activo']).values_list(
+        'id', 'vehicle_id', 'start_date', 'end_date'
+    )
+    for rental_id, vehicle_id, start_date, end_date in rentals.iterator(chunk_size=2000):
+        day = start_date
+        while day <= end_date:
+            batch.append(VehicleOccupancy(vehicle_id=vehicle_id, rental_id=rental_id, day=day))
+            day += timedelta(days=1)
+        if len(batch) >= 5000:
+            VehicleOccupancy.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        VehicleOccupancy.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('rental', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='rental.rental', verbose_name='Alquiler')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='rental.vehicle', verbose_name='Vehículo')),
+            ],
+            options={
+                'verbose_name': 'Ocupación de Vehículo',
+                'verbose_name_plural': 'Ocupación de Vehículos',
+                'indexes': [models.Index(fields=['day', 'vehicle'], name='vehicle_occupancy_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'day'), name='unique_vehicle_occupancy_day')],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
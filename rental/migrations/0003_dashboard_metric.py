@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0002_vehicle_occupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Métrica')),
+                ('bucket', models.CharField(blank=True, max_length=50, verbose_name='Clave')),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica del Dashboard',
+                'verbose_name_plural': 'Métricas del Dashboard',
+                'indexes': [models.Index(fields=['name', '-value'], name='dashboard_metric_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('name', 'bucket'), name='unique_dashboard_metric')],
+            },
+        ),
+    ]
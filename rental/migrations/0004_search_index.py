@@ -0,0 +1,83 @@
+import re
+
+from django.db import migrations
+
+SQLITE_TOKENIZER = "tokenize = 'unicode61 remove_diacritics 2'"
+
+POSTGRES_TRIGRAM_INDEXES = [
+    ('rental_vehicle_brand_trgm', 'rental_vehicle', 'brand'),
+    ('rental_vehicle_model_trgm', 'rental_vehicle', 'model'),
+    ('rental_vehicle_plate_trgm', 'rental_vehicle', 'license_plate'),
+    ('auth_user_username_trgm', 'auth_user', 'username'),
+    ('auth_user_first_name_trgm', 'auth_user', 'first_name'),
+    ('auth_user_last_name_trgm', 'auth_user', 'last_name'),
+]
+
+TRANSMISSIONS = {'manual': 'Manual', 'automatica': 'Automática'}
+
+
+def plate_terms(plate):
+    plate = plate or ''
+    return ' '.join([plate, re.sub(r'\W', '', plate)] + re.findall(r'[^\W\d_]+|\d+', plate))
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in POSTGRES_TRIGRAM_INDEXES:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+            )
+        return
+    if connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS rental_vehicle_search USING fts5('
+        f'brand, model, license_plate, category, transmission, {SQLITE_TOKENIZER})'
+    )
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS rental_user_search USING fts5('
+        f'username, first_name, last_name, {SQLITE_TOKENIZER})'
+    )
+
+    Vehicle = apps.get_model('rental', 'Vehicle')
+    User = apps.get_model('auth', 'User')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO rental_vehicle_search (rowid, brand, model, license_plate, category, transmission) '
+            'VALUES (%s, %s, %s, %s, %s, %s)',
+            [
+                (pk, brand, model, plate_terms(plate), category, TRANSMISSIONS.get(transmission, transmission))
+                for pk, brand, model, plate, category, transmission in Vehicle.objects.values_list(
+                    'id', 'brand', 'model', 'license_plate', 'category__name', 'transmission'
+                ).iterator()
+            ],
+        )
+        cursor.executemany(
+            'INSERT INTO rental_user_search (rowid, username, first_name, last_name) VALUES (%s, %s, %s, %s)',
+            list(User.objects.values_list('id', 'username', 'first_name', 'last_name').iterator()),
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for name, _table, _column in POSTGRES_TRIGRAM_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS rental_vehicle_search')
+        schema_editor.execute('DROP TABLE IF EXISTS rental_user_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0003_dashboard_metric'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0006_vehicle_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nombre')),
+                ('start_date', models.DateField(verbose_name='Desde')),
+                ('end_date', models.DateField(verbose_name='Hasta')),
+                ('rate_multiplier', models.DecimalField(decimal_places=3, default=1, max_digits=5, verbose_name='Multiplicador')),
+                ('priority', models.IntegerField(default=0, verbose_name='Prioridad')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='rental.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Tarifa de temporada',
+                'verbose_name_plural': 'Tarifas de temporada',
+                'ordering': ['-priority', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DurationDiscount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_days', models.PositiveIntegerField(verbose_name='Días mínimos')),
+                ('percent', models.DecimalField(decimal_places=2, max_digits=5, verbose_name='Descuento (%)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='duration_discounts', to='rental.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Descuento por duración',
+                'verbose_name_plural': 'Descuentos por duración',
+                'ordering': ['-min_days'],
+                'constraints': [models.UniqueConstraint(fields=('category', 'min_days'), name='duration_discount_unique')],
+            },
+        ),
+    ]
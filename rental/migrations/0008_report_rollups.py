@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0007_pricing_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('fleet', models.PositiveIntegerField(default=0, verbose_name='Vehículos en flota')),
+                ('rented', models.PositiveIntegerField(default=0, verbose_name='Vehículos alquilados')),
+                ('rentals_started', models.PositiveIntegerField(default=0, verbose_name='Alquileres iniciados')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='rental.category', verbose_name='Categoría')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por categoría',
+                'verbose_name_plural': 'Resúmenes diarios por categoría',
+                'constraints': [models.UniqueConstraint(fields=('day', 'category'), name='unique_category_daily_stat')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleMonthlyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('rented_days', models.PositiveIntegerField(default=0, verbose_name='Días alquilado')),
+                ('rentals_started', models.PositiveIntegerField(default=0, verbose_name='Alquileres iniciados')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ingresos')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicle_stats', to='rental.category', verbose_name='Categoría')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='rental.vehicle', verbose_name='Vehículo')),
+            ],
+            options={
+                'verbose_name': 'Resumen mensual por vehículo',
+                'verbose_name_plural': 'Resúmenes mensuales por vehículo',
+                'indexes': [models.Index(fields=['month', 'category'], name='vehicle_monthly_category_idx')],
+                'constraints': [models.UniqueConstraint(fields=('month', 'vehicle'), name='unique_vehicle_monthly_stat')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0008_report_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50, verbose_name='Trabajo')),
+                ('run_date', models.DateField(verbose_name='Fecha de corte')),
+                ('status', models.CharField(choices=[('en_curso', 'En curso'), ('ok', 'Correcta'), ('error', 'Con error'), ('abandonada', 'Abandonada')], default='en_curso', max_length=20, verbose_name='Estado')),
+                ('stats', models.JSONField(blank=True, default=dict, verbose_name='Estadísticas')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='Inicio')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+            ],
+            options={
+                'verbose_name': 'Ejecución programada',
+                'verbose_name_plural': 'Ejecuciones programadas',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('status__in', ['pendiente', 'activo'])), fields=['status', 'end_date'], name='rental_open_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rental',
+            index=models.Index(condition=models.Q(('status', 'pendiente')), fields=['start_date'], name='rental_pending_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedulerrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('finished_at__isnull', True)), fields=('job',), name='unique_running_scheduler_job'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+# unaccent() es STABLE y no sirve en un índice: se envuelve en una función IMMUTABLE
+CREATE_FUNCTION = (
+    'CREATE OR REPLACE FUNCTION rental_unaccent(text) RETURNS text '
+    'LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT '
+    "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+)
+
+# Las mismas expresiones que Unaccent y CompactPlate en rental/search.py
+SEARCH_INDEXES = [
+    ('rental_vehicle_brand_search', 'rental_vehicle', 'rental_unaccent(lower(brand))'),
+    ('rental_vehicle_model_search', 'rental_vehicle', 'rental_unaccent(lower(model))'),
+    ('rental_vehicle_plate_search', 'rental_vehicle',
+     "regexp_replace(lower(license_plate), '[^a-z0-9]', '', 'g')"),
+    ('auth_user_username_search', 'auth_user', 'rental_unaccent(lower(username))'),
+    ('auth_user_first_name_search', 'auth_user', 'rental_unaccent(lower(first_name))'),
+    ('auth_user_last_name_search', 'auth_user', 'rental_unaccent(lower(last_name))'),
+]
+
+# Índices de la migración 0004, sobre UPPER(columna)
+OLD_TRIGRAM_INDEXES = [
+    ('rental_vehicle_brand_trgm', 'rental_vehicle', 'brand'),
+    ('rental_vehicle_model_trgm', 'rental_vehicle', 'model'),
+    ('rental_vehicle_plate_trgm', 'rental_vehicle', 'license_plate'),
+    ('auth_user_username_trgm', 'auth_user', 'username'),
+    ('auth_user_first_name_trgm', 'auth_user', 'first_name'),
+    ('auth_user_last_name_trgm', 'auth_user', 'last_name'),
+]
+
+
+def create_unaccent_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    schema_editor.execute(CREATE_FUNCTION)
+    for name, _table, _column in OLD_TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    for name, table, expression in SEARCH_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (({expression}) gin_trgm_ops)')
+
+
+def drop_unaccent_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _expression in SEARCH_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+    schema_editor.execute('DROP FUNCTION IF EXISTS rental_unaccent(text)')
+    for name, table, column in OLD_TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0009_scheduler_runs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_unaccent_indexes, drop_unaccent_indexes),
+    ]
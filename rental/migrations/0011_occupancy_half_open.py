@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import F
+
+
+def free_return_days(apps, schema_editor):
+    """El día de devolución ya no se ocupa: borra las filas de ese día"""
+    VehicleOccupancy = apps.get_model('rental', 'VehicleOccupancy')
+    VehicleOccupancy.objects.filter(day__gte=F('rental__end_date')).delete()
+
+
+def occupy_return_days(apps, schema_editor):
+    Rental = apps.get_model('rental', 'Rental')
+    VehicleOccupancy = apps.get_model('rental', 'VehicleOccupancy')
+    rentals = Rental.objects.filter(status__in=['pendiente', 'activo']).values_list('id', 'vehicle_id', 'end_date')
+    VehicleOccupancy.objects.bulk_create(
+        [VehicleOccupancy(rental_id=pk, vehicle_id=vehicle_id, day=end) for pk, vehicle_id, end in rentals.iterator()],
+        batch_size=2000, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0010_postgres_unaccent_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(free_return_days, occupy_return_days),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:37
+
+import time
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model('rental', 'PricingVersion').objects.create(pk=1, value=time.time_ns())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rental', '0011_occupancy_half_open'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de precios',
+                'verbose_name_plural': 'Versiones de precios',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from .images import fallback_url, srcset
 
 
 class Category(models.Model):
@@ -44,6 +46,8 @@ class Vehicle(models.Model):
     capacity = models.IntegerField(verbose_name="Capacidad de Pasajeros")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='disponible', verbose_name="Estado")
     image = models.ImageField(upload_to='vehicles/', blank=True, null=True, verbose_name="Imagen")
+    # Variantes WebP de la imagen (ver rental/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     description = models.TextField(blank=True, verbose_name="Descripción")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -52,10 +56,28 @@ class Vehicle(models.Model):
         verbose_name = "Vehículo"
         verbose_name_plural = "Vehículos"
         ordering = ['-created_at']
+        indexes = [
+            # Catálogo: filtros de vehicles_list
+            models.Index(fields=['status', 'category', 'transmission'], name='vehicle_status_cat_trans_idx'),
+            # Paginación por cursor (created_at, id), con y sin filtro de estado
+            models.Index(fields=['status', '-created_at', '-id'], name='vehicle_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='vehicle_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.model} ({self.license_plate})"
 
+    @property
+    def image_srcset(self):
+        return srcset(self.image_variants)
+
+    @property
+    def thumbnail_url(self):
+        """Variante para tarjetas; la imagen original si aún no hay variantes"""
+        if not self.image:
+            return None
+        return fallback_url(self.image_variants, 640) or self.image.url
+
     def clean(self):
         """Validaciones personalizadas"""
         if self.year > datetime.now().year + 1:
@@ -64,6 +86,111 @@ class Vehicle(models.Model):
             raise ValidationError({'daily_rate': 'La tarifa debe ser mayor a 0.'})
 
 
+class PricingQuerySet(models.QuerySet):
+    """Las operaciones masivas no emiten señales: suben aquí la versión de precios"""
+
+    def update(self, **kwargs):
+        from .pricing import bump_pricing_version
+
+        with transaction.atomic(using=self.db):
+            updated = super().update(**kwargs)
+            if updated:
+                bump_pricing_version()
+        return updated
+
+    def bulk_create(self, *args, **kwargs):
+        from .pricing import bump_pricing_version
+
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(*args, **kwargs)
+            if created:
+                bump_pricing_version()
+        return created
+
+    def bulk_update(self, *args, **kwargs):
+        from .pricing import bump_pricing_version
+
+        with transaction.atomic(using=self.db):
+            updated = super().bulk_update(*args, **kwargs)
+            if updated:
+                bump_pricing_version()
+        return updated
+
+
+class PricingVersion(models.Model):
+    """Versión de las reglas de precios: una sola fila (ver rental/pricing.py)"""
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión de precios"
+        verbose_name_plural = "Versiones de precios"
+
+
+class PricingRule(models.Model):
+    """Tarifa de temporada: multiplica la tarifa diaria en un rango de fechas.
+
+    Sin categoría se aplica a todos los vehículos; si un día lo cubren varias
+    reglas gana la de la categoría y, entre ellas, la de mayor prioridad (ver
+    rental/pricing.py).
+    """
+    name = models.CharField(max_length=100, verbose_name="Nombre")
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='pricing_rules',
+        verbose_name="Categoría",
+    )
+    start_date = models.DateField(verbose_name="Desde")
+    end_date = models.DateField(verbose_name="Hasta")
+    rate_multiplier = models.DecimalField(max_digits=5, decimal_places=3, default=1, verbose_name="Multiplicador")
+    priority = models.IntegerField(default=0, verbose_name="Prioridad")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PricingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Tarifa de temporada"
+        verbose_name_plural = "Tarifas de temporada"
+        ordering = ['-priority', '-id']
+
+    def __str__(self):
+        return f"{self.name} ({self.start_date} - {self.end_date}) x{self.rate_multiplier}"
+
+    def clean(self):
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'La fecha final no puede ser anterior a la inicial.'})
+        if self.rate_multiplier is not None and self.rate_multiplier <= 0:
+            raise ValidationError({'rate_multiplier': 'El multiplicador debe ser mayor a 0.'})
+
+
+class DurationDiscount(models.Model):
+    """Descuento por duración del alquiler (p. ej. 7 días: semanal, 30: mensual)"""
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, blank=True, related_name='duration_discounts',
+        verbose_name="Categoría",
+    )
+    min_days = models.PositiveIntegerField(verbose_name="Días mínimos")
+    percent = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Descuento (%)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = PricingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Descuento por duración"
+        verbose_name_plural = "Descuentos por duración"
+        ordering = ['-min_days']
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'min_days'], name='duration_discount_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.percent}% desde {self.min_days} días"
+
+    def clean(self):
+        if self.percent is not None and not 0 <= self.percent < 100:
+            raise ValidationError({'percent': 'El descuento debe estar entre 0 y 100.'})
+
+
 class UserProfile(models.Model):
     """Extensión del modelo User para roles"""
     ROLE_CHOICES = [
@@ -94,6 +221,8 @@ class Rental(models.Model):
         ('completado', 'Completado'),
         ('cancelado', 'Cancelado'),
     ]
+    # Estados que bloquean el vehículo en sus fechas
+    ACTIVE_STATUSES = ('pendiente', 'activo')
 
     client = models.ForeignKey(User, on_delete=models.PROTECT, related_name='rentals', verbose_name="Cliente")
     vehicle = models.ForeignKey(Vehicle, on_delete=models.PROTECT, related_name='rentals', verbose_name="Vehículo")
@@ -111,31 +240,252 @@ class Rental(models.Model):
         verbose_name = "Alquiler"
         verbose_name_plural = "Alquileres"
         ordering = ['-created_at']
+        indexes = [
+            # Reservas que bloquean el vehículo (pendiente/activo) por fechas
+            models.Index(
+                fields=['vehicle', 'start_date', 'end_date'],
+                condition=models.Q(status__in=['pendiente', 'activo']),
+                name='rental_open_vehicle_dates_idx',
+            ),
+            models.Index(fields=['vehicle', 'status'], name='rental_vehicle_status_idx'),
+            # my_rentals: alquileres del cliente, más recientes primero
+            models.Index(fields=['client', '-created_at', '-id'], name='rental_client_created_idx'),
+            # rentals_manage/dashboard: por estado y fecha de creación
+            models.Index(fields=['status', '-created_at', '-id'], name='rental_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='rental_created_idx'),
+            # rental/scheduler.py: abiertos que ya terminaron y pendientes que ya empezaron
+            models.Index(
+                fields=['status', 'end_date'],
+                condition=models.Q(status__in=['pendiente', 'activo']),
+                name='rental_open_end_date_idx',
+            ),
+            models.Index(
+                fields=['start_date'],
+                condition=models.Q(status='pendiente'),
+                name='rental_pending_start_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Alquiler #{self.id} - {self.vehicle} - {self.client.get_full_name()}"
 
+    # False cuando la reserva la guarda book_vehicle: la restricción única de
+    # VehicleOccupancy ya rechaza el solapamiento al insertar
+    check_overlap = True
+
     def clean(self):
         """Validaciones personalizadas"""
         if self.start_date and self.end_date:
             if self.end_date <= self.start_date:
                 raise ValidationError({'end_date': 'La fecha de devolución debe ser posterior a la fecha de inicio.'})
+            if not self.check_overlap:
+                return
             
-            # Verificar solapamiento de fechas
-            overlapping = Rental.objects.filter(
-                vehicle=self.vehicle,
-                status__in=['pendiente', 'activo']
-            ).exclude(pk=self.pk).filter(
-                models.Q(start_date__lte=self.end_date) & models.Q(end_date__gte=self.start_date)
-            )
+            # Verificar solapamiento de fechas contra la tabla de ocupación diaria
+            overlapping = VehicleOccupancy.objects.filter(
+                vehicle_id=self.vehicle_id,
+                day__gte=self.start_date,
+                day__lt=self.end_date,
+            ).exclude(rental_id=self.pk)
             
             if overlapping.exists():
                 raise ValidationError('El vehículo ya está reservado en estas fechas.')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._priced = instance._pricing_inputs()
+        return instance
+
+    def _pricing_inputs(self):
+        # Sin getattr: no cargar campos diferidos
+        return tuple(self.__dict__.get(field) for field in ('vehicle_id', 'start_date', 'end_date', 'daily_rate'))
+
+    def apply_quote(self):
+        """Días y monto total según las reglas de precios (rental/pricing.py)"""
+        from .pricing import quote_rate
+
+        quote = quote_rate(self.vehicle.category_id, self.daily_rate, self.start_date, self.end_date)
+        self.days = quote.days
+        self.total_amount = quote.total
+        return quote
+
     def save(self, *args, **kwargs):
-        """Calcular días y monto total antes de guardar"""
-        if self.start_date and self.end_date:
-            delta = self.end_date - self.start_date
-            self.days = delta.days + 1
-            self.total_amount = self.days * self.daily_rate
-        super().save(*args, **kwargs)
+        """Calcular días y monto total antes de guardar.
+
+        Solo al crear o si cambian el vehículo, las fechas o la tarifa: un
+        cambio de estado no vuelve a tarifar con las reglas vigentes.
+        """
+        if self.start_date and self.end_date and (
+            self._state.adding or self.total_amount is None
+            or self._pricing_inputs() != getattr(self, '_priced', None)
+        ):
+            self.apply_quote()
+        adding = self._state.adding
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                self.sync_occupancy()
+        except ValidationError:
+            if adding:
+                self.pk = None
+                self._state.adding = True
+            raise
+        self._priced = self._pricing_inputs()
+
+    def occupied_days(self):
+        """Días que el alquiler bloquea el vehículo: de ``start_date`` a ``end_date`` sin incluirlo.
+
+        El día de devolución queda libre para que otro cliente recoja el vehículo.
+        """
+        day = self.start_date
+        while day < self.end_date:
+            yield day
+            day += timedelta(days=1)
+
+    def sync_occupancy(self):
+        """Reescribe los días ocupados del alquiler según su estado actual"""
+        VehicleOccupancy.objects.filter(rental_id=self.pk).delete()
+        if self.status not in self.ACTIVE_STATUSES or not (self.start_date and self.end_date):
+            return
+        try:
+            VehicleOccupancy.objects.bulk_create([
+                VehicleOccupancy(vehicle_id=self.vehicle_id, rental_id=self.pk, day=day)
+                for day in self.occupied_days()
+            ])
+        except IntegrityError:
+            raise ValidationError('El vehículo ya está reservado en estas fechas.')
+
+
+class VehicleOccupancy(models.Model):
+    """Ocupación diaria de vehículos: un registro por vehículo y día reservado.
+
+    Se mantiene desde ``Rental.save`` y permite responder qué vehículos están
+    libres en un rango de fechas con una única consulta indexada. La
+    restricción única (vehículo, día) impide además dobles reservas.
+    """
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='occupancy', verbose_name="Vehículo")
+    rental = models.ForeignKey(Rental, on_delete=models.CASCADE, related_name='occupancy', verbose_name="Alquiler")
+    day = models.DateField(verbose_name="Día")
+
+    class Meta:
+        verbose_name = "Ocupación de Vehículo"
+        verbose_name_plural = "Ocupación de Vehículos"
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'day'], name='unique_vehicle_occupancy_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'vehicle'], name='vehicle_occupancy_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle} - {self.day}"
+
+
+class DashboardMetric(models.Model):
+    """Agregados precalculados del dashboard (contadores por nombre y clave).
+
+    Se actualizan de forma incremental con señales de ``Rental`` y ``Vehicle``
+    (ver ``rental/metrics.py``) y se reconstruyen con
+    ``python manage.py dashboard_metrics --rebuild``.
+    """
+    name = models.CharField(max_length=50, verbose_name="Métrica")
+    bucket = models.CharField(max_length=50, blank=True, verbose_name="Clave")
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Métrica del Dashboard"
+        verbose_name_plural = "Métricas del Dashboard"
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'bucket'], name='unique_dashboard_metric'),
+        ]
+        indexes = [
+            models.Index(fields=['name', '-value'], name='dashboard_metric_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}[{self.bucket}] = {self.value}"
+
+
+class CategoryDailyStat(models.Model):
+    """Resumen diario por categoría: flota, días alquilados e ingresos.
+
+    Lo escribe ``rental/rollups.py`` (``python manage.py rollup_reports``) y
+    lo lee la página de reportes.
+    """
+    day = models.DateField(verbose_name="Día")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_stats', verbose_name="Categoría")
+    fleet = models.PositiveIntegerField(default=0, verbose_name="Vehículos en flota")
+    rented = models.PositiveIntegerField(default=0, verbose_name="Vehículos alquilados")
+    rentals_started = models.PositiveIntegerField(default=0, verbose_name="Alquileres iniciados")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumen diario por categoría"
+        verbose_name_plural = "Resúmenes diarios por categoría"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='unique_category_daily_stat'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id} {self.day}: {self.rented}/{self.fleet}"
+
+
+class VehicleMonthlyStat(models.Model):
+    """Resumen mensual por vehículo: días alquilados e ingresos (ver rental/rollups.py)"""
+    month = models.DateField(verbose_name="Mes")
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='monthly_stats', verbose_name="Vehículo")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='vehicle_stats', verbose_name="Categoría")
+    rented_days = models.PositiveIntegerField(default=0, verbose_name="Días alquilado")
+    rentals_started = models.PositiveIntegerField(default=0, verbose_name="Alquileres iniciados")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ingresos")
+
+    class Meta:
+        verbose_name = "Resumen mensual por vehículo"
+        verbose_name_plural = "Resúmenes mensuales por vehículo"
+        constraints = [
+            models.UniqueConstraint(fields=['month', 'vehicle'], name='unique_vehicle_monthly_stat'),
+        ]
+        indexes = [
+            models.Index(fields=['month', 'category'], name='vehicle_monthly_category_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle_id} {self.month:%Y-%m}: {self.rented_days} días"
+
+
+class SchedulerRun(models.Model):
+    """Una ejecución de ``rental/scheduler.py`` con sus estadísticas.
+
+    La fila sin ``finished_at`` hace de cerrojo: la restricción única
+    condicional impide que haya dos ejecuciones en curso del mismo trabajo.
+    """
+    STATUS_CHOICES = [
+        ('en_curso', 'En curso'),
+        ('ok', 'Correcta'),
+        ('error', 'Con error'),
+        ('abandonada', 'Abandonada'),
+    ]
+
+    job = models.CharField(max_length=50, verbose_name="Trabajo")
+    run_date = models.DateField(verbose_name="Fecha de corte")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='en_curso', verbose_name="Estado")
+    stats = models.JSONField(default=dict, blank=True, verbose_name="Estadísticas")
+    error = models.TextField(blank=True, verbose_name="Error")
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name="Inicio")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin")
+
+    class Meta:
+        verbose_name = "Ejecución programada"
+        verbose_name_plural = "Ejecuciones programadas"
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['job'], condition=models.Q(finished_at__isnull=True), name='unique_running_scheduler_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.run_date} ({self.get_status_display()})"
@@ -0,0 +1,164 @@
+"""
+Paginación por cursor (keyset) sobre ``(created_at, id)``.
+
+En lugar de ``OFFSET``, cada página filtra a partir de la última fila de la
+anterior, así que la página 1000 cuesta lo mismo que la primera (con el índice
+compuesto correspondiente). No se ejecuta ``COUNT(*)``: se pide una fila de
+más para saber si hay página siguiente.
+
+Si el queryset trae la relevancia de una búsqueda (``search_score``, ver
+``rental/search.py``), el cursor es ``(search_score, id)``: primero los más
+relevantes.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+# Anotación de relevancia de rental/search.py:rank_vehicles
+SCORE = 'search_score'
+
+
+def sort_key(queryset):
+    """Campo del cursor: la relevancia de la búsqueda si está anotada, si no ``created_at``"""
+    return SCORE if SCORE in queryset.query.annotations else 'created_at'
+
+
+def make_cursor(value, pk):
+    value = value.isoformat() if isinstance(value, datetime) else repr(value)
+    raw = f"{value}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(obj, key='created_at'):
+    return make_cursor(getattr(obj, key), obj.pk)
+
+
+def decode_cursor(value, key='created_at'):
+    """Devuelve (valor de ``key``, id) o None si el cursor no es válido"""
+    if not value:
+        return None
+    try:
+        padded = value + '=' * (-len(value) % 4)
+        raw, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return (datetime.fromisoformat(raw) if key == 'created_at' else float(raw)), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def get_page_size(params, default=None):
+    """Tamaño de página desde ``?page_size=``, acotado por la configuración"""
+    default = default or settings.PAGINATION_PAGE_SIZE
+    try:
+        size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, settings.PAGINATION_MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    """Página de resultados con enlaces que conservan los filtros de la URL"""
+
+    def __init__(self, object_list, params, page_size, has_next, has_previous, key='created_at'):
+        self.object_list = object_list
+        self.key = key
+        self.params = params
+        self.page_size = page_size
+        self.has_next = has_next and bool(object_list)
+        self.has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _url(self, **cursor):
+        params = self.params.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params.update(cursor)
+        return '?' + params.urlencode()
+
+    @property
+    def next_url(self):
+        if self.has_next:
+            return self._url(after=encode_cursor(self.object_list[-1], self.key))
+        return None
+
+    @property
+    def previous_url(self):
+        if self.has_previous:
+            return self._url(before=encode_cursor(self.object_list[0], self.key))
+        return None
+
+    def size_url(self, size):
+        params = self.params.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params['page_size'] = size
+        return '?' + params.urlencode()
+
+    @property
+    def size_options(self):
+        return [
+            (size, self.size_url(size))
+            for size in settings.PAGINATION_PAGE_SIZE_OPTIONS
+            if size <= settings.PAGINATION_MAX_PAGE_SIZE
+        ]
+
+
+def older_than(queryset, cursor, key='created_at'):
+    """Filas posteriores a ``cursor`` en el orden ``(-key, -id)``"""
+    if not cursor:
+        return queryset
+    value, pk = cursor
+    return queryset.filter(Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk}))
+
+
+def _keyset_query(queryset, params, default_page_size):
+    """Consulta de la página pedida: (queryset con el límite, tamaño, cursor after, hacia atrás, campo)"""
+    key = sort_key(queryset)
+    page_size = get_page_size(params, default_page_size)
+    after = decode_cursor(params.get('after'), key)
+    before = decode_cursor(params.get('before'), key)
+
+    if before and not after:
+        value, pk = before
+        query = (
+            queryset.filter(Q(**{f'{key}__gt': value}) | Q(**{key: value, 'pk__gt': pk}))
+            .order_by(key, 'id')[:page_size + 1]
+        )
+        return query, page_size, after, True, key
+    query = older_than(queryset.order_by(f'-{key}', '-id'), after, key)[:page_size + 1]
+    return query, page_size, after, False, key
+
+
+def _keyset_page(rows, params, page_size, after, backwards, key):
+    if backwards:
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        return KeysetPage(rows, params, page_size, has_next=True, has_previous=has_previous, key=key)
+    has_next = len(rows) > page_size
+    return KeysetPage(rows[:page_size], params, page_size, has_next=has_next, has_previous=after is not None,
+                      key=key)
+
+
+def paginate_keyset(queryset, params, default_page_size=None):
+    """Pagina un queryset de más nuevo a más antiguo (o de más a menos relevante).
+
+    ``params`` es el ``QueryDict`` de la petición (``request.GET``); se leen
+    ``after``/``before`` (cursores) y ``page_size``, y el resto de parámetros
+    se conservan en los enlaces de la página.
+    """
+    query, page_size, after, backwards, key = _keyset_query(queryset, params, default_page_size)
+    return _keyset_page(list(query), params, page_size, after, backwards, key)
+
+
+async def apaginate_keyset(queryset, params, default_page_size=None):
+    """Versión asíncrona de ``paginate_keyset`` (ORM asíncrono)"""
+    query, page_size, after, backwards, key = _keyset_query(queryset, params, default_page_size)
+    return _keyset_page([row async for row in query], params, page_size, after, backwards, key)
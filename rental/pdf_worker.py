@@ -0,0 +1,40 @@
+"""
+Render de PDF con xhtml2pdf, pensado para ejecutarse en un pool de procesos.
+
+Este módulo no importa Django ni los modelos: los procesos hijos (arrancados
+con 'spawn') solo reciben el HTML ya renderizado y las rutas de STATIC/MEDIA.
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+
+
+@lru_cache(maxsize=256)
+def _local_path(uri, static_url, static_root, media_url, media_root):
+    """Ruta de disco de una URL de STATIC/MEDIA, o None"""
+    for url, root in ((static_url, static_root), (media_url, media_root)):
+        if url and uri.startswith(url):
+            return os.path.join(root, uri[len(url):])
+    return None
+
+
+def resolve_link(uri, static_url, static_root, media_url, media_root):
+    """Convierte URLs de STATIC/MEDIA en rutas de disco legibles por xhtml2pdf"""
+    path = _local_path(uri, static_url, static_root, media_url, media_root)
+    # La existencia no se memoriza: una imagen subida después debe resolverse.
+    # URLs absolutas (http/https) y archivos que no existen se devuelven tal cual
+    return path if path and os.path.exists(path) else uri
+
+
+def render_pdf(html, static_url, static_root, media_url, media_root):
+    """Devuelve los bytes del PDF generado a partir de ``html``"""
+    from xhtml2pdf import pisa
+
+    def link_callback(uri, rel):
+        return resolve_link(uri, static_url, static_root, media_url, media_root)
+
+    output = BytesIO()
+    result = pisa.CreatePDF(html, dest=output, link_callback=link_callback)
+    if result.err:
+        raise RuntimeError(f'xhtml2pdf devolvió {result.err} errores')
+    return output.getvalue()
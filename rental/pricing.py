@@ -0,0 +1,161 @@
+"""
+Cálculo de precios de alquiler.
+
+- Días: inclusivos (el de inicio y el de devolución cuentan). La ocupación
+  del vehículo, en cambio, deja libre el día de devolución (ver
+  rental/availability.py).
+- Cada día se cobra la tarifa diaria del vehículo por el multiplicador de la
+  ``PricingRule`` que lo cubra: primero las reglas de la categoría y luego
+  las generales, cada grupo por prioridad. Sin regla, el multiplicador es 1.
+- Sobre el subtotal se aplica el ``DurationDiscount`` con más días mínimos
+  alcanzados: el de la categoría o, si no tiene, el general.
+
+Las reglas se leen una vez por versión y los presupuestos se memorizan por
+(categoría, tarifa, fechas): todos los vehículos con la misma categoría y
+tarifa comparten entrada. ``quote_vehicles`` presupuesta una página entera
+del catálogo de una pasada.
+
+La versión es la fila de ``PricingVersion``, no una clave de la caché: con
+``LocMemCache`` cada proceso tiene la suya y solo el que guardó la regla se
+enteraría, y estos presupuestos acaban en ``Rental.total_amount``. La suben
+``bump_pricing_version`` desde las señales (``save``/``delete``) y
+``PricingQuerySet`` en ``update``, ``bulk_create`` y ``bulk_update``; leerla
+es una consulta por clave primaria. Toma un valor nuevo (``time_ns``) en cada
+cambio en lugar de sumar uno, para que una transacción revertida no deje en
+memoria presupuestos con una versión que luego se repita. La versión
+``pricing`` de catalog_cache solo invalida la grilla ya renderizada.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+import time
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from . import catalog_cache
+from .models import DurationDiscount, PricingRule, PricingVersion
+
+CENT = Decimal('0.01')
+ONE = Decimal('1')
+QUOTE_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Quote:
+    days: int
+    daily_rate: Decimal
+    subtotal: Decimal
+    discount_percent: Decimal
+    discount: Decimal
+    total: Decimal
+
+    @property
+    def average_daily_rate(self):
+        return (self.total / self.days).quantize(CENT, ROUND_HALF_UP)
+
+
+class PricingTable:
+    """Reglas de una versión, en memoria"""
+
+    def __init__(self, rules, discounts):
+        # categoría (None: generales) -> [(desde, hasta, multiplicador)], por prioridad
+        self.rules = defaultdict(list)
+        for category_id, start, end, multiplier in rules:
+            self.rules[category_id].append((start, end, multiplier))
+        # categoría -> [(días mínimos, porcentaje)], de mayor a menor
+        self.discounts = defaultdict(list)
+        for category_id, min_days, percent in discounts:
+            self.discounts[category_id].append((min_days, percent))
+        self._multipliers = {}
+
+    def multipliers(self, category_id, start, end):
+        """Multiplicador de cada día del rango (memorizado por categoría y fechas)"""
+        key = (category_id, start, end)
+        if key not in self._multipliers:
+            if len(self._multipliers) >= QUOTE_CACHE_SIZE:
+                self._multipliers.clear()
+            rules = self.rules.get(category_id, []) + self.rules.get(None, [])
+            # Solo las reglas que tocan el rango
+            rules = [rule for rule in rules if rule[0] <= end and rule[1] >= start]
+            result = []
+            day = start
+            while day <= end:
+                result.append(next((m for first, last, m in rules if first <= day <= last), ONE))
+                day += timedelta(days=1)
+            self._multipliers[key] = result
+        return self._multipliers[key]
+
+    def discount_percent(self, category_id, days):
+        for rows in (self.discounts.get(category_id), self.discounts.get(None)):
+            if rows:
+                return next((percent for min_days, percent in rows if days >= min_days), Decimal(0))
+        return Decimal(0)
+
+    def quote(self, category_id, daily_rate, start, end):
+        multipliers = self.multipliers(category_id, start, end)
+        subtotal = sum((daily_rate * m for m in multipliers), Decimal(0)).quantize(CENT, ROUND_HALF_UP)
+        percent = self.discount_percent(category_id, len(multipliers))
+        discount = (subtotal * percent / 100).quantize(CENT, ROUND_HALF_UP)
+        return Quote(len(multipliers), daily_rate, subtotal, percent, discount, subtotal - discount)
+
+
+@lru_cache(maxsize=1)
+def _load_table(version):
+    rules = PricingRule.objects.order_by('-priority', '-id').values_list(
+        'category_id', 'start_date', 'end_date', 'rate_multiplier',
+    )
+    discounts = DurationDiscount.objects.order_by('-min_days').values_list('category_id', 'min_days', 'percent')
+    return PricingTable(list(rules), list(discounts))
+
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _quote(version, category_id, daily_rate, start, end):
+    return _load_table(version).quote(category_id, daily_rate, start, end)
+
+
+def pricing_version():
+    """Versión vigente de las reglas y descuentos (None si la fila no existe)"""
+    return PricingVersion.objects.filter(pk=1).values_list('value', flat=True).first()
+
+
+def bump_pricing_version():
+    """Nueva versión de precios: para todos los procesos y para la grilla cacheada"""
+    value = time.time_ns()
+    if not PricingVersion.objects.filter(pk=1).update(value=value):
+        PricingVersion.objects.update_or_create(pk=1, defaults={'value': value})
+    catalog_cache.bump_pricing_version()
+
+
+def get_table():
+    return _load_table(pricing_version())
+
+
+def quote_rate(category_id, daily_rate, start, end):
+    """Presupuesto para una tarifa diaria de una categoría"""
+    if end < start:
+        raise ValueError('La fecha final es anterior a la inicial.')
+    return _quote(pricing_version(), category_id, Decimal(daily_rate), start, end)
+
+
+def quote(vehicle, start, end):
+    return quote_rate(vehicle.category_id, vehicle.daily_rate, start, end)
+
+
+def quote_vehicles(vehicles, start, end):
+    """Presupuestos ``{vehicle.id: Quote}`` para varios vehículos en las mismas fechas.
+
+    Una sola lectura de la versión de precios y un cálculo por combinación
+    (categoría, tarifa); el resto son aciertos de memoria.
+    """
+    if end < start:
+        raise ValueError('La fecha final es anterior a la inicial.')
+    version = pricing_version()
+    return {
+        vehicle.id: _quote(version, vehicle.category_id, vehicle.daily_rate, start, end)
+        for vehicle in vehicles
+    }
+
+
+def clear_cache():
+    _quote.cache_clear()
+    _load_table.cache_clear()
@@ -0,0 +1,66 @@
+"""
+Rol del usuario (``UserProfile.role``) con caché.
+
+``admin_required`` y la barra de navegación consultan el rol en cada
+petición. Con una caché compartida (``SHARED_CACHE`` en settings) se guarda
+en la caché por defecto, la misma que usan las sesiones ``cached_db``, de
+modo que la comprobación de permisos no consulta la base de datos; las
+señales de ``UserProfile`` invalidan la entrada al cambiar el rol. Con
+``ROLE_CACHE_TIMEOUT = 0`` (caché por proceso) se consulta en cada petición:
+la invalidación no llegaría a los demás workers.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import UserProfile
+
+STAFF_ROLES = ('admin', 'operador')
+
+# Marca para "sin perfil": None significa que la clave no está en caché
+NO_ROLE = ''
+
+
+def _role_key(user_id):
+    return f'rental:role:{user_id}'
+
+
+def get_role(user):
+    """Rol del usuario o None (anónimo o sin perfil)"""
+    if not user.is_authenticated:
+        return None
+    if not hasattr(user, '_rental_role'):
+        timeout = settings.ROLE_CACHE_TIMEOUT
+        role = cache.get(_role_key(user.pk)) if timeout else None
+        if role is None:
+            role = UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).first() or NO_ROLE
+            if timeout:
+                cache.set(_role_key(user.pk), role, timeout)
+        user._rental_role = role
+    return user._rental_role or None
+
+
+def is_staff_role(user):
+    return get_role(user) in STAFF_ROLES
+
+
+async def aget_role(user):
+    """Versión asíncrona de ``get_role`` (deja el rol en el mismo atributo del usuario)"""
+    if not user.is_authenticated:
+        return None
+    if not hasattr(user, '_rental_role'):
+        timeout = settings.ROLE_CACHE_TIMEOUT
+        role = await cache.aget(_role_key(user.pk)) if timeout else None
+        if role is None:
+            role = await UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).afirst() or NO_ROLE
+            if timeout:
+                await cache.aset(_role_key(user.pk), role, timeout)
+        user._rental_role = role
+    return user._rental_role or None
+
+
+async def ais_staff_role(user):
+    return await aget_role(user) in STAFF_ROLES
+
+
+def invalidate_role(user_id):
+    cache.delete(_role_key(user_id))
@@ -0,0 +1,238 @@
+"""
+Resúmenes de ocupación e ingresos para la página de reportes.
+
+``rebuild_rollups()`` recorre ``Rental`` una sola vez (una consulta, leída
+por lotes) y escribe dos tablas pequeñas:
+
+- ``CategoryDailyStat``: por día y categoría, vehículos en la flota,
+  vehículos alquilados, alquileres iniciados e ingresos.
+- ``VehicleMonthlyStat``: por mes y vehículo, días alquilado, alquileres
+  iniciados e ingresos.
+
+Cuentan los alquileres activos y completados. El monto de cada alquiler se
+reparte por igual entre sus días, de modo que uno que cruza meses suma en
+cada mes lo que le corresponde (no todo en el de ``created_at``, como el
+dashboard). La ocupación por categoría se acumula por diferencias (+1 el
+primer día, -1 el siguiente al último): el coste es por alquiler y por día
+del calendario, no por día alquilado.
+
+La vista de reportes solo lee estas tablas. Se reconstruyen con
+``python manage.py rollup_reports`` (pensado para cada noche, o a mano tras
+cargas masivas); con ``--since`` solo desde el mes de esa fecha.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Category, CategoryDailyStat, Rental, Vehicle, VehicleMonthlyStat
+
+ROLLUP_STATUSES = ('activo', 'completado')
+BATCH_SIZE = 2000
+CENT = Decimal('0.01')
+TOP_VEHICLES = 20
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_end(day):
+    return next_month(day) - timedelta(days=1)
+
+
+def _running(diffs, first, start=0):
+    """Valor acumulado de un dict {día: diferencia} antes de ``first``"""
+    return sum((value for day, value in diffs.items() if day < first), start)
+
+
+def rebuild_rollups(since=None, today=None):
+    """Recalcula los resúmenes (todos, o desde el mes de ``since``).
+
+    Devuelve (filas por categoría y día, filas por vehículo y mes).
+    """
+    today = today or timezone.localdate()
+    since = month_start(since) if since else None
+
+    # categoría -> {día: diferencia}
+    fleet = defaultdict(Counter)
+    rented = defaultdict(Counter)
+    revenue = defaultdict(lambda: defaultdict(Decimal))
+    started = Counter()  # (categoría, día)
+    # (mes, vehículo) -> [días alquilado, alquileres iniciados, ingresos]
+    monthly = defaultdict(lambda: [0, 0, Decimal(0)])
+
+    vehicles = {}
+    for vehicle_id, category_id, created_at in Vehicle.objects.values_list('id', 'category_id', 'created_at'):
+        vehicles[vehicle_id] = category_id
+        fleet[category_id][timezone.localdate(created_at)] += 1
+
+    rentals = Rental.objects.filter(status__in=ROLLUP_STATUSES)
+    if since:
+        rentals = rentals.filter(end_date__gte=since)
+    first, last = since, today
+    rows = rentals.order_by().values_list('vehicle_id', 'start_date', 'end_date', 'total_amount')
+    for vehicle_id, start, end, total in rows.iterator(chunk_size=BATCH_SIZE):
+        category_id = vehicles.get(vehicle_id)
+        if category_id is None or end < start:
+            continue
+        daily = Decimal(total or 0) / ((end - start).days + 1)
+        after = end + timedelta(days=1)
+        rented[category_id][start] += 1
+        rented[category_id][after] -= 1
+        revenue[category_id][start] += daily
+        revenue[category_id][after] -= daily
+        started[(category_id, start)] += 1
+        monthly[(month_start(start), vehicle_id)][1] += 1
+        # Reparto por meses
+        day = start
+        while day <= end:
+            following = next_month(day)
+            days = (min(end, following - timedelta(days=1)) - day).days + 1
+            entry = monthly[(month_start(day), vehicle_id)]
+            entry[0] += days
+            entry[2] += daily * days
+            day = following
+        if since is None and (first is None or start < first):
+            first = start
+        last = max(last, end)
+
+    daily_rows = []
+    if first is not None:
+        for category_id in set(fleet) | set(rented):
+            vehicles_in_fleet = _running(fleet[category_id], first)
+            vehicles_rented = _running(rented[category_id], first)
+            income = _running(revenue[category_id], first, Decimal(0))
+            day = first
+            while day <= last:
+                vehicles_in_fleet += fleet[category_id].get(day, 0)
+                vehicles_rented += rented[category_id].get(day, 0)
+                income += revenue[category_id].get(day, 0)
+                if vehicles_in_fleet or vehicles_rented:
+                    daily_rows.append(CategoryDailyStat(
+                        day=day,
+                        category_id=category_id,
+                        # Un vehículo alquilado estaba en la flota aunque se diera de alta después
+                        fleet=max(vehicles_in_fleet, vehicles_rented),
+                        rented=vehicles_rented,
+                        rentals_started=started.get((category_id, day), 0),
+                        revenue=income.quantize(CENT, ROUND_HALF_UP),
+                    ))
+                day += timedelta(days=1)
+
+    monthly_rows = [
+        VehicleMonthlyStat(
+            month=month,
+            vehicle_id=vehicle_id,
+            category_id=vehicles[vehicle_id],
+            rented_days=days,
+            rentals_started=count,
+            revenue=income.quantize(CENT, ROUND_HALF_UP),
+        )
+        for (month, vehicle_id), (days, count, income) in monthly.items()
+        if since is None or month >= since
+    ]
+
+    daily_stats = CategoryDailyStat.objects.all()
+    monthly_stats = VehicleMonthlyStat.objects.all()
+    if since:
+        daily_stats = daily_stats.filter(day__gte=since)
+        monthly_stats = monthly_stats.filter(month__gte=since)
+    with transaction.atomic():
+        daily_stats.delete()
+        monthly_stats.delete()
+        CategoryDailyStat.objects.bulk_create(daily_rows, batch_size=BATCH_SIZE)
+        VehicleMonthlyStat.objects.bulk_create(monthly_rows, batch_size=BATCH_SIZE)
+    return len(daily_rows), len(monthly_rows)
+
+
+def _ratio(part, whole):
+    return round(100 * part / whole, 1) if whole else 0
+
+
+def category_report(start, end, category_id=None):
+    """Serie mensual por categoría entre ``start`` y ``end`` (solo lee ``CategoryDailyStat``)"""
+    stats = CategoryDailyStat.objects.filter(day__range=(start, end))
+    if category_id:
+        stats = stats.filter(category_id=category_id)
+    stats = (
+        stats.annotate(month=TruncMonth('day')).order_by()
+        .values_list('month', 'category_id')
+        .annotate(fleet_days=Sum('fleet'), rented=Sum('rented'), rentals=Sum('rentals_started'), revenue=Sum('revenue'))
+    )
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    index = {month: i for i, month in enumerate(months)}
+
+    by_category = {}
+    for month, category_id, fleet_days, rented, rentals, income in stats:
+        row = by_category.setdefault(category_id, {
+            'fleet_days': [0] * len(months), 'rented': [0] * len(months),
+            'rentals': 0, 'revenue': [Decimal(0)] * len(months),
+        })
+        i = index[month]
+        row['fleet_days'][i] = fleet_days
+        row['rented'][i] = rented
+        row['revenue'][i] = income or Decimal(0)
+        row['rentals'] += rentals
+
+    names = dict(Category.objects.filter(id__in=by_category).values_list('id', 'name'))
+    categories = []
+    for category_id, row in sorted(by_category.items(), key=lambda item: names.get(item[0], '')):
+        fleet_days, rented = sum(row['fleet_days']), sum(row['rented'])
+        categories.append({
+            'id': category_id,
+            'name': names.get(category_id, category_id),
+            'revenue': sum(row['revenue'], Decimal(0)),
+            'revenue_by_month': [float(value) for value in row['revenue']],
+            'utilization': _ratio(rented, fleet_days),
+            'utilization_by_month': [_ratio(r, f) for r, f in zip(row['rented'], row['fleet_days'])],
+            'rented_days': rented,
+            'fleet_days': fleet_days,
+            'rentals': row['rentals'],
+        })
+    fleet_days = sum(item['fleet_days'] for item in categories)
+    rented = sum(item['rented_days'] for item in categories)
+    return {
+        'months': [month.strftime('%Y-%m') for month in months],
+        'categories': categories,
+        'revenue': sum((item['revenue'] for item in categories), Decimal(0)),
+        'rented_days': rented,
+        'rentals': sum(item['rentals'] for item in categories),
+        'utilization': _ratio(rented, fleet_days),
+    }
+
+
+def vehicle_report(start, end, category_id=None, limit=TOP_VEHICLES):
+    """Vehículos con más ingresos entre ``start`` y ``end`` (solo lee ``VehicleMonthlyStat``)"""
+    stats = VehicleMonthlyStat.objects.filter(month__range=(month_start(start), end))
+    if category_id:
+        stats = stats.filter(category_id=category_id)
+    top = list(
+        stats.order_by().values_list('vehicle_id')
+        .annotate(revenue=Sum('revenue'), rented_days=Sum('rented_days'), rentals=Sum('rentals_started'))
+        .order_by('-revenue', 'vehicle_id')[:limit]
+    )
+    vehicles = Vehicle.objects.select_related('category').in_bulk([vehicle_id for vehicle_id, *_ in top])
+    days = (end - start).days + 1
+    result = []
+    for vehicle_id, income, rented_days, rentals in top:
+        vehicle = vehicles.get(vehicle_id)
+        if vehicle is not None:
+            vehicle.revenue = income
+            vehicle.rented_days = rented_days
+            vehicle.rentals_started = rentals
+            vehicle.utilization = _ratio(rented_days, days)
+            result.append(vehicle)
+    return result
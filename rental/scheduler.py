@@ -0,0 +1,192 @@
+"""
+Transiciones programadas del ciclo de vida de los alquileres.
+
+Cada ejecución (``run_once``) aplica, en este orden y por lotes con
+``bulk_update_status`` (``UPDATE`` por conjuntos, sin recorrer modelos):
+
+1. activo -> completado: terminaron antes de hoy menos
+   ``SCHEDULER_GRACE_DAYS``. Con ``SCHEDULER_OVERDUE_POLICY='flag'`` no se
+   completan: solo se cuentan como vencidos.
+2. pendiente -> cancelado: terminaron sin activarse (solo con
+   ``SCHEDULER_CANCEL_PENDING``; si no, se cuentan).
+3. pendiente -> activo: su fecha de inicio ya llegó.
+4. Estado de los vehículos: una sola sincronización al final
+   (``sync_vehicles``) de los vehículos de los alquileres que cambiaron, no
+   una por transición.
+
+Es idempotente: cada transición filtra por el estado de origen, así que
+repetirla no cambia nada. Dos ejecuciones a la vez (cron en varias máquinas,
+varios workers con el hilo en proceso) no se pisan: en PostgreSQL se toma
+``pg_try_advisory_lock``; en todos los motores la fila ``SchedulerRun`` en
+curso es única por trabajo. Quien no consigue el cerrojo no hace nada.
+
+Las estadísticas de cada ejecución quedan en ``SchedulerRun`` (admin). Se
+ejecuta con ``python manage.py run_scheduler`` desde cron, o en bucle con
+``--loop``; con ``SCHEDULER_IN_PROCESS`` los puntos de entrada WSGI/ASGI
+arrancan el bucle en un hilo de cada proceso.
+"""
+import logging
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import Rental, SchedulerRun
+from .services import BULK_BATCH_SIZE, bulk_update_status, sync_vehicles
+
+logger = logging.getLogger('rental.scheduler')
+
+LIFECYCLE_JOB = 'rental_lifecycle'
+
+
+def transitions(today):
+    """[(estadística, estado destino, queryset)] en el orden en que se aplican"""
+    jobs = []
+    if settings.SCHEDULER_OVERDUE_POLICY == 'complete':
+        cutoff = today - timedelta(days=settings.SCHEDULER_GRACE_DAYS)
+        jobs.append(('completed', 'completado', Rental.objects.filter(status='activo', end_date__lt=cutoff)))
+    if settings.SCHEDULER_CANCEL_PENDING:
+        jobs.append(('cancelled', 'cancelado', Rental.objects.filter(status='pendiente', end_date__lt=today)))
+    jobs.append(('activated', 'activo', Rental.objects.filter(
+        status='pendiente', start_date__lte=today, end_date__gte=today,
+    )))
+    return jobs
+
+
+def flagged(today):
+    """{estadística: queryset} de los alquileres que quedan marcados sin cambiar de estado"""
+    overdue = Rental.objects.filter(status='activo', end_date__lt=today)
+    if settings.SCHEDULER_OVERDUE_POLICY == 'complete':
+        # Los que siguen dentro del periodo de gracia
+        overdue = overdue.filter(end_date__gte=today - timedelta(days=settings.SCHEDULER_GRACE_DAYS))
+    result = {'overdue': overdue}
+    if not settings.SCHEDULER_CANCEL_PENDING:
+        result['stale_pending'] = Rental.objects.filter(status='pendiente', end_date__lt=today)
+    return result
+
+
+def _advisory_key(job):
+    return zlib.crc32(f'rental.scheduler:{job}'.encode())
+
+
+def _acquire(job, run_date):
+    """Crea la ``SchedulerRun`` de esta ejecución, o devuelve None si hay otra en curso"""
+    now = timezone.now()
+    running = SchedulerRun.objects.filter(job=job, finished_at__isnull=True)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [_advisory_key(job)])
+            if not cursor.fetchone()[0]:
+                return None
+        # El cerrojo de sesión se suelta si el proceso muere: una fila en curso es de uno que murió
+    else:
+        running = running.filter(started_at__lt=now - timedelta(seconds=settings.SCHEDULER_LOCK_TIMEOUT))
+    running.update(status='abandonada', finished_at=now)
+    try:
+        with transaction.atomic():
+            return SchedulerRun.objects.create(job=job, run_date=run_date)
+    except IntegrityError:
+        _release(job)
+        return None
+
+
+def _release(job):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [_advisory_key(job)])
+
+
+def run_once(today=None, batch_size=BULK_BATCH_SIZE, dry_run=False, progress=None, job=LIFECYCLE_JOB):
+    """Aplica las transiciones pendientes a fecha ``today`` (por defecto hoy).
+
+    Devuelve las estadísticas de la ejecución, o None si otra ya estaba en
+    curso. Con ``dry_run`` solo cuenta, sin cerrojo ni ``SchedulerRun``.
+    ``progress(estado, procesados, total)`` se llama después de cada lote.
+    """
+    today = today or timezone.localdate()
+    started = time.perf_counter()
+    stats = {'date': today.isoformat()}
+    if dry_run:
+        for key, _, rentals in transitions(today):
+            stats[key] = rentals.count()
+        for key, rentals in flagged(today).items():
+            stats[key] = rentals.count()
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return stats
+
+    run = _acquire(job, today)
+    if run is None:
+        logger.info('%s: otra ejecución sigue en curso', job)
+        return None
+    try:
+        vehicle_ids = set()
+        for key, new_status, rentals in transitions(today):
+            def batch_progress(done, total, new_status=new_status):
+                if progress:
+                    progress(new_status, done, total)
+
+            stats[key] = bulk_update_status(
+                rentals, new_status, batch_size=batch_size, progress=batch_progress, sync=False,
+                vehicle_ids=vehicle_ids,
+            )
+        changes = sync_vehicles(vehicle_ids)
+        stats['vehicles_rented'] = changes[('disponible', 'alquilado')]
+        stats['vehicles_released'] = changes[('alquilado', 'disponible')]
+        for key, rentals in flagged(today).items():
+            stats[key] = rentals.count()
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        SchedulerRun.objects.filter(pk=run.pk).update(status='ok', stats=stats, finished_at=timezone.now())
+    except Exception as exc:
+        stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        SchedulerRun.objects.filter(pk=run.pk).update(
+            status='error', stats=stats, error=repr(exc), finished_at=timezone.now(),
+        )
+        raise
+    finally:
+        # La fila ya está cerrada: otro proceso no la confundirá con una abandonada
+        _release(job)
+
+    if stats.get('overdue'):
+        logger.warning('%s: %s alquileres activos vencidos sin completar', job, stats['overdue'])
+    logger.info('%s: %s', job, stats)
+    return stats
+
+
+def run_forever(interval=None, stop=None, report=None, **kwargs):
+    """Llama a ``run_once`` cada ``interval`` segundos hasta que se active ``stop``.
+
+    Un error se registra y no detiene el bucle. ``report(stats)`` recibe el
+    resultado de cada ejecución (None si otra estaba en curso).
+    """
+    interval = interval or settings.SCHEDULER_INTERVAL
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            stats = run_once(**kwargs)
+            if report:
+                report(stats)
+        except Exception:
+            logger.exception('Falló la ejecución programada')
+        finally:
+            close_old_connections()
+        stop.wait(interval)
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start_background(interval=None):
+    """Arranca ``run_forever`` en un hilo daemon (uno por proceso)"""
+    global _thread
+    with _thread_lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(
+                target=run_forever, kwargs={'interval': interval}, name='rental-scheduler', daemon=True,
+            )
+            _thread.start()
+    return _thread
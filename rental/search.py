@@ -0,0 +1,282 @@
+"""
+Búsqueda de vehículos y alquileres.
+
+- SQLite: índices FTS5 (``rental_vehicle_search`` y ``rental_user_search``)
+  con el tokenizador ``unicode61 remove_diacritics 2``, consultas por prefijo
+  y orden por relevancia (bm25). Se mantienen con las señales de
+  ``rental/signals.py`` y se crean en la migración 0004.
+- PostgreSQL: los mismos campos y la misma semántica (cada término empieza
+  una palabra, sin tildes) con ``unaccent`` sobre índices GIN trigram
+  (migración 0010) y orden por similitud trigram.
+- Otros motores: ``icontains`` sobre los mismos campos, sin índice ni tildes.
+
+Los listados de vehículos con búsqueda se ordenan por relevancia
+(``rank_vehicles``) y la paginación por cursor sigue ese orden.
+
+La búsqueda de alquileres resuelve primero clientes y vehículos en sus
+índices y filtra ``Rental`` por las claves foráneas, sin unir tablas para
+comparar textos.
+"""
+import re
+import unicodedata
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import CharField, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest, Lower
+
+from .models import Vehicle
+from .pagination import SCORE
+
+VEHICLE_INDEX = 'rental_vehicle_search'
+USER_INDEX = 'rental_user_search'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_PLATE_PART_RE = re.compile(r'[^\W\d_]+|\d+', re.UNICODE)
+_TRANSMISSIONS = dict(Vehicle.TRANSMISSION_CHOICES)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def fold(text):
+    """Minúsculas y sin tildes: 'Automática' -> 'automatica'"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def plate_terms(plate):
+    """Placa completa, sin separadores y por grupos: 'ABC-123' -> 'ABC-123 ABC123 ABC 123'"""
+    plate = plate or ''
+    return ' '.join([plate, re.sub(r'\W', '', plate)] + _PLATE_PART_RE.findall(plate))
+
+
+def match_expression(query):
+    """Convierte texto libre en una consulta FTS5 por prefijo ('toy ra' -> '"toy"* AND "ra"*')"""
+    tokens = _TOKEN_RE.findall(fold(query))
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+# --- Mantenimiento del índice (solo SQLite) ---
+
+def index_vehicles(vehicle_ids=None, category_id=None):
+    """(Re)indexa vehículos por IDs, por categoría o todos si no se indica filtro"""
+    if not fts_enabled():
+        return
+    rows = Vehicle.objects.order_by()
+    if vehicle_ids is not None:
+        rows = rows.filter(id__in=vehicle_ids)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    rows = rows.values_list('id', 'brand', 'model', 'license_plate', 'category__name', 'transmission')
+    # Una sola transacción: en autocommit cada fila sería un commit a disco
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _chunks(rows.iterator(chunk_size=2000), 500):
+            cursor.executemany(f'DELETE FROM {VEHICLE_INDEX} WHERE rowid = %s', [(row[0],) for row in chunk])
+            cursor.executemany(
+                f'INSERT INTO {VEHICLE_INDEX} (rowid, brand, model, license_plate, category, transmission) '
+                f'VALUES (%s, %s, %s, %s, %s, %s)',
+                [
+                    (pk, brand, model, plate_terms(plate), category or '',
+                     _TRANSMISSIONS.get(transmission, transmission))
+                    for pk, brand, model, plate, category, transmission in chunk
+                ],
+            )
+
+
+def unindex_vehicle(vehicle_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {VEHICLE_INDEX} WHERE rowid = %s', [vehicle_id])
+
+
+def index_users(user_ids=None):
+    """(Re)indexa usuarios (clientes) por IDs o todos"""
+    if not fts_enabled():
+        return
+    rows = User.objects.order_by()
+    if user_ids is not None:
+        rows = rows.filter(id__in=user_ids)
+    rows = rows.values_list('id', 'username', 'first_name', 'last_name')
+    with transaction.atomic(), connection.cursor() as cursor:
+        for chunk in _chunks(rows.iterator(chunk_size=2000), 500):
+            cursor.executemany(f'DELETE FROM {USER_INDEX} WHERE rowid = %s', [(row[0],) for row in chunk])
+            cursor.executemany(
+                f'INSERT INTO {USER_INDEX} (rowid, username, first_name, last_name) VALUES (%s, %s, %s, %s)',
+                chunk,
+            )
+
+
+def unindex_user(user_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {USER_INDEX} WHERE rowid = %s', [user_id])
+
+
+def rebuild_search_index():
+    """Vacía y vuelve a poblar los índices de búsqueda"""
+    if not fts_enabled():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {VEHICLE_INDEX}')
+        cursor.execute(f'DELETE FROM {USER_INDEX}')
+    index_vehicles()
+    index_users()
+    return True
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- Consultas ---
+
+# Campos de texto de cada índice FTS5; la placa y la transmisión van aparte
+VEHICLE_FIELDS = ('brand', 'model', 'category__name')
+USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+class Unaccent(Func):
+    """``rental_unaccent(lower(...))``: la expresión de los índices trigram de PostgreSQL (migración 0010)"""
+    function = 'rental_unaccent'
+    output_field = CharField()
+
+    def __init__(self, expression, **extra):
+        super().__init__(Lower(expression), **extra)
+
+
+class CompactPlate(Func):
+    """Placa en minúsculas sin separadores: 'ABC-123' -> 'abc123' (PostgreSQL)"""
+    template = "regexp_replace(lower(%(expressions)s), '[^a-z0-9]', '', 'g')"
+    output_field = CharField()
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(fold(query))
+
+
+def _transmissions(token):
+    """Transmisiones con una palabra de la etiqueta que empieza por ``token``"""
+    return [
+        code for code, label in _TRANSMISSIONS.items()
+        if any(word.startswith(token) for word in _TOKEN_RE.findall(fold(label)))
+    ]
+
+
+def _matching_ids(model, tokens, fields, plate=None, transmission=False):
+    """Subconsulta de IDs de ``model`` que contienen todos los términos.
+
+    Como en FTS5, cada término debe empezar una palabra de algún campo o
+    estar en la placa (sin separadores). En PostgreSQL se compara sin tildes
+    con las expresiones de los índices trigram (``~ '\\mtérmino'`` y
+    ``LIKE``); en otros motores, ``icontains`` sobre los mismos campos.
+    """
+    postgres = connection.vendor == 'postgresql'
+    annotations = {}
+    if postgres:
+        annotations = {f'search_{i}': Unaccent(field) for i, field in enumerate(fields)}
+        if plate:
+            annotations['search_plate'] = CompactPlate(plate)
+    condition = Q()
+    for token in tokens:
+        if postgres:
+            term = Q(*(Q(**{f'search_{i}__regex': rf'\m{token}'}) for i in range(len(fields))), _connector=Q.OR)
+            if plate:
+                term |= Q(search_plate__contains=token)
+        else:
+            lookups = fields + ((plate,) if plate else ())
+            term = Q(*(Q(**{f'{field}__icontains': token}) for field in lookups), _connector=Q.OR)
+        if transmission and _transmissions(token):
+            term |= Q(transmission__in=_transmissions(token))
+        condition &= term
+    return model.objects.annotate(**annotations).filter(condition).values('id')
+
+
+def _fts_ids(index, expression):
+    return RawSQL(f'SELECT rowid FROM {index} WHERE {index} MATCH %s', [expression])
+
+
+def search_vehicles(queryset, query):
+    """Filtra un queryset de vehículos por marca, modelo, placa, categoría o transmisión"""
+    if fts_enabled():
+        expression = match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(id__in=_fts_ids(VEHICLE_INDEX, expression))
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset.none()
+    return queryset.filter(
+        id__in=_matching_ids(Vehicle, tokens, VEHICLE_FIELDS, plate='license_plate', transmission=True)
+    )
+
+
+def search_rentals(queryset, query):
+    """Filtra alquileres por datos del cliente o placa del vehículo"""
+    if fts_enabled():
+        expression = match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(
+            Q(client_id__in=_fts_ids(USER_INDEX, expression)) |
+            Q(vehicle_id__in=RawSQL(
+                f'SELECT rowid FROM {VEHICLE_INDEX} WHERE {VEHICLE_INDEX} MATCH %s',
+                [f'license_plate : ({expression})']
+            ))
+        )
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset.none()
+    return queryset.filter(
+        Q(client_id__in=_matching_ids(User, tokens, USER_FIELDS)) |
+        Q(vehicle_id__in=_matching_ids(Vehicle, tokens, (), plate='license_plate'))
+    )
+
+
+def search_users(queryset, query):
+    """Filtra usuarios por nombre de usuario, nombre o apellido"""
+    if fts_enabled():
+        expression = match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(id__in=_fts_ids(USER_INDEX, expression))
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset.none()
+    return queryset.filter(id__in=_matching_ids(User, tokens, USER_FIELDS))
+
+
+def rank_vehicles(queryset, query):
+    """``search_vehicles`` con la relevancia de cada vehículo anotada en ``SCORE`` (mayor es mejor).
+
+    SQLite: bm25 del índice FTS5 (con signo cambiado). PostgreSQL: la mayor
+    similitud trigram entre los campos. Otros motores: 0, sin medida de
+    relevancia (el orden queda por ID).
+    """
+    vehicles = search_vehicles(queryset, query)
+    if fts_enabled():
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        score = RawSQL(
+            f'SELECT -rank FROM {VEHICLE_INDEX} WHERE {VEHICLE_INDEX} MATCH %s AND rowid = {table}.id',
+            [match_expression(query)], output_field=FloatField(),
+        )
+    elif connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        tokens = _tokens(query)
+        score = Greatest(
+            *(TrigramSimilarity(Unaccent(field), ' '.join(tokens)) for field in VEHICLE_FIELDS),
+            TrigramSimilarity(CompactPlate('license_plate'), ''.join(tokens)),
+        )
+    else:
+        score = Value(0.0, output_field=FloatField())
+    return vehicles.annotate(**{SCORE: score})
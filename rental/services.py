@@ -0,0 +1,175 @@
+"""
+Servicios de dominio para reservas.
+
+Las operaciones que deben ser atómicas frente a varios workers concurrentes
+(crear una reserva, por ejemplo) viven aquí y no en las vistas.
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import catalog_cache, metrics
+from .availability import sync_vehicle_statuses
+from .models import Vehicle, Rental, VehicleOccupancy
+
+
+def book_vehicle(client, vehicle_id, start_date, end_date, notes=''):
+    """Crea una reserva de forma segura ante concurrencia.
+
+    - Bloquea la fila del vehículo con ``select_for_update`` (PostgreSQL), de
+      modo que las reservas de un mismo vehículo se serializan mientras que las
+      de vehículos distintos avanzan en paralelo.
+    - El solapamiento no se consulta antes de insertar: la restricción única
+      (vehículo, día) de ``VehicleOccupancy`` es la validación, en un único
+      viaje a la base de datos. En SQLite, donde ``select_for_update`` no
+      existe, las transacciones ``IMMEDIATE`` (ver settings) serializan las
+      escrituras y la restricción sigue impidiendo la doble reserva.
+
+    Lanza ``ValidationError`` si el vehículo no existe, está en mantenimiento
+    o ya está reservado en esas fechas.
+    """
+    if not (start_date and end_date) or end_date <= start_date:
+        raise ValidationError({'end_date': 'La fecha de devolución debe ser posterior a la fecha de inicio.'})
+
+    with transaction.atomic():
+        vehicle = (
+            Vehicle.objects.select_for_update()
+            .exclude(status='mantenimiento')
+            .filter(pk=vehicle_id)
+            .first()
+        )
+        if vehicle is None:
+            raise ValidationError('El vehículo no está disponible.')
+
+        rental = Rental(
+            client=client,
+            vehicle=vehicle,
+            start_date=start_date,
+            end_date=end_date,
+            daily_rate=vehicle.daily_rate,
+            notes=notes,
+        )
+        rental.save()
+    return rental
+
+
+# Transiciones permitidas en los cambios masivos: estado destino -> estados de origen
+BULK_TRANSITIONS = {
+    'activo': ('pendiente',),
+    'completado': ('activo',),
+    'cancelado': ('pendiente', 'activo'),
+}
+BULK_BATCH_SIZE = 1000
+
+
+def bulk_update_status(rentals, new_status, batch_size=BULK_BATCH_SIZE, progress=None, sync=True,
+                       vehicle_ids=None):
+    """Cambia el estado de todos los alquileres de un queryset con ``QuerySet.update``.
+
+    - Solo se tocan los alquileres cuyo estado actual permite la transición
+      (``BULK_TRANSITIONS``); el resto se ignora.
+    - Todo ocurre en una transacción: por lotes de ``batch_size`` IDs se
+      actualiza el estado y se borran los días ocupados de los alquileres que
+      dejan de estar activos; al final se sincronizan con dos sentencias
+      (``sync_vehicle_statuses``) solo los vehículos de esos alquileres.
+    - ``QuerySet.update`` no emite señales, así que las métricas del dashboard
+      y la caché del catálogo se actualizan aquí.
+
+    ``progress(procesados, total)`` se llama después de cada lote. Con
+    ``sync=False`` los vehículos no se sincronizan: se añaden al set
+    ``vehicle_ids`` para que quien llama los sincronice con ``sync_vehicles``
+    tras varias transiciones. Devuelve el número de alquileres actualizados.
+    """
+    if new_status not in BULK_TRANSITIONS:
+        raise ValidationError(f'No se permite el cambio masivo a "{new_status}".')
+    from_statuses = BULK_TRANSITIONS[new_status]
+
+    with transaction.atomic():
+        ids = list(
+            rentals.filter(status__in=from_statuses).order_by('id').values_list('id', flat=True)
+        )
+        metric_deltas = Counter()
+        updated = 0
+        affected = set()
+        for start in range(0, len(ids), batch_size):
+            # Bloquear las filas del lote (PostgreSQL) y volver a comprobar su estado
+            rows = list(
+                Rental.objects.select_for_update()
+                .filter(id__in=ids[start:start + batch_size], status__in=from_statuses)
+                .values_list('id', 'vehicle_id')
+            )
+            batch_ids = [pk for pk, _ in rows]
+            affected.update(vehicle_id for _, vehicle_id in rows)
+            batch = Rental.objects.filter(id__in=batch_ids)
+            for status, n in batch.order_by().values_list('status').annotate(n=Count('id')):
+                metric_deltas[(metrics.RENTALS_BY_STATUS, status)] -= n
+                metric_deltas[(metrics.RENTALS_BY_STATUS, new_status)] += n
+            if new_status == 'completado':
+                monthly = (
+                    batch.annotate(month=TruncMonth('created_at')).order_by()
+                    .values_list('month').annotate(total=Sum('total_amount'))
+                )
+                for month, total in monthly:
+                    metric_deltas[(metrics.REVENUE_BY_MONTH, month.strftime('%Y-%m'))] += total or 0
+            updated += batch.update(status=new_status, updated_at=timezone.now())
+            if new_status not in Rental.ACTIVE_STATUSES:
+                VehicleOccupancy.objects.filter(rental_id__in=batch_ids).delete()
+            if progress:
+                progress(min(start + batch_size, len(ids)), len(ids))
+
+        if vehicle_ids is not None:
+            vehicle_ids.update(affected)
+        if sync:
+            for (old, new), n in sync_vehicle_statuses(affected, batch_size).items():
+                metric_deltas[(metrics.VEHICLES_BY_STATUS, old)] -= n
+                metric_deltas[(metrics.VEHICLES_BY_STATUS, new)] += n
+        for (name, bucket), delta in metric_deltas.items():
+            metrics.bump(name, bucket, delta)
+
+    if updated:
+        catalog_cache.bump_catalog_version()
+        catalog_cache.bump_availability_version()
+    return updated
+
+
+def sync_vehicles(vehicle_ids=None):
+    """``sync_vehicle_statuses`` con las métricas y la caché del catálogo al día.
+
+    Sin ``vehicle_ids`` recorre toda la flota (corrige también estados que se
+    desviaron). Devuelve ``{(estado_anterior, estado_nuevo): n}``.
+    """
+    with transaction.atomic():
+        changes = sync_vehicle_statuses(vehicle_ids)
+        for (old, new), n in changes.items():
+            metrics.bump(metrics.VEHICLES_BY_STATUS, old, -n)
+            metrics.bump(metrics.VEHICLES_BY_STATUS, new, n)
+    if any(changes.values()):
+        catalog_cache.bump_catalog_version()
+    return changes
+
+
+def release_vehicles(vehicles, status='alquilado'):
+    """Pasa a 'disponible' los vehículos del queryset en ``status`` sin alquiler activo.
+
+    Por defecto solo los 'alquilado' que quedaron así por error; los de
+    'mantenimiento' se liberan solo si se pide explícitamente. Un único
+    ``UPDATE``; como ``QuerySet.update`` no emite señales, las métricas y la
+    caché del catálogo se actualizan aquí. Devuelve el número de vehículos
+    liberados.
+    """
+    active = Rental.objects.filter(status='activo').values('vehicle_id')
+    with transaction.atomic():
+        released = (
+            Vehicle.objects.filter(id__in=vehicles.values('id'), status=status)
+            .exclude(id__in=active)
+            .update(status='disponible', updated_at=timezone.now())
+        )
+        metrics.bump(metrics.VEHICLES_BY_STATUS, status, -released)
+        metrics.bump(metrics.VEHICLES_BY_STATUS, 'disponible', released)
+    if released:
+        catalog_cache.bump_catalog_version()
+    return released
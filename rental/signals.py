@@ -0,0 +1,126 @@
+"""
+Señales del módulo de alquileres.
+
+Mantienen al día las métricas del dashboard (ver ``rental/metrics.py``),
+los índices de búsqueda (ver ``rental/search.py``), las versiones de la
+caché del catálogo (ver ``rental/catalog_cache.py``) y de precios (ver
+``rental/pricing.py``) y la caché de roles
+(ver ``rental/roles.py``).
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import catalog_cache, metrics, pricing, roles, search
+from .models import Category, DurationDiscount, PricingRule, Rental, UserProfile, Vehicle
+
+_RENTAL_FIELDS = ('status', 'vehicle_id', 'total_amount', 'created_at')
+
+
+def _rental_snapshot(rental):
+    return {field: getattr(rental, field) for field in _RENTAL_FIELDS}
+
+
+@receiver(pre_save, sender=Rental)
+def remember_rental_state(sender, instance, raw=False, **kwargs):
+    instance._metrics_before = None
+    if not raw and instance.pk:
+        instance._metrics_before = Rental.objects.filter(pk=instance.pk).values(*_RENTAL_FIELDS).first()
+
+
+@receiver(post_save, sender=Rental)
+def update_rental_metrics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    metrics.apply_change(
+        metrics.rental_contribution(getattr(instance, '_metrics_before', None)),
+        metrics.rental_contribution(_rental_snapshot(instance)),
+    )
+
+
+@receiver(post_delete, sender=Rental)
+def remove_rental_metrics(sender, instance, **kwargs):
+    metrics.apply_change(metrics.rental_contribution(_rental_snapshot(instance)), {})
+
+
+@receiver(pre_save, sender=Vehicle)
+def remember_vehicle_state(sender, instance, raw=False, **kwargs):
+    instance._metrics_before = None
+    if not raw and instance.pk:
+        instance._metrics_before = Vehicle.objects.filter(pk=instance.pk).values('status').first()
+
+
+@receiver(post_save, sender=Vehicle)
+def update_vehicle_metrics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    metrics.apply_change(
+        metrics.vehicle_contribution(getattr(instance, '_metrics_before', None)),
+        metrics.vehicle_contribution({'status': instance.status}),
+    )
+
+
+@receiver(post_delete, sender=Vehicle)
+def remove_vehicle_metrics(sender, instance, **kwargs):
+    metrics.apply_change(metrics.vehicle_contribution({'status': instance.status}), {})
+
+
+@receiver(post_save, sender=Vehicle)
+def index_vehicle(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_vehicles([instance.pk])
+
+
+@receiver(post_delete, sender=Vehicle)
+def unindex_vehicle(sender, instance, **kwargs):
+    search.unindex_vehicle(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_vehicles(sender, instance, created=False, raw=False, **kwargs):
+    if not raw and not created:
+        search.index_vehicles(category_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    # El login solo actualiza last_login: no hace falta reindexar
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    search.index_users([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    search.unindex_user(instance.pk)
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_cache(sender, raw=False, **kwargs):
+    if not raw:
+        catalog_cache.bump_catalog_version()
+
+
+@receiver(post_save, sender=Rental)
+@receiver(post_delete, sender=Rental)
+def invalidate_availability_cache(sender, raw=False, **kwargs):
+    if not raw:
+        catalog_cache.bump_availability_version()
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+@receiver(post_save, sender=DurationDiscount)
+@receiver(post_delete, sender=DurationDiscount)
+def invalidate_pricing(sender, raw=False, **kwargs):
+    if not raw:
+        pricing.bump_pricing_version()
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_user_role(sender, instance, **kwargs):
+    roles.invalidate_role(instance.user_id)
@@ -0,0 +1,50 @@
+"""
+WhiteNoise con soporte asíncrono.
+
+``WhiteNoiseMiddleware`` solo es síncrono: bajo ASGI, Django tendría que
+pasar cada petición por un hilo (``sync_to_async``) antes de llegar a las
+vistas asíncronas. Esta subclase sirve los estáticos igual pero se declara
+asíncrona, y lee los archivos en un hilo aparte para no bloquear el bucle
+de eventos. Bajo WSGI se comporta como el original.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = self.serve(static_file, request)
+        if response.file_to_stream is not None:
+            response.streaming_content = _aread(response.file_to_stream)
+        return response
+
+
+async def _aread(fileobj):
+    read = sync_to_async(fileobj.read, thread_sensitive=False)
+    try:
+        while chunk := await read(CHUNK_SIZE):
+            yield chunk
+    finally:
+        await sync_to_async(fileobj.close, thread_sensitive=False)()
@@ -1,3 +1,1615 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from concurrent.futures import Future
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from .models import (
+    Category, Vehicle, Rental, VehicleOccupancy, UserProfile, DashboardMetric, PricingRule, DurationDiscount,
+    CategoryDailyStat, VehicleMonthlyStat, SchedulerRun, PricingVersion,
+)
+from .forms import RentalForm
+from .availability import available_vehicles, is_vehicle_available
+from .services import book_vehicle, bulk_update_status
+from . import admin as rental_admin
+from . import catalog_cache, export_jobs, pricing, scheduler
+from .metrics import get_dashboard_metrics, rebuild_metrics
+from .search import search_vehicles, search_rentals, rank_vehicles
+from .middleware import AsyncCountedStream, registry
+from .pdf_worker import render_pdf as pdf_worker_render, resolve_link
+from .management.commands.explain_queries import Command as ExplainQueriesCommand, uses_index
+from .rollups import rebuild_rollups
+from .urls import get_urlpatterns
+
+
+def make_vehicle(category, plate, **kwargs):
+    data = {
+        'license_plate': plate,
+        'brand': 'Toyota',
+        'model': 'RAV4',
+        'year': 2022,
+        'category': category,
+        'transmission': 'automatica',
+        'daily_rate': Decimal('100.00'),
+        'capacity': 5,
+    }
+    data.update(kwargs)
+    return Vehicle.objects.create(**data)
+
+
+class BookVehicleTests(TestCase):
+    """Reglas básicas del servicio de reservas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='SUV')
+        cls.vehicle = make_vehicle(cls.category, 'ABC123')
+        cls.client_user = User.objects.create_user('cliente', password='x')
+
+    def occupied(self, rental):
+        return list(VehicleOccupancy.objects.filter(rental=rental).order_by('day').values_list('day', flat=True))
+
+    def test_books_and_occupies_days(self):
+        rental = book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        self.assertEqual(rental.days, 3)
+        self.assertEqual(rental.total_amount, Decimal('300.00'))
+        # Una fila por día, sin el de devolución
+        self.assertEqual(self.occupied(rental), [date(2030, 1, 1), date(2030, 1, 2)])
+
+    def test_rejects_overlap(self):
+        book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        with self.assertRaises(ValidationError):
+            book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 2), date(2030, 1, 5))
+        self.assertEqual(Rental.objects.count(), 1)
+
+    def test_return_day_is_free(self):
+        book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        self.assertIn(self.vehicle, available_vehicles(date(2030, 1, 3), date(2030, 1, 5)))
+        self.assertNotIn(self.vehicle, available_vehicles(date(2030, 1, 2), date(2030, 1, 5)))
+        self.assertIn(self.vehicle, available_vehicles(date(2029, 12, 28), date(2030, 1, 1)))
+        self.assertFalse(is_vehicle_available(self.vehicle.id, date(2029, 12, 28), date(2030, 1, 2)))
+        following = book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 3), date(2030, 1, 5))
+        self.assertEqual(self.occupied(following), [date(2030, 1, 3), date(2030, 1, 4)])
+
+    def test_unique_day_rejects_overlap_without_clean(self):
+        book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        rental = Rental(client=self.client_user, vehicle=self.vehicle, start_date=date(2030, 1, 2),
+                        end_date=date(2030, 1, 4), daily_rate=Decimal('100.00'))
+        with self.assertRaises(ValidationError):
+            rental.save()
+        self.assertIsNone(rental.pk)
+        self.assertEqual(Rental.objects.count(), 1)
+        with self.assertRaises(ValidationError):
+            rental.full_clean()
+
+    def test_cancel_removes_occupancy(self):
+        rental = book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        rental.status = 'cancelado'
+        rental.save()
+        self.assertEqual(self.occupied(rental), [])
+        self.assertTrue(is_vehicle_available(self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3)))
+        rental.status = 'pendiente'
+        rental.save()
+        self.assertEqual(len(self.occupied(rental)), 2)
+
+    def test_date_edit_moves_occupancy(self):
+        rental = book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        other = book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 10), date(2030, 1, 12))
+        rental.start_date, rental.end_date = date(2030, 1, 5), date(2030, 1, 8)
+        rental.save()
+        self.assertEqual(self.occupied(rental), [date(2030, 1, 5), date(2030, 1, 6), date(2030, 1, 7)])
+        self.assertTrue(is_vehicle_available(self.vehicle.id, date(2030, 1, 1), date(2030, 1, 5)))
+        # Mover un alquiler encima de otro falla y no toca sus días
+        rental.end_date = date(2030, 1, 11)
+        with self.assertRaises(ValidationError):
+            rental.save()
+        rental.refresh_from_db()
+        self.assertEqual(rental.end_date, date(2030, 1, 8))
+        self.assertEqual(len(self.occupied(rental)), 3)
+        self.assertEqual(len(self.occupied(other)), 2)
+        self.assertTrue(is_vehicle_available(self.vehicle.id, date(2030, 1, 1), date(2030, 1, 10),
+                                             exclude_rental_id=rental.id))
+
+    def test_rejects_vehicle_in_maintenance(self):
+        vehicle = make_vehicle(self.category, 'MNT001', status='mantenimiento')
+        with self.assertRaises(ValidationError):
+            book_vehicle(self.client_user, vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+
+    def test_rejects_inverted_dates(self):
+        with self.assertRaises(ValidationError):
+            book_vehicle(self.client_user, self.vehicle.id, date(2030, 1, 3), date(2030, 1, 1))
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Reservas simultáneas desde varios hilos (cada uno con su conexión)"""
+
+    workers = 8
+
+    def setUp(self):
+        self.category = Category.objects.create(name='SUV')
+        self.users = [User.objects.create_user(f'cliente{i}') for i in range(self.workers)]
+
+    def _run_parallel(self, targets):
+        barrier = threading.Barrier(len(targets))
+        results = []
+        lock = threading.Lock()
+
+        def worker(user, vehicle_id):
+            barrier.wait()
+            try:
+                book_vehicle(user, vehicle_id, date(2030, 5, 1), date(2030, 5, 4))
+                outcome = 'ok'
+            except ValidationError:
+                outcome = 'rejected'
+            finally:
+                connection.close()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=worker, args=target) for target in targets]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_same_vehicle_exactly_one_wins(self):
+        vehicle = make_vehicle(self.category, 'RACE01')
+        results = self._run_parallel([(user, vehicle.id) for user in self.users])
+        self.assertEqual(results.count('ok'), 1)
+        self.assertEqual(results.count('rejected'), self.workers - 1)
+        self.assertEqual(Rental.objects.filter(vehicle=vehicle).count(), 1)
+        # Del 1 al 4 de enero sin el día de devolución
+        self.assertEqual(VehicleOccupancy.objects.filter(vehicle=vehicle).count(), 3)
+
+    def test_different_vehicles_all_succeed(self):
+        vehicles = [make_vehicle(self.category, f'FLEET{i}') for i in range(self.workers)]
+        results = self._run_parallel(list(zip(self.users, [v.id for v in vehicles])))
+        self.assertEqual(results.count('ok'), self.workers)
+        self.assertEqual(Rental.objects.count(), self.workers)
+
+
+class ExportRentalsCsvTests(TestCase):
+    """Exportación CSV en streaming con los filtros de rentals_manage"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        category = Category.objects.create(name='SUV')
+        vehicle = make_vehicle(category, 'CSV001')
+        other = make_vehicle(category, 'CSV002')
+        customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        book_vehicle(customer, vehicle.id, date(2030, 1, 1), date(2030, 1, 2))
+        cancelled = book_vehicle(customer, other.id, date(2030, 2, 1), date(2030, 2, 2))
+        cancelled.status = 'cancelado'
+        cancelled.save()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _lines(self, **params):
+        response = self.client.get(reverse('export_rentals_csv'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_exports_all_rows_with_labels(self):
+        lines = self._lines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Ana Pérez', lines[1])
+        self.assertIn('Toyota RAV4 (CSV002)', lines[1])
+        self.assertTrue(lines[1].endswith('Cancelado'))
+
+    def test_honors_filters(self):
+        lines = self._lines(status='pendiente')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('CSV001', lines[1])
+
+
+class ExportRentalsExcelTests(TestCase):
+    """Exportación XLSX directa y en segundo plano"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        category = Category.objects.create(name='SUV')
+        customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        for i in range(3):
+            vehicle = make_vehicle(category, f'XLS00{i}')
+            book_vehicle(customer, vehicle.id, date(2030, 1, 1), date(2030, 1, 2))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.jobs_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.jobs_dir.cleanup)
+
+    def _load(self, fileobj):
+        from openpyxl import load_workbook
+        return list(load_workbook(fileobj, read_only=True).active.values)
+
+    def test_small_export_is_served_directly(self):
+        response = self.client.get(reverse('export_rentals_excel'))
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        rows = self._load(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][1], 'Ana Pérez')
+
+    def test_purge_expired_jobs(self):
+        with override_settings(EXPORT_JOBS_DIR=self.jobs_dir.name, EXPORT_JOB_TTL=60):
+            jobs = Path(self.jobs_dir.name)
+            export_jobs._write_state('listo', status='listo')
+            export_jobs._write_state('colgado', status='en_proceso')
+            export_jobs._write_state('reciente', status='en_proceso')
+            for name in ('listo.xlsx', 'colgado.xlsx.part', 'otro.json.tmp', 'reciente.xlsx.part'):
+                (jobs / name).write_bytes(b'x')
+            old = time.time() - 120
+            for path in jobs.iterdir():
+                if not path.name.startswith('reciente'):
+                    os.utime(path, (old, old))
+
+            export_jobs.purge_expired_jobs()
+            self.assertEqual(
+                sorted(path.name for path in jobs.iterdir()),
+                ['colgado.json', 'reciente.json', 'reciente.xlsx.part'],
+            )
+            self.assertEqual(export_jobs.get_job('colgado')['status'], 'error')
+            self.assertEqual(export_jobs.get_job('reciente')['status'], 'en_proceso')
+
+    def test_large_export_becomes_job(self):
+        with override_settings(EXPORT_ASYNC_THRESHOLD=1, EXPORT_JOBS_DIR=self.jobs_dir.name):
+            # El hilo del pool no ve los datos de la transacción del test:
+            # se encola sin ejecutar y luego se procesa en este hilo
+            with patch.object(export_jobs, '_run_in_worker'):
+                response = self.client.get(reverse('export_rentals_excel'), {'status': 'pendiente'})
+            job_id = response.url.rstrip('/').split('/')[-1]
+            self.assertEqual(export_jobs.get_job(job_id)['status'], 'pendiente')
+
+            state = export_jobs.run_export_job(job_id)
+            self.assertEqual(state['status'], 'listo')
+            self.assertEqual(state['processed'], 3)
+
+            status = self.client.get(reverse('export_job_status', args=[job_id]), {'format': 'json'})
+            self.assertEqual(status.json()['status'], 'listo')
+            download = self.client.get(reverse('export_job_download', args=[job_id]))
+            self.assertEqual(len(self._load(BytesIO(b''.join(download.streaming_content)))), 4)
+
+
+class DashboardMetricsTests(TestCase):
+    """Las métricas incrementales coinciden con una reconstrucción completa"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='SUV')
+        self.customer = User.objects.create_user('ana')
+
+    def test_incremental_matches_rebuild(self):
+        vehicles = [make_vehicle(self.category, f'MET00{i}') for i in range(3)]
+        first = book_vehicle(self.customer, vehicles[0].id, date(2030, 1, 1), date(2030, 1, 4))
+        second = book_vehicle(self.customer, vehicles[0].id, date(2030, 2, 1), date(2030, 2, 2))
+        third = book_vehicle(self.customer, vehicles[1].id, date(2030, 1, 1), date(2030, 1, 2))
+        first.status = 'completado'
+        first.save()
+        second.status = 'activo'
+        second.save()
+        third.delete()
+        vehicles[2].status = 'mantenimiento'
+        vehicles[2].save()
+
+        incremental = get_dashboard_metrics()
+        self.assertEqual(incremental['total_vehicles'], 3)
+        self.assertEqual(incremental['available_vehicles'], 2)
+        self.assertEqual(incremental['active_rentals'], 1)
+        self.assertEqual(incremental['total_revenue'], Decimal('400.00'))
+        self.assertEqual([v.pk for v in incremental['top_vehicles']], [vehicles[0].pk])
+        self.assertEqual(incremental['top_vehicles'][0].rental_count, 2)
+
+        rebuild_metrics()
+        rebuilt = get_dashboard_metrics()
+        for key in ('total_vehicles', 'available_vehicles', 'active_rentals', 'total_revenue',
+                    'monthly_revenue', 'status_distribution'):
+            self.assertEqual(incremental[key], rebuilt[key], key)
+
+    def test_empty_table_is_populated_on_first_read(self):
+        make_vehicle(self.category, 'MET100')
+        DashboardMetric.objects.all().delete()
+        self.assertEqual(get_dashboard_metrics()['total_vehicles'], 1)
+        self.assertTrue(DashboardMetric.objects.exists())
+
+
+# Configuración con caché compartida (CACHE_URL=redis:// o file://)
+shared_cache_settings = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db', ROLE_CACHE_TIMEOUT=3600,
+)
+
+
+@shared_cache_settings
+class QueryBudgetTests(TestCase):
+    """Número fijo de consultas por vista, sin importar cuántas filas se muestren.
+
+    Si una plantilla vuelve a acceder a una relación por fila (N+1), el número
+    de consultas crece con ``_grow`` y el test falla.
+    """
+
+    # En las vistas autenticadas se cuenta la consulta del usuario; con caché
+    # compartida la sesión (cached_db) y el rol (rental/roles.py) salen de ella
+    budgets = {
+        'home': 2,
+        'vehicles_list': 3,
+        'my_rentals': 2,
+        'dashboard': 5,
+        'vehicles_manage': 2,
+        'categories_manage': 2,
+        'rentals_manage': 2,
+        'vehicle_create': 1,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        UserProfile.objects.create(user=cls.customer, role='cliente')
+        cls.count = 0
+
+    def _grow(self, n):
+        for _ in range(n):
+            QueryBudgetTests.count += 1
+            category = Category.objects.create(name=f'Cat {self.count}')
+            vehicle = make_vehicle(category, f'QRY{self.count:03d}')
+            rental = book_vehicle(self.customer, vehicle.id, date(2030, 1, 1), date(2030, 1, 2))
+            if self.count % 2:
+                rental.status = 'completado'
+                rental.save()
+
+    def _assert_budget(self, name, user):
+        if user:
+            self.client.force_login(user)
+        url = reverse(name)
+        self.client.get(url)  # rol y sesión en caché
+        for rows in (1, 6):
+            self._grow(rows)
+            with self.assertNumQueries(self.budgets[name]):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_home(self):
+        self._assert_budget('home', None)
+
+    def test_vehicles_list(self):
+        self._assert_budget('vehicles_list', self.customer)
+
+    def test_my_rentals(self):
+        self._assert_budget('my_rentals', self.customer)
+
+    def test_dashboard(self):
+        self._assert_budget('dashboard', self.admin)
+
+    def test_vehicles_manage(self):
+        self._assert_budget('vehicles_manage', self.admin)
+
+    def test_categories_manage(self):
+        self._assert_budget('categories_manage', self.admin)
+
+    def test_rentals_manage(self):
+        self._assert_budget('rentals_manage', self.admin)
+
+    def test_vehicle_create(self):
+        # El select de categorías se llena por AJAX: no las carga todas
+        self._assert_budget('vehicle_create', self.admin)
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginación por cursor en rentals_manage conservando los filtros"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        category = Category.objects.create(name='SUV')
+        customer = User.objects.create_user('ana')
+        for i in range(7):
+            vehicle = make_vehicle(category, f'PAG00{i}')
+            book_vehicle(customer, vehicle.id, date(2030, 1, 1), date(2030, 1, 2))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _get(self, query):
+        response = self.client.get(reverse('rentals_manage') + query)
+        return response.context['page']
+
+    def test_walks_forward_and_back(self):
+        first = self._get('?status=pendiente&page_size=3')
+        self.assertEqual(len(first), 3)
+        self.assertFalse(first.has_previous)
+        self.assertIn('status=pendiente', first.next_url)
+
+        second = self._get(first.next_url)
+        third = self._get(second.next_url)
+        self.assertEqual(len(third), 1)
+        self.assertFalse(third.has_next)
+
+        seen = [r.pk for page in (first, second, third) for r in page]
+        self.assertEqual(seen, list(Rental.objects.order_by('-created_at', '-id').values_list('pk', flat=True)))
+
+        back = self._get(second.previous_url)
+        self.assertEqual([r.pk for r in back], [r.pk for r in first])
+        self.assertFalse(back.has_previous)
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = self._get('?after=not-a-cursor&page_size=3')
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_previous)
+
+
+class SearchTests(TestCase):
+    """Índice de búsqueda: prefijos, tildes, placas y sincronización"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Sedán')
+        cls.civic = make_vehicle(cls.category, 'XYZ-789', brand='Honda', model='Civic', transmission='manual')
+        cls.rav4 = make_vehicle(cls.category, 'ABC-123')
+        cls.customer = User.objects.create_user('mgarcia', first_name='María', last_name='García')
+        cls.rental = book_vehicle(cls.customer, cls.civic.id, date(2030, 1, 1), date(2030, 1, 2))
+
+    def _vehicles(self, query):
+        return set(search_vehicles(Vehicle.objects.all(), query).values_list('license_plate', flat=True))
+
+    def test_prefix_and_accent_insensitive(self):
+        self.assertEqual(self._vehicles('hon civ'), {'XYZ-789'})
+        self.assertEqual(self._vehicles('automatica'), {'ABC-123'})
+        self.assertEqual(self._vehicles('Automática'), {'ABC-123'})
+        self.assertEqual(self._vehicles('sedan'), {'XYZ-789', 'ABC-123'})
+
+    def test_plate_parts(self):
+        self.assertEqual(self._vehicles('123'), {'ABC-123'})
+        self.assertEqual(self._vehicles('abc123'), {'ABC-123'})
+
+    def test_rentals_by_client_or_plate(self):
+        for query in ('garcia', 'Marí', 'mgar', 'xyz'):
+            self.assertEqual(list(search_rentals(Rental.objects.all(), query)), [self.rental], query)
+        self.assertFalse(search_rentals(Rental.objects.all(), 'honda').exists())
+
+    def test_index_follows_updates_and_deletes(self):
+        self.rav4.model = 'Corolla'
+        self.rav4.save()
+        self.assertEqual(self._vehicles('corolla'), {'ABC-123'})
+        self.assertEqual(self._vehicles('rav4'), set())
+
+        self.category.name = 'Familiar'
+        self.category.save()
+        self.assertEqual(self._vehicles('familiar'), {'XYZ-789', 'ABC-123'})
+
+        self.rav4.delete()
+        self.assertEqual(self._vehicles('corolla'), set())
+
+    def test_listings_ordered_by_relevance(self):
+        admin = User.objects.create_user('admin')
+        UserProfile.objects.create(user=admin, role='admin')
+        self.client.force_login(admin)
+        # El más relevante es el más antiguo: sin relevancia saldría el último
+        honda = make_vehicle(self.category, 'HON-001', brand='Honda', model='Honda')
+        Vehicle.objects.filter(pk=honda.pk).update(created_at=timezone.now() - timedelta(days=30))
+        make_vehicle(self.category, 'HON-002', brand='Honda', model='Accord Touring Wagon Sport')
+        expected = list(rank_vehicles(Vehicle.objects.all(), 'honda').order_by('-search_score', '-id')
+                        .values_list('license_plate', flat=True))
+        self.assertEqual(expected[0], 'HON-001')
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(rank_vehicles(Vehicle.objects.all(), '!!').count(), 0)
+
+        # Paginación por cursor sobre la relevancia, hacia adelante y hacia atrás
+        url = reverse('vehicles_manage')
+        pages, next_url = [], f'{url}?search=honda&page_size=1'
+        while next_url:
+            page = self.client.get(next_url).context['page']
+            pages.append(page)
+            next_url = page.next_url and url + page.next_url
+        self.assertEqual([vehicle.license_plate for page in pages for vehicle in page], expected)
+        previous = self.client.get(url + pages[-1].previous_url).context['page']
+        self.assertEqual([vehicle.license_plate for vehicle in previous], expected[1:2])
+
+        response = self.client.get(reverse('api_vehicles'), {'search': 'honda', 'fields': 'license_plate',
+                                                             'page_size': 2})
+        data = response.json()
+        plates = [row['license_plate'] for row in data['results']]
+        plates += [row['license_plate'] for row in self.client.get(data['next']).json()['results']]
+        self.assertEqual(plates, expected)
+
+        response = self.client.get(reverse('autocomplete_vehicles'), {'term': 'honda'})
+        self.assertEqual(response.json()['results'][0]['id'], honda.id)
+
+    def test_without_fts_same_fields_and_terms(self):
+        # Motores sin FTS5: mismos campos (categoría y transmisión incluidas) y todos los términos
+        with patch('rental.search.fts_enabled', return_value=False):
+            self.assertEqual(self._vehicles('hon civ'), {'XYZ-789'})
+            self.assertEqual(self._vehicles('Automática'), {'ABC-123'})
+            self.assertEqual(self._vehicles('sed'), {'XYZ-789', 'ABC-123'})
+            self.assertEqual(self._vehicles('honda rav4'), set())
+            self.assertEqual(self._vehicles('!!'), set())
+            self.assertEqual(list(search_rentals(Rental.objects.all(), 'garc xyz')), [])
+            self.assertEqual(list(search_rentals(Rental.objects.all(), 'mgarcia')), [self.rental])
+            self.assertEqual(
+                set(rank_vehicles(Vehicle.objects.all(), 'sed').values_list('search_score', flat=True)), {0.0}
+            )
+
+
+class RequestMetricsTests(TestCase):
+    """Middleware de instrumentación y endpoint Prometheus"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_disabled_endpoint_is_hidden(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 404)
+
+    @override_settings(REQUEST_METRICS_ENABLED=True, REQUEST_METRICS_SLOW_MS=0, REQUEST_METRICS_TOKEN='secreto')
+    def test_records_views_and_logs_slow_requests(self):
+        with self.assertLogs('rental.requests', level='WARNING') as logs:
+            self.client.get(reverse('home'))
+            anonymous = self.client.get(reverse('request_metrics'))
+            response = self.client.get(reverse('request_metrics'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertIn('[home]', logs.output[0])
+        self.assertEqual(anonymous.status_code, 302)
+
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rental_request_duration_seconds{view="home",quantile="0.5"}', body)
+        self.assertIn('rental_request_sql_queries_count{view="home"} 1', body)
+        self.assertIn('rental_requests_total{view="home"} 1', body)
+
+    @override_settings(REQUEST_METRICS_ENABLED=True)
+    def test_streaming_response_size(self):
+        category = Category.objects.create(name='SUV')
+        book_vehicle(self.admin, make_vehicle(category, 'STR001').id, date(2030, 1, 1), date(2030, 1, 2))
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_rentals_csv'))
+        self.assertNotIn('export_rentals_csv', registry.snapshot()[0])
+        size = len(b''.join(response.streaming_content))
+        samples = registry.snapshot()[0]['export_rentals_csv']
+        self.assertEqual([sample[4] for sample in samples], [size])
+        self.assertGreater(size, 0)
+
+    def test_async_stream_counts_on_close(self):
+        async def chunks():
+            yield b'abc'
+            yield b'de'
+
+        sizes = []
+        response = StreamingHttpResponse(chunks())
+        stream = AsyncCountedStream(response.streaming_content, sizes.append)
+        response.streaming_content = stream
+        self.assertTrue(response.is_async)
+
+        async def consume():
+            return [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(asyncio.run(consume()), [b'abc', b'de'])
+        # response.close() también emite request_finished y cerraría la base de pruebas
+        stream.close()
+        stream.close()
+        self.assertEqual(sizes, [5])
+
+
+try:
+    import xhtml2pdf  # noqa: F401
+    HAS_XHTML2PDF = True
+except ImportError:
+    HAS_XHTML2PDF = False
+
+
+@unittest.skipUnless(HAS_XHTML2PDF, 'requiere xhtml2pdf')
+class ContractPdfTests(TestCase):
+    """Contratos PDF en caché con ETag y descarga en ZIP"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        category = Category.objects.create(name='SUV')
+        customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        cls.rentals = [
+            book_vehicle(customer, make_vehicle(category, f'PDF00{i}').id, date(2030, 1, 1), date(2030, 1, 2))
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        override = override_settings(CONTRACT_CACHE_DIR=cache.name, CONTRACT_RENDER_WORKERS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_cached_pdf_and_etag(self):
+        url = reverse('rental_contract_pdf', args=[self.rentals[0].pk])
+        with patch('rental.contracts.render_pdf', wraps=pdf_worker_render) as render:
+            first = self.client.get(url)
+            pdf = b''.join(first.streaming_content)
+            self.assertTrue(pdf.startswith(b'%PDF'))
+            etag = first['ETag']
+
+            again = self.client.get(url)
+            self.assertEqual(b''.join(again.streaming_content), pdf)
+            self.assertEqual(render.call_count, 1)
+
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+        rental = self.rentals[0]
+        rental.notes = 'Cambio'
+        rental.save()
+        self.assertNotEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_pool_render_does_not_block_request(self):
+        url = reverse('rental_contract_pdf', args=[self.rentals[0].pk])
+        future = Future()
+        with override_settings(CONTRACT_RENDER_WORKERS=1), \
+                patch('rental.contracts._submit', return_value=future) as submit:
+            pending = self.client.get(url)
+            self.assertEqual(pending.status_code, 202)
+            self.assertEqual(pending['Retry-After'], '2')
+            self.assertEqual(self.client.get(url).status_code, 202)
+            self.assertEqual(submit.call_count, 1)
+
+            future.set_result(b'%PDF-1.4 listo')
+            response = self.client.get(url)
+            self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 listo')
+
+            failed = Future()
+            submit.return_value = failed
+            self.client.get(reverse('rental_contract_pdf', args=[self.rentals[1].pk]))
+            failed.set_exception(RuntimeError('sin memoria'))
+            response = self.client.get(reverse('rental_contract_pdf', args=[self.rentals[1].pk]))
+            self.assertRedirects(response, reverse('rentals_manage'))
+
+    def test_link_existence_not_memoized(self):
+        with tempfile.TemporaryDirectory() as media:
+            args = ('/static/', '/nowhere', '/media/', media)
+            self.assertEqual(resolve_link('/media/late.png', *args), '/media/late.png')
+            Path(media, 'late.png').write_bytes(b'png')
+            self.assertEqual(resolve_link('/media/late.png', *args), str(Path(media, 'late.png')))
+            self.assertEqual(resolve_link('https://example.com/a.png', *args), 'https://example.com/a.png')
+
+    def test_zip_of_selected_contracts(self):
+        response = self.client.post(reverse('rental_contracts_zip'), {'ids': [r.pk for r in self.rentals]})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(
+            sorted(archive.namelist()),
+            sorted(f'contrato_{r.pk}.pdf' for r in self.rentals),
+        )
+
+
+class ImageVariantTests(TestCase):
+    """Variantes WebP de las imágenes de vehículos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.category = Category.objects.create(name='SUV')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        override = override_settings(MEDIA_ROOT=media.name, IMAGE_VARIANT_WIDTHS=[320, 640, 960])
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, name='auto.jpg', size=(800, 500)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_form_save_builds_variants(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('vehicle_create'), {
+            'license_plate': 'IMG001', 'brand': 'Kia', 'model': 'Picanto', 'year': 2022,
+            'category': self.category.pk, 'transmission': 'manual', 'daily_rate': '80.00',
+            'capacity': 4, 'status': 'disponible', 'image': self.upload(), 'description': '',
+        })
+        self.assertRedirects(response, reverse('vehicles_manage'))
+        vehicle = Vehicle.objects.get(license_plate='IMG001')
+
+        # Sin ampliar: 320, 640 y el ancho original en lugar de 960
+        self.assertEqual(sorted(vehicle.image_variants['variants'], key=int), ['320', '640', '800'])
+        with Image.open(self.media_root / vehicle.image_variants['variants']['320']) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ('WEBP', (320, 200)))
+        self.assertIn('320w', vehicle.image_srcset)
+        self.assertTrue(vehicle.thumbnail_url.endswith('-640.webp'))
+
+        html = self.client.get(reverse('vehicles_list')).content.decode()
+        self.assertIn(f'srcset="{vehicle.image_srcset}"', html)
+
+    def test_backfill_command_reuses_identical_images(self):
+        first = make_vehicle(self.category, 'IMG002', image=self.upload('a.jpg'))
+        second = make_vehicle(self.category, 'IMG003', image=self.upload('b.jpg'))
+        self.assertEqual(first.image_variants, {})
+        self.assertEqual(first.thumbnail_url, first.image.url)
+
+        call_command('build_image_variants', workers=2, prune=True, stdout=StringIO())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_variants['variants'], second.image_variants['variants'])
+        self.assertEqual(len(list((self.media_root / 'vehicles' / 'variants').iterdir())), 3)
+
+
+@shared_cache_settings
+class CatalogCacheTests(TestCase):
+    """Caché versionada de la grilla del catálogo y de las categorías"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='SUV')
+        cls.vehicle = make_vehicle(cls.category, 'CCH001')
+        cls.customer = User.objects.create_user('ana', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.customer)
+
+    def assert_cached_grid(self, url):
+        first = self.client.get(url).content
+        # Solo el usuario; sesión, rol, grilla y categorías salen de la caché
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).content, first)
+
+    def test_vehicle_save_invalidates_grid(self):
+        url = reverse('vehicles_list')
+        self.assert_cached_grid(url)
+        self.vehicle.model = 'Prado'
+        self.vehicle.save()
+        self.assertContains(self.client.get(url), 'Prado')
+
+    def test_booking_invalidates_date_range_grid(self):
+        url = reverse('vehicles_list') + '?start_date=2030-01-01&end_date=2030-01-05'
+        self.assert_cached_grid(url)
+        book_vehicle(self.customer, self.vehicle.id, date(2030, 1, 2), date(2030, 1, 3))
+        self.assertContains(self.client.get(url), 'No hay vehículos disponibles')
+
+    def test_file_based_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=caches):
+                url = reverse('vehicles_list') + '?transmission=automatica'
+                self.assert_cached_grid(url)
+                Category.objects.create(name='Sedán')
+                self.assertContains(self.client.get(url), 'Sedán')
+
+
+@shared_cache_settings
+class RoleCacheTests(TestCase):
+    """Permisos con el rol cacheado junto a la sesión"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user('operador', password='x')
+        cls.profile = UserProfile.objects.create(user=cls.operator, role='operador')
+
+    def test_admin_required_without_profile_query(self):
+        self.client.force_login(self.operator)
+        url = reverse('categories_manage')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse([q for q in queries if 'rental_userprofile' in q['sql'] or 'django_session' in q['sql']])
+
+    def test_role_change_invalidates_cache(self):
+        self.client.force_login(self.operator)
+        url = reverse('dashboard')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.profile.role = 'cliente'
+        self.profile.save()
+        self.assertRedirects(self.client.get(url), reverse('home'))
+
+    @override_settings(ROLE_CACHE_TIMEOUT=0, SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_per_process_cache_reads_role_every_request(self):
+        # Otro worker cambió el rol: la invalidación de este proceso no se entera
+        self.client.force_login(self.operator)
+        url = reverse('dashboard')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        UserProfile.objects.filter(pk=self.profile.pk).update(role='cliente')
+        self.assertRedirects(self.client.get(url), reverse('home'))
+
+        self.client.logout()
+        self.assertRedirects(self.client.get(url), f"{reverse('login')}?next={url}")
+
+
+class VehicleImportTests(TestCase):
+    """Carga masiva de vehículos por lotes con upsert por placa"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.category = Category.objects.create(name='SUV')
+        cls.existing = make_vehicle(cls.category, 'IMP001', status='alquilado')
+
+    def test_csv_upsert_and_error_report(self):
+        data = (
+            'Placa;Marca;Modelo;Año;Categoría;Transmisión;Tarifa Diaria;Capacidad de Pasajeros;Estado\n'
+            'imp001;Toyota;Prado;2023;suv;Automática;150,50;7;disponible\n'
+            'IMP002;Kia;Rio;2021;Sedán;manual;60;5;\n'
+            'IMP003;Kia;Rio;2021;SUV;manual;60;5;\n'
+            'IMP003;Kia;Rio;2021;SUV;manual;60;5;\n'
+            'IMP004;Kia;Rio;2021;SUV;cvt;60;5;\n'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'flota.csv'
+            report = Path(tmp) / 'errores.csv'
+            path.write_text(data, encoding='utf-8')
+            call_command('import_vehicles', str(path), report=str(report), batch_size=2, stdout=StringIO())
+            errors = report.read_text(encoding='utf-8').splitlines()
+
+        self.assertEqual(errors[1:], [
+            '3,IMP002,"La categoría ""Sedán"" no existe."',
+            '5,IMP003,Placa repetida en el archivo.',
+            '6,IMP004,"Transmisión no válida: ""cvt""."',
+        ])
+        self.existing.refresh_from_db()
+        # Actualiza los datos pero conserva el estado que fijan los alquileres
+        self.assertEqual((self.existing.model, self.existing.daily_rate, self.existing.status),
+                         ('Prado', Decimal('150.50'), 'alquilado'))
+        self.assertEqual(Vehicle.objects.get(license_plate='IMP003').status, 'disponible')
+        self.assertEqual(list(search_vehicles(Vehicle.objects.all(), 'prado')), [self.existing])
+        self.assertEqual(get_dashboard_metrics()['total_vehicles'], 2)
+
+    def test_xlsx_upload_and_export_round_trip(self):
+        from openpyxl import Workbook
+
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['license_plate', 'brand', 'model', 'year', 'category', 'transmission', 'daily_rate', 'capacity'])
+        ws.append(['XLS001', 'Mazda', 'CX-5', 2022.0, 'Camioneta', 'automatica', 120, 5])
+        buffer = BytesIO()
+        wb.save(buffer)
+        upload = SimpleUploadedFile('flota.xlsx', buffer.getvalue())
+
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('vehicles_import'), {'file': upload, 'create_categories': 'on'})
+        self.assertContains(response, '1 vehículos creados')
+        vehicle = Vehicle.objects.get(license_plate='XLS001')
+        self.assertEqual((vehicle.year, vehicle.category.name), (2022, 'Camioneta'))
+
+        export = self.client.get(reverse('vehicles_export'))
+        lines = b''.join(export.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('XLS001,Mazda,CX-5,2022,Camioneta,automatica,120.00,5,disponible,', lines)
+
+
+class BulkStatusTests(TestCase):
+    """Cambios de estado masivos con QuerySet.update"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.customer = User.objects.create_user('ana')
+        category = Category.objects.create(name='SUV')
+        cls.vehicles = [make_vehicle(category, f'BLK00{i}') for i in range(3)]
+
+    def activate(self, vehicle, start, end):
+        rental = book_vehicle(self.customer, vehicle.id, start, end)
+        rental.status = 'activo'
+        rental.save()
+        return rental
+
+    def test_close_due_rentals_releases_vehicles(self):
+        due = [self.activate(v, date(2030, 1, 1), date(2030, 1, 5)) for v in self.vehicles[:2]]
+        running = self.activate(self.vehicles[2], date(2030, 1, 1), date(2030, 1, 20))
+        Vehicle.objects.filter(pk__in=[v.pk for v in self.vehicles]).update(status='alquilado')
+        rebuild_metrics()
+
+        out = StringIO()
+        call_command('close_due_rentals', date='2030-01-10', batch_size=1, stdout=out)
+        self.assertIn('2/2', out.getvalue())
+
+        self.assertEqual(
+            set(Rental.objects.filter(status='completado').values_list('id', flat=True)), {r.id for r in due}
+        )
+        self.assertFalse(VehicleOccupancy.objects.filter(rental__in=due).exists())
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('license_plate', 'status')),
+            {'BLK000': 'disponible', 'BLK001': 'disponible', 'BLK002': 'alquilado'},
+        )
+        # Las métricas incrementales coinciden con un recálculo completo
+        incremental = get_dashboard_metrics()
+        rebuild_metrics()
+        self.assertEqual(get_dashboard_metrics()['status_distribution'], incremental['status_distribution'])
+        self.assertEqual(get_dashboard_metrics()['total_revenue'], incremental['total_revenue'])
+        self.assertEqual(incremental['available_vehicles'], 2)
+        running.refresh_from_db()
+        self.assertEqual(running.status, 'activo')
+
+    def test_only_affected_vehicles_are_synced(self):
+        due = self.activate(self.vehicles[0], date(2030, 1, 1), date(2030, 1, 5))
+        # Un vehículo sin alquiler activo que quedó 'alquilado' por error
+        Vehicle.objects.filter(pk=self.vehicles[1].pk).update(status='alquilado')
+        rebuild_metrics()
+        with CaptureQueriesContext(connection) as queries:
+            bulk_update_status(Rental.objects.filter(pk=due.pk), 'completado')
+        vehicle_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "rental_vehicle"')]
+        self.assertEqual(len(vehicle_updates), 2)
+        self.assertTrue(all(f'IN ({due.vehicle_id})' in sql for sql in vehicle_updates))
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('license_plate', 'status')),
+            {'BLK000': 'disponible', 'BLK001': 'alquilado', 'BLK002': 'disponible'},
+        )
+        self.assertEqual(get_dashboard_metrics()['available_vehicles'], 2)
+
+        out = StringIO()
+        call_command('sync_vehicle_statuses', stdout=out)
+        self.assertIn('0 vehículos pasaron a alquilado y 1 a disponible', out.getvalue())
+        self.assertEqual(get_dashboard_metrics()['available_vehicles'], 3)
+
+    def test_bulk_endpoint_respects_transitions(self):
+        pending = book_vehicle(self.customer, self.vehicles[0].id, date(2030, 2, 1), date(2030, 2, 3))
+        self.client.force_login(self.admin)
+        url = reverse('rentals_bulk_status')
+
+        response = self.client.post(url, {'ids': [pending.pk], 'new_status': 'completado'},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'status': 'completado', 'updated': 0})
+
+        response = self.client.post(url, {'apply_to': 'filter', 'status': 'pendiente', 'new_status': 'activo'},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'status': 'activo', 'updated': 1})
+        self.vehicles[0].refresh_from_db()
+        self.assertEqual(self.vehicles[0].status, 'alquilado')
+
+        response = self.client.post(url, {'ids': [pending.pk], 'new_status': 'pendiente'},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerateLoadDataTests(TestCase):
+    """Datos sintéticos: volumen pedido, sin solapes y deterministas por semilla"""
+
+    def generate(self, **options):
+        options = {'vehicles': 6, 'users': 10, 'rentals': 60, 'today': '2030-06-15',
+                   'days_back': 120, 'days_ahead': 30, 'batch_size': 7, **options}
+        call_command('generate_load_data', stdout=StringIO(), **options)
+        return list(Rental.objects.order_by('id').values_list(
+            'client__username', 'vehicle__license_plate', 'start_date', 'end_date', 'status', 'total_amount'
+        ))
+
+    def test_generates_consistent_data(self):
+        rentals = self.generate()
+        self.assertEqual(len(rentals), 60)
+        self.assertEqual(Vehicle.objects.filter(license_plate__startswith='LD').count(), 6)
+        self.assertEqual(User.objects.filter(username__startswith='ld_user').count(), 10)
+        self.assertEqual(UserProfile.objects.get(user__username='ld_admin').role, 'admin')
+
+        by_vehicle = {}
+        for _, plate, start, end, status, _ in rentals:
+            self.assertLessEqual(start, end)
+            by_vehicle.setdefault(plate, []).append((start, end))
+        for periods in by_vehicle.values():
+            periods.sort()
+            for (_, previous_end), (next_start, _) in zip(periods, periods[1:]):
+                self.assertLess(previous_end, next_start)
+
+        open_rentals = Rental.objects.filter(status__in=Rental.ACTIVE_STATUSES)
+        self.assertEqual(
+            VehicleOccupancy.objects.count(),
+            sum((r.end_date - r.start_date).days for r in open_rentals),
+        )
+        self.assertFalse(Rental.objects.filter(status='activo', vehicle__status='disponible').exists())
+        metrics = get_dashboard_metrics()
+        self.assertEqual(metrics['total_vehicles'], 6)
+        self.assertEqual(metrics['active_rentals'], Rental.objects.filter(status='activo').count())
+
+    def test_same_seed_same_data(self):
+        first = self.generate()
+        self.assertEqual(self.generate(purge=True), first)
+        self.assertNotEqual(self.generate(purge=True, seed=7), first)
+
+
+class ExplainQueriesTests(TestCase):
+    """Cada consulta principal de las vistas usa índices en la base de pruebas"""
+
+    def test_target_queries_use_indexes(self):
+        call_command('generate_load_data', stdout=StringIO(), vehicles=20, users=20, rentals=200,
+                     today='2030-06-15', days_back=120, days_ahead=30)
+        for name, queryset in ExplainQueriesCommand().queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertTrue(uses_index(plan), plan)
+        self.assertFalse(uses_index('SCAN rental_rental'))
+        self.assertFalse(uses_index('Seq Scan on rental_rental'))
+
+    def test_command_report(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('Todas las consultas usan índices.', out.getvalue())
+
+
+class BenchmarkGateTests(unittest.TestCase):
+    """Comparación de resultados de benchmarks contra la línea base"""
+
+    def result(self, **cases):
+        return {'scales': {'small': {'cases': {
+            name: {'median_ms': ms, 'queries': queries} for name, (ms, queries) in cases.items()
+        }}}}
+
+    def test_flags_slower_cases_and_extra_queries(self):
+        from benchmarks.compare import compare, regressions
+
+        baseline = self.result(dashboard=(10.0, 5), vehicles_list=(1.0, 3), export=(100.0, 2))
+        current = self.result(dashboard=(14.0, 5), vehicles_list=(2.0, 3), export=(101.0, 3), nuevo=(5.0, 1))
+        found = {name: reason for _, name, _, _, reason in regressions(compare(baseline, current, threshold=0.25))}
+        # vehicles_list duplica su tiempo pero por debajo del mínimo absoluto (ruido)
+        self.assertEqual(set(found), {'dashboard', 'export'})
+        self.assertIn('latencia', found['dashboard'])
+        self.assertIn('+1 consultas', found['export'])
+
+    def test_stored_baseline(self):
+        from benchmarks import compare
+
+        path = Path(__file__).resolve().parent.parent / 'benchmarks' / 'baseline.json'
+        baseline = compare.load(path)
+        self.assertTrue(baseline['scales']['small']['cases'])
+        self.assertEqual(compare.environment_changes(baseline, baseline), [])
+        current = {'meta': {**baseline['meta'], 'database': 'postgresql'}}
+        self.assertEqual([key for key, _, _ in compare.environment_changes(baseline, current)], ['database'])
+        with self.assertRaises(SystemExit), patch('sys.stderr', StringIO()):
+            compare.main([str(path), '/no/existe.json'])
+
+
+@override_settings(PAGINATION_PAGE_SIZE=2)
+class ApiTests(TestCase):
+    """API JSON: proyecciones, cursor y GET condicional"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='SUV')
+        cls.vehicles = [make_vehicle(cls.category, f'API00{i}', capacity=4 + i) for i in range(5)]
+        cls.customer = User.objects.create_user('ana')
+        cls.other = User.objects.create_user('luis')
+
+    def test_fields_and_cursor_pagination(self):
+        url = reverse('api_vehicles') + '?fields=id,license_plate,category_name&capacity=5'
+        plates = []
+        while url:
+            data = self.client.get(url).json()
+            for item in data['results']:
+                self.assertEqual(set(item), {'id', 'license_plate', 'category_name'})
+                plates.append(item['license_plate'])
+            url = data['next']
+        self.assertEqual(plates, ['API004', 'API003', 'API002', 'API001'])
+        response = self.client.get(reverse('api_vehicles'), {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api_vehicles')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Renombrar la categoría cambia el contenido (category_name)
+        self.category.name = 'Camionetas'
+        self.category.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Camionetas')
+
+    def test_availability_etag_follows_bookings(self):
+        url = reverse('api_vehicles') + '?start_date=2030-03-01&end_date=2030-03-05&fields=license_plate&page_size=10'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(len(response.json()['results']), 5)
+        book_vehicle(self.customer, self.vehicles[0].id, date(2030, 3, 2), date(2030, 3, 4))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('API000', [item['license_plate'] for item in response.json()['results']])
+
+    def test_rentals_are_private(self):
+        self.assertEqual(self.client.get(reverse('api_rentals')).status_code, 401)
+        own = book_vehicle(self.customer, self.vehicles[0].id, date(2030, 4, 1), date(2030, 4, 3))
+        book_vehicle(self.other, self.vehicles[1].id, date(2030, 4, 1), date(2030, 4, 3))
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('api_rentals'), {'fields': 'id,status,total_amount'})
+        self.assertEqual(response.json()['results'], [{'id': own.id, 'status': 'pendiente', 'total_amount': '300.00'}])
+        self.assertIn('private', response['Cache-Control'])
+
+
+class AsyncUrlConf:
+    """Rutas con las vistas asíncronas, como bajo ASGI (ASYNC_VIEWS)"""
+    urlpatterns = get_urlpatterns(async_views=True)
+
+
+@override_settings(ROOT_URLCONF=AsyncUrlConf)
+class AsyncViewTests(TestCase):
+    """Versiones asíncronas de catálogo, dashboard, exportaciones y API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        category = Category.objects.create(name='SUV')
+        cls.vehicle = make_vehicle(category, 'ASY001')
+        customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        book_vehicle(customer, cls.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+
+    async def test_csv_exports_stream_asynchronously(self):
+        await self.async_client.aforce_login(self.admin)
+        for name, expected in (('export_rentals_csv', 'Ana Pérez'), ('vehicles_export', 'ASY001')):
+            response = await self.async_client.get(reverse(name))
+            self.assertTrue(response.is_async)
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+            self.assertIn(expected, body)
+
+    async def test_catalog_and_dashboard(self):
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_vehicles'], 1)
+        self.assertEqual(len(response.context['recent_rentals']), 1)
+        response = await self.async_client.get(reverse('vehicles_list'))
+        self.assertContains(response, 'Toyota RAV4')
+
+    def test_urls_pick_views_by_mode(self):
+        self.assertTrue(iscoroutinefunction(resolve('/vehicles/').func))
+        with override_settings(ROOT_URLCONF='vehiclerental.urls'):
+            self.assertFalse(iscoroutinefunction(resolve('/vehicles/').func))
+
+    async def test_api_is_async(self):
+        response = await self.async_client.get(reverse('api_rentals'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('api_vehicles'), {'fields': 'license_plate'})
+        self.assertEqual(response.json()['results'], [{'license_plate': 'ASY001'}])
+
+
+class PricingTests(TestCase):
+    """Tarifas de temporada, descuentos por duración y presupuestos en lote"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.suv = Category.objects.create(name='SUV')
+        cls.sedan = Category.objects.create(name='Sedán')
+        cls.vehicle = make_vehicle(cls.suv, 'PRC001')
+        cls.customer = User.objects.create_user('ana', password='x')
+
+    def test_flat_price_without_rules(self):
+        result = pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3))
+        self.assertEqual((result.days, result.total), (3, Decimal('300.00')))
+
+    def test_category_rule_beats_general_rule(self):
+        PricingRule.objects.create(name='Alta', start_date=date(2030, 1, 2), end_date=date(2030, 1, 31),
+                                   rate_multiplier=Decimal('1.5'), priority=10)
+        PricingRule.objects.create(name='SUV alta', category=self.suv, start_date=date(2030, 1, 3),
+                                   end_date=date(2030, 1, 3), rate_multiplier=Decimal('2'))
+        sedan = make_vehicle(self.sedan, 'PRC002')
+        # 1 de enero sin regla, 2 general (x1.5), 3 de la categoría (x2)
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('450.00'))
+        self.assertEqual(pricing.quote(sedan, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('400.00'))
+
+    def test_duration_discount(self):
+        DurationDiscount.objects.create(min_days=7, percent=Decimal('10'))
+        DurationDiscount.objects.create(min_days=30, percent=Decimal('25'))
+        DurationDiscount.objects.create(category=self.sedan, min_days=3, percent=Decimal('5'))
+        week = pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 7))
+        self.assertEqual((week.subtotal, week.discount, week.total), (Decimal('700.00'), Decimal('70.00'), Decimal('630.00')))
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 30)).total, Decimal('2250.00'))
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 6)).discount, 0)
+
+    def test_rental_save_reprices_only_when_inputs_change(self):
+        rental = book_vehicle(self.customer, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        PricingRule.objects.create(name='Alta', start_date=date(2030, 1, 1), end_date=date(2030, 1, 31),
+                                   rate_multiplier=Decimal('2'))
+        rental = Rental.objects.get(pk=rental.pk)
+        rental.status = 'activo'
+        rental.save()
+        self.assertEqual(Rental.objects.get(pk=rental.pk).total_amount, Decimal('300.00'))
+        rental.end_date = date(2030, 1, 4)
+        rental.save()
+        rental.refresh_from_db()
+        self.assertEqual((rental.days, rental.total_amount), (4, Decimal('800.00')))
+
+    def test_quote_vehicles_shares_quotes(self):
+        other = make_vehicle(self.suv, 'PRC002')
+        pricey = make_vehicle(self.suv, 'PRC003', daily_rate=Decimal('150.00'))
+        pricing.get_table()
+        pricing.quote_vehicles([self.vehicle], date(2030, 1, 1), date(2030, 1, 3))
+        # Tabla ya cargada para esta versión: solo se consulta la versión
+        with self.assertNumQueries(1):
+            quotes = pricing.quote_vehicles([self.vehicle, other, pricey], date(2030, 1, 1), date(2030, 1, 3))
+        self.assertIs(quotes[self.vehicle.id], quotes[other.id])
+        self.assertEqual(quotes[pricey.id].total, Decimal('450.00'))
+
+    def test_bulk_paths_bump_version(self):
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('300.00'))
+        PricingRule.objects.bulk_create([PricingRule(name='Alta', start_date=date(2030, 1, 1),
+                                                     end_date=date(2030, 1, 31), rate_multiplier=Decimal('2'))])
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('600.00'))
+        # Sin tocar updated_at, como los demás cambios masivos
+        PricingRule.objects.update(rate_multiplier=Decimal('1.5'))
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('450.00'))
+        rule = PricingRule.objects.get()
+        rule.rate_multiplier = Decimal('3')
+        PricingRule.objects.bulk_update([rule], ['rate_multiplier'])
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('900.00'))
+        PricingRule.objects.all().delete()
+        rental = book_vehicle(self.customer, self.vehicle.id, date(2030, 1, 1), date(2030, 1, 3))
+        self.assertEqual(rental.total_amount, Decimal('300.00'))
+
+    def test_version_from_another_process(self):
+        # Otro proceso guardó una regla: aquí no hubo señal, solo cambió la fila de versión
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('300.00'))
+        with patch.object(pricing, 'bump_pricing_version'):
+            PricingRule.objects.create(name='Alta', start_date=date(2030, 1, 1), end_date=date(2030, 1, 31),
+                                       rate_multiplier=Decimal('2'))
+        self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total, Decimal('300.00'))
+        PricingVersion.objects.update(value=F('value') + 1)
+        with self.assertNumQueries(3):
+            self.assertEqual(pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3)).total,
+                             Decimal('600.00'))
+        # Memorizado: solo se lee la versión
+        with self.assertNumQueries(1):
+            pricing.quote(self.vehicle, date(2030, 1, 1), date(2030, 1, 3))
+
+    def test_catalog_and_booking_form_show_total(self):
+        DurationDiscount.objects.create(min_days=3, percent=Decimal('10'))
+        self.client.force_login(self.customer)
+        params = {'start_date': '2030-01-01', 'end_date': '2030-01-03'}
+        self.assertContains(self.client.get(reverse('vehicles_list'), params), '$270,00')
+        response = self.client.get(reverse('rental_create', args=[self.vehicle.id]), params)
+        self.assertEqual(response.context['quote'].total, Decimal('270.00'))
+        # Una regla nueva invalida la grilla en caché
+        PricingRule.objects.create(name='Alta', start_date=date(2030, 1, 1), end_date=date(2030, 1, 31),
+                                   rate_multiplier=Decimal('2'))
+        self.assertContains(self.client.get(reverse('vehicles_list'), params), '$540,00')
+
+
+class RollupTests(TestCase):
+    """Resúmenes de ocupación e ingresos y página de reportes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.suv = Category.objects.create(name='SUV')
+        cls.sedan = Category.objects.create(name='Sedán')
+        cls.suv_1 = make_vehicle(cls.suv, 'RLP001')
+        cls.suv_2 = make_vehicle(cls.suv, 'RLP002')
+        cls.sedan_1 = make_vehicle(cls.sedan, 'RLP003', daily_rate=Decimal('50.00'))
+        customer = User.objects.create_user('ana', password='x')
+        # Cruza de enero a febrero: 10 días, 1000
+        crossing = book_vehicle(customer, cls.suv_1.id, date(2030, 1, 27), date(2030, 2, 5))
+        Rental.objects.filter(pk=crossing.pk).update(status='completado')
+        book_vehicle(customer, cls.suv_2.id, date(2030, 2, 1), date(2030, 2, 2))
+        Rental.objects.filter(vehicle=cls.suv_2).update(status='activo')
+        # Pendiente y cancelado no cuentan
+        book_vehicle(customer, cls.sedan_1.id, date(2030, 1, 1), date(2030, 1, 3))
+        cancelled = book_vehicle(customer, cls.sedan_1.id, date(2030, 1, 10), date(2030, 1, 12))
+        Rental.objects.filter(pk=cancelled.pk).update(status='cancelado')
+
+    def test_revenue_is_prorated_by_day_and_month(self):
+        rebuild_rollups(today=date(2030, 1, 1))
+        monthly = dict(
+            VehicleMonthlyStat.objects.filter(vehicle=self.suv_1).values_list('month', 'revenue')
+        )
+        self.assertEqual(monthly, {date(2030, 1, 1): Decimal('500.00'), date(2030, 2, 1): Decimal('500.00')})
+        feb_1 = CategoryDailyStat.objects.get(category=self.suv, day=date(2030, 2, 1))
+        self.assertEqual((feb_1.fleet, feb_1.rented, feb_1.rentals_started, feb_1.revenue),
+                         (2, 2, 1, Decimal('200.00')))
+        self.assertFalse(CategoryDailyStat.objects.filter(category=self.suv, day=date(2030, 2, 6), rented__gt=0).exists())
+        self.assertFalse(VehicleMonthlyStat.objects.filter(vehicle=self.sedan_1).exists())
+
+    def test_since_only_rewrites_later_months(self):
+        rebuild_rollups(today=date(2030, 1, 1))
+        CategoryDailyStat.objects.filter(day__lt=date(2030, 2, 1)).update(revenue=0)
+        rebuild_rollups(since=date(2030, 2, 15), today=date(2030, 1, 1))
+        self.assertEqual(CategoryDailyStat.objects.get(category=self.suv, day=date(2030, 1, 27)).revenue, 0)
+        self.assertEqual(CategoryDailyStat.objects.get(category=self.suv, day=date(2030, 2, 2)).revenue, Decimal('200.00'))
+        self.assertEqual(VehicleMonthlyStat.objects.get(vehicle=self.suv_1, month=date(2030, 2, 1)).rented_days, 5)
+
+    def test_command_and_report_page(self):
+        call_command('rollup_reports', stdout=StringIO())
+        self.client.force_login(self.admin)
+        url = reverse('reports')
+        # Sesión, usuario, categorías del filtro, resúmenes y vehículos: sin tocar Rental
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'start_month': '2030-01', 'end_month': '2030-02'})
+        self.assertFalse([q for q in queries if 'rental_rental' in q['sql']])
+        report = response.context['report']
+        self.assertEqual(report['months'], ['2030-01', '2030-02'])
+        self.assertEqual(report['revenue'], Decimal('1200.00'))
+        suv = report['categories'][0]
+        self.assertEqual((suv['name'], suv['revenue_by_month']), ('SUV', [500.0, 700.0]))
+        self.assertEqual([v.license_plate for v in response.context['top_vehicles']], ['RLP001', 'RLP002'])
+        response = self.client.get(url, {'category': self.sedan.id, 'start_month': '2030-01', 'end_month': '2030-02'})
+        self.assertEqual(response.context['report']['revenue'], 0)
+
+
+class AdminTests(TestCase):
+    """Admin para tablas grandes: consultas por página, conteo estimado y acciones masivas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser('root', 'root@example.com', 'x')
+        cls.category = Category.objects.create(name='SUV')
+        cls.vehicles = [make_vehicle(cls.category, f'ADM{i:03}') for i in range(3)]
+        cls.customer = User.objects.create_user('ana', first_name='Ana', last_name='Pérez')
+        for i, vehicle in enumerate(cls.vehicles):
+            book_vehicle(cls.customer, vehicle.id, date(2030, 1, 1 + i), date(2030, 1, 3 + i))
+
+    def setUp(self):
+        self.client.force_login(self.superuser)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:rental_rental_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for i in range(3):
+            book_vehicle(self.customer, self.vehicles[i].id, date(2030, 2, 1), date(2030, 2, 2))
+        with CaptureQueriesContext(connection) as more:
+            response = self.client.get(url)
+        self.assertEqual(len(more), len(few))
+        self.assertContains(response, 'ADM002')
+
+    def test_estimated_count_without_filters(self):
+        url = reverse('admin:rental_rental_changelist')
+        with patch.object(rental_admin, 'estimated_count', return_value=2_000_000):
+            response = self.client.get(url)
+            self.assertEqual(response.context['cl'].result_count, 2_000_000)
+            response = self.client.get(url, {'status__exact': 'pendiente'})
+            self.assertEqual(response.context['cl'].result_count, 3)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'sqlite_stat1')
+    def test_estimated_count_ignores_partial_indexes(self):
+        call_command('generate_load_data', stdout=StringIO(), vehicles=20, users=20, rentals=300,
+                     today='2030-06-15', days_back=120, days_ahead=30)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE idx = 'rental_pending_start_idx'")
+            partial = int(cursor.fetchone()[0].split()[0])
+        total = Rental.objects.count()
+        self.assertLess(partial, total)
+        self.assertEqual(rental_admin.estimated_count(Rental), total)
+        self.assertEqual(rental_admin.estimated_count(Vehicle), Vehicle.objects.count())
+
+    def test_search_and_autocomplete_use_indexes(self):
+        response = self.client.get(reverse('admin:rental_rental_changelist'), {'q': 'perez'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'term': 'adm001', 'app_label': 'rental', 'model_name': 'rental', 'field_name': 'vehicle',
+        })
+        self.assertEqual([item['text'] for item in response.json()['results']], ['Toyota RAV4 (ADM001)'])
+
+    def test_bulk_actions(self):
+        changelist = reverse('admin:rental_rental_changelist')
+        ids = list(Rental.objects.order_by('id').values_list('id', flat=True))
+        self.client.post(changelist, {'action': 'mark_active', '_selected_action': ids})
+        self.client.post(changelist, {'action': 'mark_completed', '_selected_action': ids[:2]})
+        self.assertEqual(
+            dict(Rental.objects.values_list('status').annotate(n=Count('id'))), {'completado': 2, 'activo': 1}
+        )
+        self.assertEqual(Vehicle.objects.filter(status='alquilado').count(), 1)
+        # Un vehículo quedó alquilado por error y otro en mantenimiento
+        Vehicle.objects.filter(pk=self.vehicles[0].pk).update(status='alquilado')
+        Vehicle.objects.filter(pk=self.vehicles[1].pk).update(status='mantenimiento')
+        rebuild_metrics()
+        self.client.post(reverse('admin:rental_vehicle_changelist'), {
+            'action': 'release', '_selected_action': [vehicle.id for vehicle in self.vehicles],
+        })
+        # El mantenimiento solo termina con su propia acción
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('license_plate', 'status')),
+            {'ADM000': 'disponible', 'ADM001': 'mantenimiento', 'ADM002': 'alquilado'},
+        )
+        self.assertEqual(get_dashboard_metrics()['available_vehicles'], 1)
+        self.client.post(reverse('admin:rental_vehicle_changelist'), {
+            'action': 'end_maintenance', '_selected_action': [vehicle.id for vehicle in self.vehicles],
+        })
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('license_plate', 'status')),
+            {'ADM000': 'disponible', 'ADM001': 'disponible', 'ADM002': 'alquilado'},
+        )
+        self.assertEqual(get_dashboard_metrics()['available_vehicles'], 2)
+
+
+class PinnedFormTests(TestCase):
+    """Formularios que no cargan la flota entera en un select"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='admin123')
+        UserProfile.objects.create(user=cls.admin, role='admin')
+        cls.customer = User.objects.create_user('ana', password='x')
+        cls.category = Category.objects.create(name='SUV')
+        cls.vehicle = make_vehicle(cls.category, 'PIN001')
+        cls.other = make_vehicle(cls.category, 'PIN002', brand='Mazda', model='CX-5')
+
+    def test_booking_page_is_constant_in_fleet_size(self):
+        self.client.force_login(self.customer)
+        url = reverse('rental_create', args=[self.vehicle.id])
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        for i in range(10):
+            make_vehicle(self.category, f'PIN1{i:02}')
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url)
+        self.assertEqual(len(after), len(before))
+        self.assertNotContains(response, '<option')
+        self.assertContains(response, f'<input type="hidden" name="vehicle" value="{self.vehicle.id}"', html=False)
+
+    def test_booking_rejects_another_vehicle(self):
+        self.client.force_login(self.customer)
+        url = reverse('rental_create', args=[self.vehicle.id])
+        data = {'vehicle': self.other.id, 'start_date': '2030-01-01', 'end_date': '2030-01-03'}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Rental.objects.exists())
+        data['vehicle'] = self.vehicle.id
+        self.assertRedirects(self.client.post(url, data), reverse('my_rentals'))
+        self.assertEqual(Rental.objects.get().vehicle, self.vehicle)
+
+    def test_booking_checks_overlap_once(self):
+        self.client.force_login(self.customer)
+        url = reverse('rental_create', args=[self.vehicle.id])
+        data = {'vehicle': self.vehicle.id, 'start_date': '2030-01-01', 'end_date': '2030-01-03'}
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(url, data)
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'rental_vehicleoccupancy' in q['sql']])
+        # La restricción única sigue rechazando el solape
+        response = self.client.post(url, {**data, 'start_date': '2030-01-02', 'end_date': '2030-01-04'})
+        self.assertContains(response, 'ya está reservado')
+        self.assertEqual(Rental.objects.count(), 1)
+
+    def test_autocomplete_renders_only_selected_option(self):
+        html = RentalForm(initial={'vehicle': self.other.id})['vehicle'].as_widget()
+        self.assertIn('data-autocomplete-url="/dashboard/autocomplete/vehicles/"', html)
+        self.assertIn('Mazda CX-5 (PIN002)', html)
+        self.assertNotIn('PIN001', html)
+
+    def test_autocomplete_ignores_tampered_value(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('vehicle_create'), {
+            'license_plate': 'PIN999', 'brand': 'Kia', 'model': 'Rio', 'year': 2022, 'category': 'abc',
+            'transmission': 'manual', 'daily_rate': '50.00', 'capacity': 5,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'name="category"')
+        html = RentalForm(data={'vehicle': "1 OR 1=1"})['vehicle'].as_widget()
+        self.assertNotIn('PIN00', html)
+
+    def test_autocomplete_endpoints(self):
+        url = reverse('autocomplete_vehicles')
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.admin)
+        response = self.client.get(url, {'term': 'mazda'})
+        self.assertEqual(response.json(), {'results': [{'id': self.other.id, 'text': 'Mazda CX-5 (PIN002)'}], 'more': False})
+        response = self.client.get(reverse('autocomplete_categories'), {'term': 'su'})
+        self.assertEqual(response.json()['results'], [{'id': self.category.id, 'text': 'SUV'}])
+
+
+class SchedulerTests(TestCase):
+    """Transiciones programadas (rental/scheduler.py)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('ana')
+        category = Category.objects.create(name='SUV')
+        cls.vehicles = [make_vehicle(category, f'SCH00{i}') for i in range(4)]
+
+    def setUp(self):
+        self.enterContext(patch.object(scheduler.logger, 'disabled', True))
+        v0, v1, v2, v3 = self.vehicles
+        self.due = self.book(v0, date(2030, 1, 1), date(2030, 1, 8), status='activo')
+        self.running = self.book(v1, date(2030, 1, 1), date(2030, 1, 20), status='activo')
+        self.starting = self.book(v2, date(2030, 1, 8), date(2030, 1, 12))
+        self.future = self.book(v3, date(2030, 1, 15), date(2030, 1, 18))
+        self.stale = self.book(v3, date(2030, 1, 2), date(2030, 1, 4))
+        Vehicle.objects.filter(pk__in=[v0.pk, v1.pk]).update(status='alquilado')
+        rebuild_metrics()
+
+    def book(self, vehicle, start, end, status='pendiente'):
+        rental = book_vehicle(self.customer, vehicle.id, start, end)
+        if status != rental.status:
+            rental.status = status
+            rental.save()
+        return rental
+
+    def statuses(self):
+        return dict(Rental.objects.values_list('id', 'status'))
+
+    def test_run_applies_transitions_once(self):
+        stats = scheduler.run_once(today=date(2030, 1, 10))
+        self.assertEqual(
+            {key: stats[key] for key in ('completed', 'activated', 'overdue', 'stale_pending')},
+            {'completed': 1, 'activated': 1, 'overdue': 0, 'stale_pending': 1},
+        )
+        self.assertEqual((stats['vehicles_rented'], stats['vehicles_released']), (1, 1))
+        self.assertEqual(self.statuses(), {
+            self.due.id: 'completado', self.running.id: 'activo', self.starting.id: 'activo',
+            self.future.id: 'pendiente', self.stale.id: 'pendiente',
+        })
+        self.assertEqual(
+            dict(Vehicle.objects.values_list('license_plate', 'status')),
+            {'SCH000': 'disponible', 'SCH001': 'alquilado', 'SCH002': 'alquilado', 'SCH003': 'disponible'},
+        )
+        run = SchedulerRun.objects.get()
+        self.assertEqual((run.status, run.stats['completed']), ('ok', 1))
+        self.assertIsNotNone(run.finished_at)
+        # Métricas incrementales iguales a un recálculo
+        incremental = get_dashboard_metrics()
+        rebuild_metrics()
+        self.assertEqual(get_dashboard_metrics()['status_distribution'], incremental['status_distribution'])
+
+        # Idempotente
+        again = scheduler.run_once(today=date(2030, 1, 10))
+        self.assertEqual([again[key] for key in ('completed', 'activated', 'vehicles_rented')], [0, 0, 0])
+        self.assertEqual(SchedulerRun.objects.filter(status='ok').count(), 2)
+
+    @override_settings(SCHEDULER_GRACE_DAYS=3, SCHEDULER_CANCEL_PENDING=True)
+    def test_grace_days_flag_overdue(self):
+        stats = scheduler.run_once(today=date(2030, 1, 10))
+        self.assertEqual((stats['completed'], stats['overdue'], stats['cancelled']), (0, 1, 1))
+        self.assertNotIn('stale_pending', stats)
+        self.assertEqual(self.statuses()[self.stale.id], 'cancelado')
+        stats = scheduler.run_once(today=date(2030, 1, 12))
+        self.assertEqual((stats['completed'], stats['overdue']), (1, 0))
+
+    @override_settings(SCHEDULER_OVERDUE_POLICY='flag')
+    def test_flag_policy_never_completes(self):
+        stats = scheduler.run_once(today=date(2030, 1, 30))
+        self.assertNotIn('completed', stats)
+        self.assertEqual(stats['overdue'], 2)
+        self.assertFalse(Rental.objects.filter(status='completado').exists())
+
+    def test_concurrent_run_is_skipped(self):
+        other = SchedulerRun.objects.create(job=scheduler.LIFECYCLE_JOB, run_date=date(2030, 1, 10))
+        before = self.statuses()
+        self.assertIsNone(scheduler.run_once(today=date(2030, 1, 10)))
+        self.assertEqual(self.statuses(), before)
+
+        # Una ejecución que no terminó se da por abandonada pasado SCHEDULER_LOCK_TIMEOUT
+        SchedulerRun.objects.filter(pk=other.pk).update(started_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNotNone(scheduler.run_once(today=date(2030, 1, 10)))
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'abandonada')
+
+    def test_command_dry_run(self):
+        out = StringIO()
+        call_command('run_scheduler', date='2030-01-10', dry_run=True, stdout=out)
+        self.assertIn('completed=1', out.getvalue())
+        self.assertIn('activated=1', out.getvalue())
+        self.assertEqual(self.statuses()[self.starting.id], 'pendiente')
+        self.assertFalse(SchedulerRun.objects.exists())
@@ -1,39 +1,69 @@
+from django.conf import settings
 from django.urls import path
-from . import views
-
-urlpatterns = [
-    # Públicas
-    path('', views.home, name='home'),
-    path('register/', views.register_view, name='register'),
-    path('login/', views.login_view, name='login'),
-    path('logout/', views.logout_view, name='logout'),
-    
-    # Cliente
-    path('vehicles/', views.vehicles_list, name='vehicles_list'),
-    path('rental/create/<int:vehicle_id>/', views.rental_create, name='rental_create'),
-    path('my-rentals/', views.my_rentals, name='my_rentals'),
-    path('my-rentals/edit/<int:pk>/', views.rental_edit_user, name='rental_edit_user'),
-    path('my-rentals/cancel/<int:pk>/', views.rental_cancel_user, name='rental_cancel_user'),
-    
-    # Administración
-    path('dashboard/', views.dashboard, name='dashboard'),
-    
-    # Vehículos
-    path('dashboard/vehicles/', views.vehicles_manage, name='vehicles_manage'),
-    path('dashboard/vehicles/create/', views.vehicle_create, name='vehicle_create'),
-    path('dashboard/vehicles/edit/<int:pk>/', views.vehicle_edit, name='vehicle_edit'),
-    path('dashboard/vehicles/delete/<int:pk>/', views.vehicle_delete, name='vehicle_delete'),
-    
-    # Categorías
-    path('dashboard/categories/', views.categories_manage, name='categories_manage'),
-    path('dashboard/categories/create/', views.category_create, name='category_create'),
-    path('dashboard/categories/edit/<int:pk>/', views.category_edit, name='category_edit'),
-    path('dashboard/categories/delete/<int:pk>/', views.category_delete, name='category_delete'),
-    
-    # Alquileres
-    path('dashboard/rentals/', views.rentals_manage, name='rentals_manage'),
-    path('dashboard/rentals/status/<int:pk>/', views.rental_update_status, name='rental_update_status'),
-    path('dashboard/rentals/export/', views.export_rentals_csv, name='export_rentals_csv'),
-    path('dashboard/rentals/contract/<int:pk>/', views.rental_contract_pdf, name='rental_contract_pdf'),
-    path('dashboard/rentals/export/xlsx/', views.export_rentals_excel, name='export_rentals_excel'),
-]
+from . import api, views
+
+
+def get_urlpatterns(async_views):
+    """Rutas de la aplicación.
+
+    Con ``async_views`` (ASGI, ver ``ASYNC_VIEWS``) el inicio, el catálogo, el
+    dashboard, las exportaciones y la API usan sus versiones asíncronas.
+    """
+    def view(name, module=views):
+        return getattr(module, 'a' + name if async_views else name)
+
+    return [
+        # Públicas
+        path('', view('home'), name='home'),
+        path('register/', views.register_view, name='register'),
+        path('login/', views.login_view, name='login'),
+        path('logout/', views.logout_view, name='logout'),
+
+        # Cliente
+        path('vehicles/', view('vehicles_list'), name='vehicles_list'),
+        path('rental/create/<int:vehicle_id>/', views.rental_create, name='rental_create'),
+        path('my-rentals/', views.my_rentals, name='my_rentals'),
+        path('my-rentals/edit/<int:pk>/', views.rental_edit_user, name='rental_edit_user'),
+        path('my-rentals/cancel/<int:pk>/', views.rental_cancel_user, name='rental_cancel_user'),
+
+        # Administración
+        path('dashboard/', view('dashboard'), name='dashboard'),
+        path('dashboard/metrics/', views.request_metrics, name='request_metrics'),
+        path('dashboard/reports/', views.reports, name='reports'),
+        path('dashboard/autocomplete/vehicles/', views.autocomplete_vehicles, name='autocomplete_vehicles'),
+        path('dashboard/autocomplete/categories/', views.autocomplete_categories, name='autocomplete_categories'),
+
+        # Vehículos
+        path('dashboard/vehicles/', views.vehicles_manage, name='vehicles_manage'),
+        path('dashboard/vehicles/create/', views.vehicle_create, name='vehicle_create'),
+        path('dashboard/vehicles/edit/<int:pk>/', views.vehicle_edit, name='vehicle_edit'),
+        path('dashboard/vehicles/delete/<int:pk>/', views.vehicle_delete, name='vehicle_delete'),
+        path('dashboard/vehicles/import/', views.vehicles_import, name='vehicles_import'),
+        path('dashboard/vehicles/export/', view('vehicles_export'), name='vehicles_export'),
+
+        # Categorías
+        path('dashboard/categories/', views.categories_manage, name='categories_manage'),
+        path('dashboard/categories/create/', views.category_create, name='category_create'),
+        path('dashboard/categories/edit/<int:pk>/', views.category_edit, name='category_edit'),
+        path('dashboard/categories/delete/<int:pk>/', views.category_delete, name='category_delete'),
+
+        # Alquileres
+        path('dashboard/rentals/', views.rentals_manage, name='rentals_manage'),
+        path('dashboard/rentals/status/<int:pk>/', views.rental_update_status, name='rental_update_status'),
+        path('dashboard/rentals/status/bulk/', views.rentals_bulk_status, name='rentals_bulk_status'),
+        path('dashboard/rentals/export/', view('export_rentals_csv'), name='export_rentals_csv'),
+        path('dashboard/rentals/contract/<int:pk>/', views.rental_contract_pdf, name='rental_contract_pdf'),
+        path('dashboard/rentals/contracts/zip/', views.rental_contracts_zip, name='rental_contracts_zip'),
+        path('dashboard/rentals/export/xlsx/', view('export_rentals_excel'), name='export_rentals_excel'),
+        path('dashboard/rentals/export/jobs/<uuid:job_id>/', views.export_job_status, name='export_job_status'),
+        path('dashboard/rentals/export/jobs/<uuid:job_id>/download/', views.export_job_download, name='export_job_download'),
+
+        # API JSON (solo lectura)
+        path('api/vehicles/', view('vehicles', api), name='api_vehicles'),
+        path('api/vehicles/<int:pk>/', view('vehicle_detail', api), name='api_vehicle_detail'),
+        path('api/categories/', view('categories', api), name='api_categories'),
+        path('api/rentals/', view('my_rentals', api), name='api_rentals'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.ASYNC_VIEWS)
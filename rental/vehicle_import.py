@@ -0,0 +1,301 @@
+"""
+Importación y exportación masiva de vehículos (CSV / XLSX).
+
+El archivo se recorre en streaming y se procesa por lotes de
+``IMPORT_BATCH_SIZE`` filas:
+
+1. Validación de cada fila en memoria (sin consultas): categorías y choices
+   se resuelven contra diccionarios cargados una sola vez.
+2. Placas repetidas dentro del archivo: error en la segunda aparición.
+3. Una consulta por lote para saber qué placas ya existen (solo para contar
+   creados / actualizados).
+4. ``bulk_create(update_conflicts=True)`` sobre ``license_plate``: inserta
+   los nuevos y actualiza los existentes en una sola sentencia.
+
+El estado de un vehículo existente no se modifica (lo gobiernan sus
+alquileres); solo se aplica al crearlo. ``bulk_create`` no emite señales, así
+que al final se actualizan a mano el índice de búsqueda, las métricas del
+dashboard y la versión de la caché del catálogo.
+"""
+import csv
+import io
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import metrics, search
+from .catalog_cache import bump_catalog_version
+from .exports import EXPORT_CHUNK_SIZE, Echo
+from .models import Category, Vehicle
+
+IMPORT_BATCH_SIZE = 2000
+
+IMPORT_COLUMNS = [
+    'license_plate', 'brand', 'model', 'year', 'category', 'transmission',
+    'daily_rate', 'capacity', 'status', 'description',
+]
+REQUIRED_COLUMNS = {'license_plate', 'brand', 'model', 'year', 'category', 'transmission', 'daily_rate', 'capacity'}
+
+# Campos que se sobrescriben cuando la placa ya existe
+UPDATE_FIELDS = ['brand', 'model', 'year', 'category', 'transmission', 'daily_rate', 'capacity', 'description', 'updated_at']
+
+
+def _aliases():
+    """Cabeceras aceptadas: nombre del campo o su etiqueta ('Placa', 'Tarifa Diaria'...)"""
+    aliases = {}
+    for name in IMPORT_COLUMNS:
+        verbose = str(Vehicle._meta.get_field(name).verbose_name)
+        aliases[name] = name
+        aliases[search.fold(verbose)] = name
+    return aliases
+
+
+def _choice_lookup(choices):
+    """Acepta el valor o la etiqueta, sin distinguir mayúsculas ni tildes"""
+    lookup = {}
+    for value, label in choices:
+        lookup[search.fold(value)] = value
+        lookup[search.fold(label)] = value
+    return lookup
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    rows: int = 0
+    errors: list = field(default_factory=list)  # (fila, placa, mensaje)
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+class RowError(ValueError):
+    pass
+
+
+class VehicleImporter:
+    """Valida y guarda filas de vehículos por lotes"""
+
+    def __init__(self, create_categories=False, dry_run=False, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        self.create_categories = create_categories
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.progress = progress
+        self.result = ImportResult()
+        self.categories = {search.fold(name): pk for pk, name in Category.objects.values_list('id', 'name')}
+        self.transmissions = _choice_lookup(Vehicle.TRANSMISSION_CHOICES)
+        self.statuses = _choice_lookup(Vehicle.STATUS_CHOICES)
+        self.max_year = datetime.now().year + 1
+        self.seen_plates = set()
+        self.touched_ids = []
+        self.created_by_status = Counter()
+
+    # --- Validación de una fila ---
+
+    def _category_id(self, name):
+        key = search.fold(name)
+        if key not in self.categories:
+            if not self.create_categories:
+                raise RowError(f'La categoría "{name}" no existe.')
+            if self.dry_run:
+                self.categories[key] = None
+            else:
+                self.categories[key] = Category.objects.get_or_create(name=name)[0].pk
+        return self.categories[key]
+
+    def parse_row(self, data):
+        """Devuelve un ``Vehicle`` sin guardar o lanza ``RowError``"""
+        missing = [name for name in REQUIRED_COLUMNS if not data.get(name)]
+        if missing:
+            raise RowError('Faltan valores: ' + ', '.join(sorted(missing)) + '.')
+        plate = data['license_plate'].strip().upper()
+        if len(plate) > Vehicle._meta.get_field('license_plate').max_length:
+            raise RowError('La placa es demasiado larga.')
+        try:
+            year = int(data['year'])
+            capacity = int(data['capacity'])
+        except (TypeError, ValueError):
+            raise RowError('Año y capacidad deben ser números enteros.')
+        if year > self.max_year:
+            raise RowError('El año no puede ser mayor al año siguiente.')
+        if year < 1900:
+            raise RowError('Año no válido.')
+        if capacity <= 0:
+            raise RowError('La capacidad debe ser mayor a 0.')
+        try:
+            daily_rate = Decimal(str(data['daily_rate']).replace(',', '.')).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RowError('Tarifa diaria no válida.')
+        if daily_rate <= 0:
+            raise RowError('La tarifa debe ser mayor a 0.')
+        transmission = self.transmissions.get(search.fold(data['transmission']))
+        if transmission is None:
+            raise RowError(f'Transmisión no válida: "{data["transmission"]}".')
+        status = self.statuses.get(search.fold(data.get('status') or 'disponible'))
+        if status is None:
+            raise RowError(f'Estado no válido: "{data["status"]}".')
+        return Vehicle(
+            license_plate=plate,
+            brand=data['brand'].strip(),
+            model=data['model'].strip(),
+            year=year,
+            category_id=self._category_id(data['category'].strip()),
+            transmission=transmission,
+            daily_rate=daily_rate,
+            capacity=capacity,
+            status=status,
+            description=(data.get('description') or '').strip(),
+        )
+
+    # --- Lotes ---
+
+    def run(self, rows):
+        """``rows``: iterable de (número de fila, dict columna -> valor)"""
+        batch = []
+        for line, data in rows:
+            self.result.rows += 1
+            plate = (data.get('license_plate') or '').strip().upper()
+            try:
+                vehicle = self.parse_row(data)
+                if vehicle.license_plate in self.seen_plates:
+                    raise RowError('Placa repetida en el archivo.')
+            except RowError as exc:
+                self.result.errors.append((line, plate, str(exc)))
+                continue
+            self.seen_plates.add(vehicle.license_plate)
+            batch.append(vehicle)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        self._finish()
+        return self.result
+
+    def _flush(self, batch):
+        plates = [vehicle.license_plate for vehicle in batch]
+        existing = set(Vehicle.objects.filter(license_plate__in=plates).values_list('license_plate', flat=True))
+        created = [vehicle for vehicle in batch if vehicle.license_plate not in existing]
+        self.result.created += len(created)
+        self.result.updated += len(batch) - len(created)
+        if not self.dry_run:
+            with transaction.atomic():
+                Vehicle.objects.bulk_create(
+                    batch,
+                    update_conflicts=True,
+                    unique_fields=['license_plate'],
+                    update_fields=UPDATE_FIELDS,
+                )
+            self.touched_ids.extend(Vehicle.objects.filter(license_plate__in=plates).values_list('id', flat=True))
+            self.created_by_status.update(vehicle.status for vehicle in created)
+        if self.progress:
+            self.progress(self.result)
+
+    def _finish(self):
+        if self.dry_run or not self.result.imported:
+            return
+        search.index_vehicles(self.touched_ids)
+        metrics.apply_change(
+            Counter(),
+            Counter({(metrics.VEHICLES_BY_STATUS, status): n for status, n in self.created_by_status.items()}),
+        )
+        bump_catalog_version()
+
+
+# --- Lectura de archivos ---
+
+def _normalize_header(header):
+    aliases = _aliases()
+    return [aliases.get(search.fold(str(name or '').strip())) for name in header]
+
+
+def _check_header(columns):
+    missing = REQUIRED_COLUMNS - set(columns)
+    if missing:
+        raise ValueError('Faltan columnas: ' + ', '.join(sorted(missing)) + '.')
+
+
+def read_csv(fileobj):
+    """Filas de un CSV (binario o texto); detecta ';' o ',' como separador"""
+    if not isinstance(fileobj, io.TextIOBase):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = fileobj.read(4096)
+    fileobj.seek(0)
+    dialect = csv.Sniffer().sniff(sample, delimiters=',;') if sample else csv.excel
+    reader = csv.reader(fileobj, dialect)
+    columns = _normalize_header(next(reader, []))
+    _check_header(columns)
+    for line, values in enumerate(reader, start=2):
+        if any(values):
+            yield line, {name: value for name, value in zip(columns, values) if name}
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel guarda los números como flotantes: 2022.0 -> '2022'
+        value = int(value)
+    return str(value)
+
+
+def read_xlsx(fileobj):
+    """Filas de la primera hoja de un XLSX (openpyxl en modo read-only)"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        columns = _normalize_header(next(rows, []))
+        _check_header(columns)
+        for line, values in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in values):
+                yield line, {name: _cell_text(value) for name, value in zip(columns, values) if name}
+    finally:
+        wb.close()
+
+
+def read_vehicle_rows(fileobj, filename):
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(fileobj)
+    if filename.lower().endswith('.csv'):
+        return read_csv(fileobj)
+    raise ValueError('Formato no soportado: use un archivo .csv o .xlsx.')
+
+
+def import_vehicles(fileobj, filename, **options):
+    """Importa un archivo de vehículos y devuelve un ``ImportResult``"""
+    return VehicleImporter(**options).run(read_vehicle_rows(fileobj, filename))
+
+
+def write_error_report(result, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(['fila', 'placa', 'error'])
+    writer.writerows(result.errors)
+
+
+# --- Exportación (mismo formato que la importación) ---
+
+EXPORT_FIELDS = [name if name != 'category' else 'category__name' for name in IMPORT_COLUMNS]
+
+
+def stream_vehicles_csv(vehicles, chunk_size=EXPORT_CHUNK_SIZE):
+    """Líneas CSV con las columnas de importación, para ``StreamingHttpResponse``"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(IMPORT_COLUMNS)
+    for row in vehicles.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+async def astream_vehicles_csv(vehicles, chunk_size=EXPORT_CHUNK_SIZE):
+    """Versión asíncrona de ``stream_vehicles_csv`` (``values().aiterator()``, ver
+    ``exports.arental_export_rows``)"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(IMPORT_COLUMNS)
+    async for row in vehicles.order_by('id').values(*EXPORT_FIELDS).aiterator(chunk_size=chunk_size):
+        yield writer.writerow(row.values())
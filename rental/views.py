@@ -2,35 +2,97 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count, Sum
-from django.http import HttpResponse
-from django.utils import timezone
-from datetime import datetime, timedelta
-import csv
-from django.template.loader import render_to_string
+from django.core.exceptions import ValidationError
+from django.http import (
+    HttpResponse, HttpResponseNotModified, StreamingHttpResponse, FileResponse, JsonResponse, Http404,
+    QueryDict,
+)
+from datetime import datetime
 from django.conf import settings
-import os
-from io import BytesIO
-from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from asgiref.sync import iscoroutinefunction, sync_to_async
+import asyncio
+import tempfile
 
 from .models import Vehicle, Category, Rental, UserProfile
 from .forms import (
     UserRegistrationForm, VehicleForm, CategoryForm, 
-    RentalForm, RentalFilterForm, RentalUpdateForm
+    RentalForm, RentalFilterForm, RentalUpdateForm, AvailabilityForm, VehicleImportForm, ReportFilterForm
 )
+from .availability import available_vehicles, refresh_vehicle_status
+from .services import BULK_TRANSITIONS, book_vehicle, bulk_update_status
+from .exports import (
+    astream_rentals_csv, stream_rentals_csv, write_rentals_xlsx, STATUS_LABELS, XLSX_CONTENT_TYPE,
+)
+from . import export_jobs
+from .metrics import aget_dashboard_metrics, get_dashboard_metrics
+from .pagination import apaginate_keyset, paginate_keyset
+from .search import SCORE, rank_vehicles, search_vehicles
+from .middleware import render_prometheus
+from .contracts import contract_etag, contract_status, build_contracts_zip
+from .roles import ais_staff_role, is_staff_role
+from .vehicle_import import IMPORT_COLUMNS, astream_vehicles_csv, import_vehicles, stream_vehicles_csv
+from .catalog_cache import (
+    AVAILABILITY, CATALOG, GRID_PARAMS, PRICING, acached_fragment, aget_categories, cached_fragment,
+    get_categories,
+)
+from .pricing import quote, quote_vehicles
+from .rollups import category_report, vehicle_report
+
+IMPORT_ERRORS_SHOWN = 200
+
+# Las vistas con prefijo ``a`` son las versiones asíncronas (ORM asíncrono) de
+# las del mismo nombre; rental/urls.py las usa bajo ASGI (ASYNC_VIEWS). Bajo
+# WSGI se sirven las síncronas: una vista asíncrona ahí costaría un bucle de
+# eventos y un salto de hilo por consulta.
+
+
+async def arender(request, template_name, context):
+    """``render`` para vistas asíncronas.
+
+    Los procesadores de contexto (sesión, mensajes, rol) son síncronos, así que
+    la plantilla se renderiza en un hilo, con el usuario ya resuelto por
+    ``auser()`` para no volver a consultarlo.
+    """
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template_name, context)
 
 
 def home(request):
     """Vista principal"""
-    vehicles = Vehicle.objects.filter(status='disponible')[:6]
-    categories = Category.objects.all()
+    authenticated = request.user.is_authenticated
+    featured_vehicles = cached_fragment(
+        'home-auth' if authenticated else 'home', None, 'rental/_featured_vehicles.html',
+        lambda: {
+            'vehicles': Vehicle.objects.filter(status='disponible').select_related('category')[:6],
+            'authenticated': authenticated,
+        },
+    )
     context = {
-        'vehicles': vehicles,
-        'categories': categories,
+        'featured_vehicles': featured_vehicles,
+        'categories': get_categories(),
     }
     return render(request, 'rental/home.html', context)
 
 
+async def ahome(request):
+    authenticated = (await request.auser()).is_authenticated
+
+    async def featured_context():
+        vehicles = Vehicle.objects.filter(status='disponible').select_related('category')[:6]
+        return {'vehicles': [vehicle async for vehicle in vehicles], 'authenticated': authenticated}
+
+    featured_vehicles = await acached_fragment(
+        'home-auth' if authenticated else 'home', None, 'rental/_featured_vehicles.html', featured_context,
+    )
+    context = {
+        'featured_vehicles': featured_vehicles,
+        'categories': await aget_categories(),
+    }
+    return await arender(request, 'rental/home.html', context)
+
+
 def register_view(request):
     """Vista de registro"""
     if request.method == 'POST':
@@ -56,8 +118,7 @@ def login_view(request):
         if user is not None:
             login(request, user)
             # Redirigir según el rol
-            profile = getattr(user, 'profile', None)
-            if profile and profile.role in ['admin', 'operador']:
+            if is_staff_role(user):
                 return redirect('dashboard')
             return redirect('vehicles_list')
         else:
@@ -73,73 +134,128 @@ def logout_view(request):
     return redirect('home')
 
 
-@login_required
-def vehicles_list(request):
-    """Lista de vehículos para clientes"""
-    vehicles = Vehicle.objects.filter(status='disponible')
-    categories = Category.objects.all()
-    
+def _catalog_params(request):
+    availability_form = AvailabilityForm(request.GET)
+    # Solo los filtros conocidos forman parte de la clave y de los enlaces
+    params = QueryDict(mutable=True)
+    for key in GRID_PARAMS:
+        if key in request.GET:
+            params.setlist(key, request.GET.getlist(key))
+    return availability_form, availability_form.get_range(), params
+
+
+def _catalog_vehicles(params, date_range):
+    if date_range:
+        # Con fechas: vehículos libres en el rango aunque hoy estén alquilados
+        vehicles = available_vehicles(*date_range)
+    else:
+        vehicles = Vehicle.objects.filter(status='disponible')
+    vehicles = vehicles.select_related('category')
+
     # Filtros
-    category_id = request.GET.get('category')
-    search = request.GET.get('search')
-    transmission = request.GET.get('transmission')
-    
+    category_id = params.get('category')
+    search = params.get('search')
+    transmission = params.get('transmission')
+
     if category_id:
         vehicles = vehicles.filter(category_id=category_id)
     if search:
-        vehicles = vehicles.filter(
-            Q(brand__icontains=search) | 
-            Q(model__icontains=search) |
-            Q(license_plate__icontains=search)
-        )
+        vehicles = rank_vehicles(vehicles, search)
     if transmission:
         vehicles = vehicles.filter(transmission=transmission)
-    
+    return vehicles
+
+
+def _attach_quotes(vehicles, quotes):
+    """Presupuesto de las fechas buscadas en cada vehículo de la página"""
+    for vehicle in vehicles:
+        vehicle.quote = quotes[vehicle.id]
+
+
+@login_required
+def vehicles_list(request):
+    """Lista de vehículos para clientes"""
+    availability_form, date_range, params = _catalog_params(request)
+
+    def grid_context():
+        page = paginate_keyset(_catalog_vehicles(params, date_range), params)
+        if date_range:
+            _attach_quotes(page, quote_vehicles(page, *date_range))
+        return {'vehicles': page, 'page': page, 'date_range': date_range}
+
+    vehicle_grid = cached_fragment(
+        'vehicles', params, 'rental/_vehicle_grid.html', grid_context,
+        versions=(CATALOG, AVAILABILITY, PRICING) if date_range else (CATALOG,),
+    )
     context = {
-        'vehicles': vehicles,
-        'categories': categories,
+        'vehicle_grid': vehicle_grid,
+        'categories': get_categories(),
+        'availability_form': availability_form,
+        'date_range': date_range,
     }
     return render(request, 'rental/vehicles_list.html', context)
 
 
+@login_required
+async def avehicles_list(request):
+    availability_form, date_range, params = _catalog_params(request)
+
+    async def grid_context():
+        page = await apaginate_keyset(_catalog_vehicles(params, date_range), params)
+        if date_range:
+            _attach_quotes(page, await sync_to_async(quote_vehicles)(page, *date_range))
+        return {'vehicles': page, 'page': page, 'date_range': date_range}
+
+    vehicle_grid = await acached_fragment(
+        'vehicles', params, 'rental/_vehicle_grid.html', grid_context,
+        versions=(CATALOG, AVAILABILITY, PRICING) if date_range else (CATALOG,),
+    )
+    context = {
+        'vehicle_grid': vehicle_grid,
+        'categories': await aget_categories(),
+        'availability_form': availability_form,
+        'date_range': date_range,
+    }
+    return await arender(request, 'rental/vehicles_list.html', context)
+
+
 @login_required
 def rental_create(request, vehicle_id):
     """Crear nueva reserva"""
-    vehicle = get_object_or_404(Vehicle, id=vehicle_id, status='disponible')
+    vehicle = get_object_or_404(
+        Vehicle.objects.exclude(status='mantenimiento').select_related('category'), id=vehicle_id
+    )
     
+    estimate = None
     if request.method == 'POST':
-        form = RentalForm(request.POST)
+        # El solapamiento lo valida book_vehicle al insertar, no el formulario
+        form = RentalForm(request.POST, vehicle=vehicle, check_overlap=False)
         if form.is_valid():
-            rental = form.save(commit=False)
-            rental.client = request.user
-            rental.daily_rate = vehicle.daily_rate
-            # Calcular días y monto antes de validar, para evitar errores de campos nulos
-            try:
-                if rental.start_date and rental.end_date:
-                    delta = rental.end_date - rental.start_date
-                    rental.days = delta.days + 1
-                    rental.total_amount = rental.days * rental.daily_rate
-            except Exception:
-                pass
-            
             try:
-                rental.full_clean()
-                rental.save()
-                
-                # Actualizar estado del vehículo
-                vehicle.status = 'alquilado'
-                vehicle.save()
-                
+                # Reserva transaccional: bloqueo del vehículo + restricción de ocupación
+                book_vehicle(
+                    client=request.user,
+                    vehicle_id=vehicle.id,
+                    start_date=form.cleaned_data['start_date'],
+                    end_date=form.cleaned_data['end_date'],
+                    notes=form.cleaned_data.get('notes', ''),
+                )
                 messages.success(request, '¡Reserva creada exitosamente!')
                 return redirect('my_rentals')
-            except Exception as e:
-                messages.error(request, f'Error: {str(e)}')
+            except ValidationError as e:
+                messages.error(request, f'Error: {" ".join(e.messages)}')
     else:
-        form = RentalForm(initial={'vehicle': vehicle})
+        initial = {}
+        date_range = AvailabilityForm(request.GET).get_range()
+        if date_range:
+            initial['start_date'], initial['end_date'] = date_range
+            estimate = quote(vehicle, *date_range)
+        form = RentalForm(initial=initial, vehicle=vehicle)
     
     context = {
         'form': form,
         'vehicle': vehicle,
+        'quote': estimate,
     }
     return render(request, 'rental/rental_create.html', context)
 
@@ -147,15 +263,16 @@ def rental_create(request, vehicle_id):
 @login_required
 def my_rentals(request):
     """Mis reservas (cliente)"""
-    rentals = Rental.objects.filter(client=request.user).order_by('-created_at')
-    context = {'rentals': rentals}
+    rentals = Rental.objects.filter(client=request.user).select_related('vehicle')
+    page = paginate_keyset(rentals, request.GET)
+    context = {'rentals': page, 'page': page}
     return render(request, 'rental/my_rentals.html', context)
 
 
 @login_required
 def rental_edit_user(request, pk):
     """Editar una reserva propia (solo pendiente)"""
-    rental = get_object_or_404(Rental, pk=pk, client=request.user)
+    rental = get_object_or_404(Rental.objects.select_related('vehicle__category'), pk=pk, client=request.user)
 
     if rental.status != 'pendiente':
         messages.error(request, 'Solo puedes editar reservas en estado pendiente.')
@@ -165,15 +282,8 @@ def rental_edit_user(request, pk):
         form = RentalUpdateForm(request.POST, instance=rental)
         if form.is_valid():
             rental = form.save(commit=False)
-            # Mantener tarifa desde el vehículo, recalcular días y total
+            # Mantener tarifa desde el vehículo; días y total los recalcula save()
             rental.daily_rate = rental.vehicle.daily_rate
-            try:
-                if rental.start_date and rental.end_date:
-                    delta = rental.end_date - rental.start_date
-                    rental.days = delta.days + 1
-                    rental.total_amount = rental.days * rental.daily_rate
-            except Exception:
-                pass
 
             try:
                 rental.full_clean()
@@ -204,9 +314,8 @@ def rental_cancel_user(request, pk):
         else:
             rental.status = 'cancelado'
             rental.save()
-            # Liberar vehículo
-            rental.vehicle.status = 'disponible'
-            rental.vehicle.save()
+            # Liberar vehículo si no tiene otro alquiler activo
+            refresh_vehicle_status(rental.vehicle)
             messages.success(request, 'Reserva cancelada exitosamente.')
         return redirect('my_rentals')
 
@@ -216,65 +325,113 @@ def rental_cancel_user(request, pk):
 # VISTAS DE ADMINISTRACIÓN
 
 def admin_required(view_func):
-    """Decorador para requerir rol admin u operador"""
-    def wrapper(request, *args, **kwargs):
-        profile = getattr(request.user, 'profile', None)
-        if not profile or profile.role not in ['admin', 'operador']:
-            messages.error(request, 'No tienes permisos para acceder a esta página.')
-            return redirect('home')
-        return view_func(request, *args, **kwargs)
+    """Decorador para requerir rol admin u operador (vistas síncronas o asíncronas)"""
+    if iscoroutinefunction(view_func):
+        async def wrapper(request, *args, **kwargs):
+            if not await ais_staff_role(await request.auser()):
+                messages.error(request, 'No tienes permisos para acceder a esta página.')
+                return redirect('home')
+            return await view_func(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            # Rol desde la caché (ver rental/roles.py): sin consulta a UserProfile
+            if not is_staff_role(request.user):
+                messages.error(request, 'No tienes permisos para acceder a esta página.')
+                return redirect('home')
+            return view_func(request, *args, **kwargs)
     return login_required(wrapper)
 
 
 @admin_required
 def dashboard(request):
     """Panel de administración"""
-    # Estadísticas
-    total_vehicles = Vehicle.objects.count()
-    available_vehicles = Vehicle.objects.filter(status='disponible').count()
-    active_rentals = Rental.objects.filter(status='activo').count()
-    total_revenue = Rental.objects.filter(status='completado').aggregate(
-        total=Sum('total_amount')
-    )['total'] or 0
-
-    # Vehículos más alquilados
-    top_vehicles = Vehicle.objects.annotate(
-        rental_count=Count('rentals')
-    ).order_by('-rental_count')[:5]
-
-    # Ingresos por mes (últimos 6 meses) compatible con PostgreSQL/SQLite
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly_qs = (
-        Rental.objects.filter(status='completado', created_at__gte=six_months_ago)
-        .annotate(month=TruncMonth('created_at'))
-        .values('month')
-        .annotate(total=Sum('total_amount'))
-        .order_by('month')
-    )
-    monthly_revenue = [
-        {'month': item['month'].strftime('%Y-%m'), 'total': float(item['total'] or 0)}
-        for item in monthly_qs
-    ]
+    # Agregados precalculados (ver rental/metrics.py)
+    context = get_dashboard_metrics()
 
     # Alquileres recientes
-    recent_rentals = Rental.objects.all()[:10]
+    context['recent_rentals'] = Rental.objects.select_related('client', 'vehicle')[:10]
+    return render(request, 'rental/dashboard.html', context)
+
+
+@admin_required
+async def adashboard(request):
+    async def recent_rentals():
+        return [rental async for rental in Rental.objects.select_related('client', 'vehicle')[:10]]
+
+    # Métricas y alquileres recientes a la vez
+    context, recent = await asyncio.gather(aget_dashboard_metrics(), recent_rentals())
+    context['recent_rentals'] = recent
+    return await arender(request, 'rental/dashboard.html', context)
 
-    # Distribución por estado
-    status_distribution = Rental.objects.values('status').annotate(
-        count=Count('id')
-    )
 
+AUTOCOMPLETE_LIMIT = 20
+
+
+def _autocomplete_response(queryset, label):
+    """Respuesta de los widgets ``AutocompleteSelect`` (ver rental/widgets.py)"""
+    rows = list(queryset[:AUTOCOMPLETE_LIMIT + 1])
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': label(obj)} for obj in rows[:AUTOCOMPLETE_LIMIT]],
+        'more': len(rows) > AUTOCOMPLETE_LIMIT,
+    })
+
+
+@admin_required
+def autocomplete_vehicles(request):
+    """Vehículos fuera de mantenimiento que coinciden con ``term`` (índice de búsqueda)"""
+    term = request.GET.get('term', '').strip()
+    vehicles = Vehicle.objects.exclude(status='mantenimiento').order_by('brand', 'model', 'id')
+    if term:
+        vehicles = rank_vehicles(vehicles, term).order_by(f'-{SCORE}', 'brand', 'model', 'id')
+    return _autocomplete_response(vehicles.only('id', 'brand', 'model', 'license_plate'), str)
+
+
+@admin_required
+def autocomplete_categories(request):
+    term = request.GET.get('term', '').strip()
+    categories = Category.objects.order_by('name')
+    if term:
+        categories = categories.filter(name__icontains=term)
+    return _autocomplete_response(categories.only('id', 'name'), str)
+
+
+@admin_required
+def reports(request):
+    """Ingresos y ocupación por categoría y vehículo.
+
+    Solo lee los resúmenes de rental/rollups.py (``rollup_reports``), así que
+    el coste no depende de cuántos alquileres abarque el rango.
+    """
+    form = ReportFilterForm(request.GET or None)
+    start, end, category = form.get_filters(timezone.localdate())
+    category_id = category.id if category else None
     context = {
-        'total_vehicles': total_vehicles,
-        'available_vehicles': available_vehicles,
-        'active_rentals': active_rentals,
-        'total_revenue': total_revenue,
-        'top_vehicles': top_vehicles,
-        'monthly_revenue': list(monthly_revenue),
-        'recent_rentals': recent_rentals,
-        'status_distribution': list(status_distribution),
+        'form': form,
+        'start': start,
+        'end': end,
+        'report': category_report(start, end, category_id),
+        'top_vehicles': vehicle_report(start, end, category_id),
     }
-    return render(request, 'rental/dashboard.html', context)
+    return render(request, 'rental/reports.html', context)
+
+
+def request_metrics(request):
+    """Métricas de peticiones en formato Prometheus (token Bearer o sesión de admin)"""
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404('Métricas deshabilitadas')
+    token = settings.REQUEST_METRICS_TOKEN
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return _prometheus_response()
+    return _request_metrics_admin(request)
+
+
+@admin_required
+def _request_metrics_admin(request):
+    return _prometheus_response()
+
+
+def _prometheus_response():
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 @admin_required
@@ -285,13 +442,10 @@ def vehicles_manage(request):
     # Filtros
     search = request.GET.get('search')
     if search:
-        vehicles = vehicles.filter(
-            Q(brand__icontains=search) | 
-            Q(model__icontains=search) |
-            Q(license_plate__icontains=search)
-        )
+        vehicles = rank_vehicles(vehicles, search)
     
-    context = {'vehicles': vehicles}
+    page = paginate_keyset(vehicles, request.GET)
+    context = {'vehicles': page, 'page': page}
     return render(request, 'rental/vehicles_manage.html', context)
 
 
@@ -340,6 +494,69 @@ def vehicle_delete(request, pk):
     return render(request, 'rental/vehicle_confirm_delete.html', {'vehicle': vehicle})
 
 
+@admin_required
+def vehicles_import(request):
+    """Carga masiva de vehículos (crea o actualiza por placa)"""
+    result = None
+    if request.method == 'POST':
+        form = VehicleImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            if upload.name.lower().endswith('.xlsx'):
+                try:
+                    import openpyxl  # noqa: F401
+                except Exception:
+                    messages.error(request, 'La importación desde Excel requiere instalar "openpyxl".')
+                    return redirect('vehicles_import')
+            try:
+                result = import_vehicles(
+                    upload.file, upload.name,
+                    create_categories=form.cleaned_data['create_categories'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if form.cleaned_data['dry_run']:
+                    messages.info(request, f'Validación: {result.imported} filas válidas, {len(result.errors)} con errores.')
+                else:
+                    messages.success(
+                        request, f'{result.created} vehículos creados y {result.updated} actualizados.'
+                    )
+    else:
+        form = VehicleImportForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:IMPORT_ERRORS_SHOWN] if result else [],
+        'columns': IMPORT_COLUMNS,
+    }
+    return render(request, 'rental/vehicles_import.html', context)
+
+
+def _vehicles_csv_response(request, stream):
+    vehicles = Vehicle.objects.all()
+    search = request.GET.get('search')
+    if search:
+        vehicles = search_vehicles(vehicles, search)
+    response = StreamingHttpResponse(stream(vehicles), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="vehiculos.csv"'
+    return response
+
+
+@admin_required
+def vehicles_export(request):
+    """Exportar vehículos a CSV con las columnas de importación"""
+    return _vehicles_csv_response(request, stream_vehicles_csv)
+
+
+@admin_required
+async def avehicles_export(request):
+    # Bajo ASGI el streaming necesita un iterador asíncrono (uno síncrono se acumula en memoria)
+    return _vehicles_csv_response(request, astream_vehicles_csv)
+
+
 @admin_required
 def categories_manage(request):
     """Gestión de categorías"""
@@ -400,29 +617,14 @@ def rentals_manage(request):
     
     # Filtros
     form = RentalFilterForm(request.GET)
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        status = form.cleaned_data.get('status')
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if search:
-            rentals = rentals.filter(
-                Q(client__username__icontains=search) |
-                Q(client__first_name__icontains=search) |
-                Q(client__last_name__icontains=search) |
-                Q(vehicle__license_plate__icontains=search)
-            )
-        if status:
-            rentals = rentals.filter(status=status)
-        if start_date:
-            rentals = rentals.filter(start_date__gte=start_date)
-        if end_date:
-            rentals = rentals.filter(end_date__lte=end_date)
+    rentals = form.filter_queryset(rentals)
+    page = paginate_keyset(rentals, request.GET)
     
     context = {
-        'rentals': rentals,
+        'rentals': page,
+        'page': page,
         'filter_form': form,
+        'bulk_statuses': [(status, STATUS_LABELS[status]) for status in BULK_TRANSITIONS],
     }
     return render(request, 'rental/rentals_manage.html', context)
 
@@ -436,12 +638,14 @@ def rental_update_status(request, pk):
         new_status = request.POST.get('status')
         if new_status in dict(Rental.STATUS_CHOICES):
             rental.status = new_status
-            rental.save()
+            try:
+                rental.save()
+            except ValidationError as e:
+                messages.error(request, f'Error: {" ".join(e.messages)}')
+                return redirect('rentals_manage')
             
-            # Si se completa o cancela, liberar el vehículo
-            if new_status in ['completado', 'cancelado']:
-                rental.vehicle.status = 'disponible'
-                rental.vehicle.save()
+            # Al activar se marca 'alquilado'; al completar o cancelar se libera
+            refresh_vehicle_status(rental.vehicle)
             
             messages.success(request, 'Estado actualizado exitosamente.')
         
@@ -451,98 +655,229 @@ def rental_update_status(request, pk):
 
 
 @admin_required
-def export_rentals_csv(request):
-    """Exportar alquileres a CSV"""
-    response = HttpResponse(content_type='text/csv')
+def rentals_bulk_status(request):
+    """Cambio de estado masivo (``new_status``): alquileres marcados (``ids``) o,
+    con ``apply_to=filter``, todos los que cumplen los filtros de la lista.
+
+    Responde JSON si la petición lo pide (``Accept: application/json``); si no,
+    redirige a la lista con un mensaje.
+    """
+    if request.method != 'POST':
+        return redirect('rentals_manage')
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    new_status = request.POST.get('new_status')
+
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if request.POST.get('apply_to') == 'filter':
+        rentals = RentalFilterForm(request.POST).filter_queryset(Rental.objects.all())
+    elif ids:
+        rentals = Rental.objects.filter(pk__in=ids)
+    else:
+        rentals = None
+
+    if rentals is None:
+        error = 'Selecciona al menos un alquiler o aplica el cambio a todo el filtro.'
+    else:
+        try:
+            updated = bulk_update_status(rentals, new_status)
+            error = None
+        except ValidationError as e:
+            error = ' '.join(e.messages)
+
+    if wants_json:
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        return JsonResponse({'status': new_status, 'updated': updated})
+    if error:
+        messages.error(request, error)
+    else:
+        messages.success(request, f'{updated} alquileres actualizados a "{new_status}".')
+    return redirect('rentals_manage')
+
+
+def _rentals_csv_response(request, stream):
+    form = RentalFilterForm(request.GET)
+    rentals = form.filter_queryset(Rental.objects.all())
+    response = StreamingHttpResponse(stream(rentals), content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="alquileres.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Cliente', 'Vehículo', 'Fecha Inicio', 'Fecha Fin', 'Días', 'Monto Total', 'Estado'])
-    
-    rentals = Rental.objects.all().select_related('client', 'vehicle')
-    for rental in rentals:
-        writer.writerow([
-            rental.id,
-            rental.client.get_full_name(),
-            str(rental.vehicle),
-            rental.start_date,
-            rental.end_date,
-            rental.days,
-            rental.total_amount,
-            rental.get_status_display(),
-        ])
-    
     return response
 
 
+@admin_required
+def export_rentals_csv(request):
+    """Exportar alquileres a CSV (en streaming, respetando los filtros)"""
+    return _rentals_csv_response(request, stream_rentals_csv)
+
+
+@admin_required
+async def aexport_rentals_csv(request):
+    return _rentals_csv_response(request, astream_rentals_csv)
+
+
 @admin_required
 def export_rentals_excel(request):
     """Exportar alquileres a Excel (.xlsx)"""
     # Importación perezosa y manejo de ausencia de paquete
     try:
-        from openpyxl import Workbook as _Workbook
+        import openpyxl  # noqa: F401
     except Exception:
         messages.error(request, 'La exportación a Excel requiere instalar "openpyxl".')
         return redirect('rentals_manage')
 
-    wb = _Workbook()
-    ws = wb.active
-    ws.title = "Alquileres"
-    headers = ['ID', 'Cliente', 'Vehículo', 'Fecha Inicio', 'Fecha Fin', 'Días', 'Monto Total', 'Estado']
-    ws.append(headers)
+    form = RentalFilterForm(request.GET)
+    rentals = form.filter_queryset(Rental.objects.all())
+    total = rentals.count()
+
+    # Exportaciones grandes: trabajo en segundo plano con enlace de descarga
+    if total > settings.EXPORT_ASYNC_THRESHOLD:
+        job_id = export_jobs.start_export_job(request.user, request.GET, total)
+        if job_id is None:
+            messages.warning(request, 'Hay demasiadas exportaciones en curso. Inténtalo de nuevo en unos minutos.')
+            return redirect('rentals_manage')
+        return redirect('export_job_status', job_id=job_id)
+
+    # Exportaciones pequeñas: se escriben en un archivo temporal y se sirven por partes
+    tmp = tempfile.TemporaryFile()
+    write_rentals_xlsx(rentals, tmp)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename='alquileres.xlsx', content_type=XLSX_CONTENT_TYPE)
+
+
+async def _afile_chunks(fileobj, chunk_size=64 * 1024):
+    """Contenido de un archivo leído por bloques en un hilo (streaming bajo ASGI)"""
+    read = sync_to_async(fileobj.read, thread_sensitive=False)
+    try:
+        while chunk := await read(chunk_size):
+            yield chunk
+    finally:
+        fileobj.close()
 
-    rentals = Rental.objects.all().select_related('client', 'vehicle')
-    for r in rentals:
-        ws.append([
-            r.id,
-            r.client.get_full_name(),
-            str(r.vehicle),
-            r.start_date.strftime('%Y-%m-%d'),
-            r.end_date.strftime('%Y-%m-%d'),
-            r.days,
-            float(r.total_amount),
-            r.get_status_display(),
-        ])
-
-    bio = BytesIO()
-    wb.save(bio)
-    bio.seek(0)
-
-    response = HttpResponse(
-        bio.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename="alquileres.xlsx"'
+
+@admin_required
+async def aexport_rentals_excel(request):
+    try:
+        import openpyxl  # noqa: F401
+    except Exception:
+        messages.error(request, 'La exportación a Excel requiere instalar "openpyxl".')
+        return redirect('rentals_manage')
+
+    form = RentalFilterForm(request.GET)
+    rentals = form.filter_queryset(Rental.objects.all())
+    total = await rentals.acount()
+
+    if total > settings.EXPORT_ASYNC_THRESHOLD:
+        job_id = await sync_to_async(export_jobs.start_export_job)(await request.auser(), request.GET, total)
+        if job_id is None:
+            messages.warning(request, 'Hay demasiadas exportaciones en curso. Inténtalo de nuevo en unos minutos.')
+            return redirect('rentals_manage')
+        return redirect('export_job_status', job_id=job_id)
+
+    # openpyxl es síncrono: el libro se escribe en un hilo
+    tmp = tempfile.TemporaryFile()
+    await sync_to_async(write_rentals_xlsx)(rentals, tmp)
+    size = tmp.seek(0, 2)
+    tmp.seek(0)
+    response = StreamingHttpResponse(_afile_chunks(tmp), content_type=XLSX_CONTENT_TYPE)
+    response['Content-Length'] = size
+    response['Content-Disposition'] = content_disposition_header(True, 'alquileres.xlsx')
     return response
 
 
+@admin_required
+def export_job_status(request, job_id):
+    """Progreso de una exportación en segundo plano"""
+    job = export_jobs.get_job(str(job_id))
+    if job is None or job['owner'] != request.user.pk:
+        raise Http404('Exportación no encontrada')
+    if request.GET.get('format') == 'json':
+        return JsonResponse({key: job.get(key) for key in ('status', 'processed', 'total', 'error')})
+    percent = int(job['processed'] * 100 / job['total']) if job['total'] else 100
+    return render(request, 'rental/export_job.html', {'job': job, 'percent': min(percent, 100)})
+
+
+@admin_required
+def export_job_download(request, job_id):
+    """Descarga del XLSX generado en segundo plano"""
+    job = export_jobs.get_job(str(job_id))
+    if job is None or job['owner'] != request.user.pk or job['status'] != 'listo':
+        raise Http404('Exportación no disponible')
+    return FileResponse(
+        open(export_jobs.file_path(str(job_id)), 'rb'),
+        as_attachment=True,
+        filename='alquileres.xlsx',
+        content_type=XLSX_CONTENT_TYPE,
+    )
+
+
+# Segundos entre consultas mientras el contrato se genera
+CONTRACT_RETRY_AFTER = 2
+
+
 @admin_required
 def rental_contract_pdf(request, pk):
-    """Generar contrato en PDF y descargar"""
-    rental = get_object_or_404(Rental, pk=pk)
+    """Generar contrato en PDF y descargar (con caché y ETag)"""
+    rental = get_object_or_404(
+        Rental.objects.select_related('client__profile', 'vehicle__category'), pk=pk
+    )
 
     # Importación perezosa y manejo de ausencia de paquete
     try:
-        from xhtml2pdf import pisa as _pisa
+        import xhtml2pdf  # noqa: F401
     except Exception:
         messages.error(request, 'La generación de PDF requiere instalar "xhtml2pdf".')
         return redirect('rentals_manage')
 
-    # Resolver rutas de STATIC/MEDIA a filesystem para que xhtml2pdf pueda leer imágenes
-    def link_callback(uri, rel):
-        # Mapear STATIC
-        if uri.startswith(settings.STATIC_URL):
-            path = os.path.join(settings.STATIC_ROOT, uri.replace(settings.STATIC_URL, ''))
-            return path if os.path.exists(path) else uri
-        # Mapear MEDIA
-        if uri.startswith(settings.MEDIA_URL):
-            path = os.path.join(settings.MEDIA_ROOT, uri.replace(settings.MEDIA_URL, ''))
-            return path if os.path.exists(path) else uri
-        # Devolver URI tal cual para URLs absolutas (http/https)
-        return uri
-
-    html = render_to_string('rental/rental_contract.html', {'rental': rental})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="contrato_{rental.id}.pdf"'
-    _pisa.CreatePDF(html, dest=response, link_callback=link_callback)
+    etag = f'"{contract_etag(rental)}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    # Sin esperar al pool: 202 y la página vuelve a pedirlo hasta que esté
+    state, result = contract_status(rental)
+    if state == 'pendiente':
+        response = render(request, 'rental/contract_pending.html', {'rental': rental}, status=202)
+        response['Retry-After'] = str(CONTRACT_RETRY_AFTER)
+        return response
+    if state == 'error':
+        messages.error(request, f'No se pudo generar el contrato: {result}')
+        return redirect('rentals_manage')
+
+    response = FileResponse(
+        open(result, 'rb'),
+        as_attachment=True,
+        filename=f'contrato_{rental.id}.pdf',
+        content_type='application/pdf',
+    )
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
     return response
+
+
+@admin_required
+def rental_contracts_zip(request):
+    """Descargar en un ZIP los contratos de los alquileres seleccionados"""
+    if request.method != 'POST':
+        return redirect('rentals_manage')
+
+    try:
+        import xhtml2pdf  # noqa: F401
+    except Exception:
+        messages.error(request, 'La generación de PDF requiere instalar "xhtml2pdf".')
+        return redirect('rentals_manage')
+
+    ids = [int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()]
+    if not ids:
+        messages.warning(request, 'Selecciona al menos un alquiler.')
+        return redirect('rentals_manage')
+    if len(ids) > settings.CONTRACT_ZIP_MAX:
+        messages.error(request, f'Se pueden descargar como máximo {settings.CONTRACT_ZIP_MAX} contratos a la vez.')
+        return redirect('rentals_manage')
+
+    rentals = Rental.objects.filter(pk__in=ids).select_related('client__profile', 'vehicle__category')
+    return FileResponse(
+        build_contracts_zip(rentals),
+        as_attachment=True,
+        filename='contratos.zip',
+        content_type='application/zip',
+    )
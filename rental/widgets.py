@@ -0,0 +1,47 @@
+"""
+Widgets de formulario.
+
+``AutocompleteSelect`` sustituye al ``Select`` de las claves foráneas con
+tablas grandes: solo renderiza la opción elegida (una consulta por PK) y el
+resto se busca por AJAX en un endpoint de ``rental/views.py`` que devuelve
+``{"results": [{"id": ..., "text": ...}]}``, como el autocompletado del admin.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Opción vacía y las elegidas, sin recorrer el queryset completo"""
+        field = self.choices.field
+        selected = []
+        for v in value:
+            if v in (None, ''):
+                continue
+            # Un valor manipulado en el POST no debe llegar al filtro como pk
+            try:
+                selected.append(field.queryset.model._meta.pk.to_python(v))
+            except ValidationError:
+                pass
+        options = []
+        if not self.is_required or not selected:
+            options.append(self.create_option(name, '', field.empty_label or '', not selected, 0))
+        if selected:
+            for index, obj in enumerate(field.queryset.filter(pk__in=selected), start=1):
+                options.append(self.create_option(
+                    name, field.prepare_value(obj), field.label_from_instance(obj), True, index,
+                ))
+        return [(None, options, 0)]
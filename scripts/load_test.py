@@ -0,0 +1,238 @@
+"""
+Prueba de carga contra un servidor local (solo biblioteca estándar).
+
+Cada hilo es un usuario virtual con su propia sesión (cookies + CSRF) que
+repite escenarios elegidos al azar según su peso:
+
+- catalogo: home, listado con filtros, búsqueda y paginación.
+- reserva: búsqueda por fechas, formulario de reserva y POST.
+- dashboard: panel, alquileres y vehículos (como administrador).
+
+Los usuarios salen de ``generate_load_data`` (``ld_user0000001``...,
+``ld_admin``, contraseña ``load12345``). Ejemplo:
+
+    python manage.py generate_load_data --vehicles 2000 --users 20000 --rentals 200000
+    python manage.py runserver --noreload   # o gunicorn/uvicorn
+    python scripts/load_test.py --users 20 --duration 60
+
+Al final muestra peticiones/segundo y latencias (p50/p95/p99) por URL.
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+RENTAL_LINK_RE = re.compile(r'/rental/create/(\d+)/')
+SEARCH_TERMS = ['toyota', 'mazda cx', 'suv', 'automatica', 'renault duster', 'kia', 'LD00001']
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Cada redirección cuenta como una petición aparte"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.outcomes = defaultdict(int)
+
+    def record(self, name, elapsed, ok):
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+    def count(self, outcome):
+        with self.lock:
+            self.outcomes[outcome] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, stats, rng, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.rng = rng
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect,
+        )
+
+    def request(self, name, path, data=None, referer=None):
+        """Devuelve (código, cuerpo); registra la latencia bajo ``name``"""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body)
+        req.add_header('Referer', self.base_url + (referer or path))
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, text = response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as exc:
+            status, text = exc.code, ''
+        except (urllib.error.URLError, OSError):
+            status, text = 0, ''
+        self.stats.record(name, time.perf_counter() - start, 200 <= status < 400)
+        return status, text
+
+    def login(self, username, password):
+        _, text = self.request('login (GET)', '/login/')
+        token = CSRF_RE.search(text)
+        status, _ = self.request('login (POST)', '/login/', {
+            'csrfmiddlewaretoken': token.group(1) if token else '',
+            'username': username,
+            'password': password,
+        })
+        return status == 302
+
+
+class Client(VirtualUser):
+    def browse(self):
+        rng = self.rng
+        self.request('home', '/')
+        self.request('vehicles_list', '/vehicles/')
+        params = rng.choice([
+            {'transmission': rng.choice(['manual', 'automatica'])},
+            {'search': rng.choice(SEARCH_TERMS)},
+            {'page_size': 24},
+        ])
+        self.request('vehicles_list (filtros)', '/vehicles/?' + urllib.parse.urlencode(params))
+
+    def book(self):
+        rng = self.rng
+        start = date.today() + timedelta(days=rng.randint(1, 45))
+        end = start + timedelta(days=rng.randint(1, 7))
+        dates = {'start_date': start.isoformat(), 'end_date': end.isoformat()}
+        _, text = self.request('vehicles_list (fechas)', '/vehicles/?' + urllib.parse.urlencode(dates))
+        vehicle_ids = RENTAL_LINK_RE.findall(text)
+        if not vehicle_ids:
+            self.stats.count('reserva sin vehículos libres')
+            return
+        vehicle_id = rng.choice(vehicle_ids)
+        path = f'/rental/create/{vehicle_id}/'
+        _, text = self.request('rental_create (GET)', path + '?' + urllib.parse.urlencode(dates))
+        token = CSRF_RE.search(text)
+        status, _ = self.request('rental_create (POST)', path, {
+            'csrfmiddlewaretoken': token.group(1) if token else '',
+            'vehicle': vehicle_id,
+            'notes': 'Prueba de carga',
+            **dates,
+        })
+        # 302: reserva creada; 200: el formulario volvió con error (p. ej. fechas ocupadas)
+        self.stats.count('reserva creada' if status == 302 else 'reserva rechazada')
+        self.request('my_rentals', '/my-rentals/')
+
+
+class Admin(VirtualUser):
+    def dashboard(self):
+        self.request('dashboard', '/dashboard/')
+        self.request('rentals_manage', '/dashboard/rentals/?' + urllib.parse.urlencode(
+            {'status': self.rng.choice(['', 'pendiente', 'activo', 'completado'])}
+        ))
+        self.request('vehicles_manage', '/dashboard/vehicles/')
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_user(index, args, stats, deadline):
+    rng = random.Random(args.seed + index)
+    client = Client(args.url, stats, rng, args.timeout)
+    username = f'{args.prefix}_user{rng.randint(1, args.clients):07d}'
+    if not client.login(username, args.password):
+        stats.count('login fallido')
+        return
+    admin = Admin(args.url, stats, rng, args.timeout)
+    admin_ready = False
+    scenarios = ['catalogo', 'reserva', 'dashboard']
+    weights = [args.browse_weight, args.book_weight, args.dashboard_weight]
+    while time.monotonic() < deadline:
+        scenario = rng.choices(scenarios, weights=weights)[0]
+        if scenario == 'catalogo':
+            client.browse()
+        elif scenario == 'reserva':
+            client.book()
+        else:
+            if not admin_ready:
+                admin_ready = admin.login(f'{args.prefix}_admin', args.password)
+                if not admin_ready:
+                    stats.count('login fallido')
+                    continue
+            admin.dashboard()
+        stats.count(scenario)
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=10, help='Usuarios virtuales concurrentes.')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos de carga.')
+    parser.add_argument('--clients', type=int, default=1000,
+                        help='Se inicia sesión con ld_user0000001..N (<= --users de generate_load_data).')
+    parser.add_argument('--prefix', default='ld')
+    parser.add_argument('--password', default='load12345')
+    parser.add_argument('--browse-weight', type=int, default=70)
+    parser.add_argument('--book-weight', type=int, default=20)
+    parser.add_argument('--dashboard-weight', type=int, default=10)
+    parser.add_argument('--think-time', type=float, default=0, help='Pausa máxima (s) entre escenarios.')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Guardar el resumen en este archivo JSON.')
+    args = parser.parse_args()
+    args.prefix = args.prefix.lower()
+
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_user, args=(i, args, stats, deadline), daemon=True)
+        for i in range(args.users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    summary = {'duration': round(elapsed, 2), 'users': args.users, 'endpoints': {}, 'outcomes': dict(stats.outcomes)}
+    total = sum(len(values) for values in stats.latencies.values())
+    print(f"{'URL':<28} {'peticiones':>10} {'errores':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in sorted(stats.latencies):
+        values = stats.latencies[name]
+        row = {
+            'requests': len(values),
+            'errors': stats.errors[name],
+            'p50': round(statistics.median(values) * 1000, 1),
+            'p95': round(percentile(values, 95) * 1000, 1),
+            'p99': round(percentile(values, 99) * 1000, 1),
+        }
+        summary['endpoints'][name] = row
+        print(f"{name:<28} {row['requests']:>10} {row['errors']:>8} {row['p50']:>8} {row['p95']:>8} {row['p99']:>8}")
+    summary['requests'] = total
+    summary['rps'] = round(total / elapsed, 1) if elapsed else 0
+    print(f"\nTotal: {total} peticiones en {elapsed:.1f}s ({summary['rps']} req/s)")
+    for outcome, n in sorted(stats.outcomes.items()):
+        print(f'  {outcome}: {n}')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fileobj:
+            json.dump(summary, fileobj, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+// Autocompletado para los <select data-autocomplete-url> (ver rental/widgets.py):
+// un campo de búsqueda encima del select pide las opciones al servidor.
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach((select) => {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-1';
+        search.placeholder = 'Buscar...';
+        select.before(search);
+
+        let timer = null;
+        search.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(async () => {
+                const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+                url.searchParams.set('term', search.value.trim());
+                const response = await fetch(url, { headers: { Accept: 'application/json' } });
+                if (!response.ok) return;
+                const { results } = await response.json();
+                const current = select.value;
+                // Conservar la opción vacía y la elegida; el resto, los resultados
+                [...select.options].forEach((option) => {
+                    if (option.value && option.value !== current) option.remove();
+                });
+                results.forEach(({ id, text }) => {
+                    if (String(id) !== current) select.add(new Option(text, id));
+                });
+            }, 250);
+        });
+    });
+});
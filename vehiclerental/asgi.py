@@ -9,8 +9,17 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehiclerental.settings')
+# Vistas asíncronas (ver ASYNC_VIEWS en settings)
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Transiciones programadas en un hilo de este proceso (ver rental/scheduler.py)
+if settings.SCHEDULER_IN_PROCESS:
+    from rental.scheduler import start_background
+
+    start_background()
@@ -0,0 +1,18 @@
+"""
+Perfil de gunicorn para servir la aplicación ASGI con workers de uvicorn:
+
+    gunicorn vehiclerental.asgi:application -c python:vehiclerental.gunicorn_asgi
+
+Las vistas asíncronas (catálogo, dashboard, exportaciones y API) no ocupan
+un worker mientras esperan a la base de datos o envían una exportación.
+"""
+import os
+
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+# Las exportaciones grandes pueden tardar; el resto responde en milisegundos
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+accesslog = '-'
@@ -52,6 +52,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Métricas por vista; se descarta al arrancar si REQUEST_METRICS_ENABLED es False.
+    # Es síncrono: activado bajo ASGI añade un salto de hilo por petición
+    'rental.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise solo si está instalado
     # (se insertará dinámicamente más abajo si HAS_WHITENOISE es True)
@@ -62,9 +65,10 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
-# Inserta WhiteNoise si está disponible
+# Inserta WhiteNoise si está disponible (subclase que también es asíncrona,
+# para no forzar un salto de hilo por petición bajo ASGI)
 if HAS_WHITENOISE:
-    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+    MIDDLEWARE.insert(2, 'rental.static_middleware.AsyncWhiteNoiseMiddleware')
 
 ROOT_URLCONF = 'vehiclerental.urls'
 TEMPLATES = [
@@ -78,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'rental.context_processors.roles',
             ],
         },
     },
@@ -88,6 +93,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # BEGIN IMMEDIATE: las transacciones toman el bloqueo de escritura al
+        # inicio y esperan (timeout) en lugar de fallar con "database is locked"
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # Base de pruebas en archivo para que los tests de concurrencia usen
+        # conexiones reales en paralelo
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 if os.environ.get('DATABASE_URL') and dj_database_url:
@@ -106,6 +122,41 @@ if os.environ.get('DATABASE_URL') and dj_database_url:
 # }
 
 
+# Caché: CACHE_URL=locmem:// (por defecto), file:///ruta/a/carpeta, dummy://
+# o redis://host:6379/0 (cualquier servidor que hable el protocolo Redis;
+# requiere el paquete ``redis``)
+CACHE_URL = os.environ.get('CACHE_URL', 'locmem://')
+if CACHE_URL.startswith(('redis://', 'rediss://', 'unix://')):
+    _cache = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}
+elif CACHE_URL.startswith('file://'):
+    _cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_URL[len('file://'):] or str(BASE_DIR / 'cache'),
+    }
+elif CACHE_URL.startswith('dummy://'):
+    _cache = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+else:
+    _cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rentcar'}
+_cache['KEY_PREFIX'] = os.environ.get('CACHE_KEY_PREFIX', 'rentcar')
+_cache['TIMEOUT'] = int(os.environ.get('CACHE_TIMEOUT', '300'))
+CACHES = {'default': _cache}
+
+# Caché que ven todos los procesos. Con locmem (o dummy) cada worker tiene la
+# suya y un borrado en uno no llega a los demás
+SHARED_CACHE = CACHE_URL.startswith(('redis://', 'rediss://', 'unix://', 'file://'))
+
+# Con caché compartida, sesiones en caché con respaldo en base de datos: la
+# lectura de la sesión no toca la tabla django_session mientras la entrada
+# siga en caché. Sin ella, un logout en un worker dejaría la sesión viva en
+# la caché de los otros, así que se leen de la base de datos
+SESSION_ENGINE = (
+    'django.contrib.sessions.backends.cached_db' if SHARED_CACHE else 'django.contrib.sessions.backends.db'
+)
+# Segundos que se cachea el rol (UserProfile.role) de cada usuario; 0 (sin
+# caché compartida) lo consulta en cada petición
+ROLE_CACHE_TIMEOUT = int(os.environ.get('ROLE_CACHE_TIMEOUT', '3600')) if SHARED_CACHE else 0
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -145,10 +196,83 @@ STATICFILES_STORAGE = (
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Paginación por cursor de listados (vehículos, alquileres)
+PAGINATION_PAGE_SIZE = int(os.environ.get('PAGINATION_PAGE_SIZE', '24'))
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', '96'))
+PAGINATION_PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
+
+# Caché del catálogo público (rental/catalog_cache.py)
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', 'True') == 'True'
+CATALOG_CACHE_ALIAS = 'default'
+# Segundos que vive una entrada aunque no cambie la versión
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '300'))
+
+# Exportaciones XLSX: por encima de este número de filas se generan en segundo plano
+EXPORT_ASYNC_THRESHOLD = int(os.environ.get('EXPORT_ASYNC_THRESHOLD', '20000'))
+# Máximo de exportaciones generándose a la vez por proceso
+EXPORT_MAX_CONCURRENT = int(os.environ.get('EXPORT_MAX_CONCURRENT', '2'))
+# Carpeta privada (no servida como media) para los archivos generados
+EXPORT_JOBS_DIR = os.environ.get('EXPORT_JOBS_DIR', str(BASE_DIR / 'exports'))
+# Segundos que se conservan los archivos generados
+EXPORT_JOB_TTL = int(os.environ.get('EXPORT_JOB_TTL', str(24 * 3600)))
+
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Contratos PDF: caché en disco y pool de procesos para el render
+CONTRACT_CACHE_DIR = os.environ.get('CONTRACT_CACHE_DIR', str(BASE_DIR / 'contracts_cache'))
+# Subir al cambiar rental_contract.html para invalidar los PDF en caché
+CONTRACT_TEMPLATE_VERSION = '1'
+# Procesos para generar PDF (0 = en el propio proceso)
+CONTRACT_RENDER_WORKERS = int(os.environ.get('CONTRACT_RENDER_WORKERS', '2'))
+# Máximo de contratos por descarga ZIP
+CONTRACT_ZIP_MAX = int(os.environ.get('CONTRACT_ZIP_MAX', '200'))
+
+# Variantes WebP de las imágenes de vehículos (rental/images.py)
+IMAGE_VARIANT_WIDTHS = [320, 640, 960]
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', '80'))
+IMAGE_VARIANTS_DIR = 'vehicles/variants'
+
+# Versiones asíncronas de las vistas de catálogo, dashboard, exportaciones y API
+# (rental/urls.py). vehiclerental/asgi.py lo activa; bajo WSGI se usan las síncronas
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# Instrumentación de peticiones (rental/middleware.py)
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'False') == 'True'
+# Umbrales para registrar una petición como lenta
+REQUEST_METRICS_SLOW_MS = int(os.environ.get('REQUEST_METRICS_SLOW_MS', '500'))
+REQUEST_METRICS_SLOW_QUERIES = int(os.environ.get('REQUEST_METRICS_SLOW_QUERIES', '20'))
+# Muestras por vista para los percentiles
+REQUEST_METRICS_WINDOW = int(os.environ.get('REQUEST_METRICS_WINDOW', '1000'))
+# Token para que Prometheus lea /dashboard/metrics/ sin sesión (Authorization: Bearer ...)
+REQUEST_METRICS_TOKEN = os.environ.get('REQUEST_METRICS_TOKEN', '')
+
+# Transiciones programadas de los alquileres (rental/scheduler.py, manage.py run_scheduler)
+# 'complete': completa los activos vencidos; 'flag': solo los cuenta como vencidos
+SCHEDULER_OVERDUE_POLICY = os.environ.get('SCHEDULER_OVERDUE_POLICY', 'complete')
+# Días tras la devolución antes de completar un activo (mientras tanto cuenta como vencido)
+SCHEDULER_GRACE_DAYS = int(os.environ.get('SCHEDULER_GRACE_DAYS', '0'))
+# Cancelar las reservas pendientes que terminaron sin activarse
+SCHEDULER_CANCEL_PENDING = os.environ.get('SCHEDULER_CANCEL_PENDING', 'False') == 'True'
+# Segundos entre ejecuciones del bucle (run_scheduler --loop o el hilo en proceso)
+SCHEDULER_INTERVAL = int(os.environ.get('SCHEDULER_INTERVAL', '300'))
+# Arrancar el bucle en un hilo de cada proceso WSGI/ASGI
+SCHEDULER_IN_PROCESS = os.environ.get('SCHEDULER_IN_PROCESS', 'False') == 'True'
+# Fuera de PostgreSQL, segundos tras los que una ejecución sin terminar se da por abandonada
+SCHEDULER_LOCK_TIMEOUT = int(os.environ.get('SCHEDULER_LOCK_TIMEOUT', '3600'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'rental': {'handlers': ['console'], 'level': os.environ.get('RENTAL_LOG_LEVEL', 'INFO')},
+    },
+}
+
 # Login URLs
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vehiclerental.settings')
 
 application = get_wsgi_application()
+
+# Transiciones programadas en un hilo de este proceso (ver rental/scheduler.py)
+if settings.SCHEDULER_IN_PROCESS:
+    from rental.scheduler import start_background
+
+    start_background()